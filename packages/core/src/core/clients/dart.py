@@ -1,13 +1,22 @@
 import httpx
+from core.clients import resilience
+
+DART_BASE_URL = "https://opendart.fss.or.kr/api"
+MULTI_ACNT_MAX_CORPS = 100  # fnlttMultiAcnt accepts at most 100 corp codes per call
 
 class DARTClient:
-    def __init__(self, api_key: str, *, timeout: float = 10.0):
-        self._client = httpx.AsyncClient(timeout=timeout)
+    def __init__(self, api_key: str, *, timeout: float = 10.0,
+                 limits: httpx.Limits | None = None, http2: bool = False,
+                 base_url: str = DART_BASE_URL, hedge: bool = False):
+        self._client = httpx.AsyncClient(timeout=timeout, limits=limits or httpx.Limits(), http2=http2)
         self.api_key = api_key
+        self.base_url = base_url.rstrip("/")  # point at a recorded stub in tests
+        self.breaker = resilience.breaker("dart")
+        self.hedge = hedge
 
     async def single_fs(self, corp_code: str, year: int, reprt_code: str, fs_div: str) -> dict:
-        r = await self._client.get(
-            "https://opendart.fss.or.kr/api/fnlttSinglAcntAll.json",
+        r = await self.breaker.call(lambda: self._client.get(
+            f"{self.base_url}/fnlttSinglAcntAll.json",
             params={
                 "crtfc_key": self.api_key,
                 "corp_code": corp_code,
@@ -15,6 +24,41 @@ class DARTClient:
                 "reprt_code": reprt_code,
                 "fs_div": fs_div,
             },
-        )
+        ), hedge=self.hedge)
         r.raise_for_status()
-        return r.json()
\ No newline at end of file
+        return r.json()
+
+    async def multi_fs(self, corp_codes: list[str], year: int, reprt_code: str) -> dict:
+        """Key accounts (CFS and OFS) for up to MULTI_ACNT_MAX_CORPS companies in one call."""
+        if len(corp_codes) > MULTI_ACNT_MAX_CORPS:
+            raise ValueError(f"fnlttMultiAcnt takes at most {MULTI_ACNT_MAX_CORPS} corp codes")
+        r = await self.breaker.call(lambda: self._client.get(
+            f"{self.base_url}/fnlttMultiAcnt.json",
+            params={
+                "crtfc_key": self.api_key,
+                "corp_code": ",".join(corp_codes),
+                "bsns_year": str(year),
+                "reprt_code": reprt_code,
+            },
+        ), hedge=self.hedge)
+        r.raise_for_status()
+        return r.json()
+
+    async def corp_codes_download(self, dest) -> httpx.Response:
+        """Stream corpCode.xml (a ~25MB zip) into the binary file ``dest`` without
+        buffering it; returns the (closed) response for its headers."""
+        async def attempt() -> httpx.Response:
+            async with self._client.stream("GET", f"{self.base_url}/corpCode.xml",
+                                           params={"crtfc_key": self.api_key}, timeout=25) as r:
+                if r.is_success:
+                    dest.seek(0)
+                    dest.truncate()
+                    async for chunk in r.aiter_bytes(1 << 16):
+                        dest.write(chunk)
+                return r
+        r = await self.breaker.call(attempt)  # never hedged
+        r.raise_for_status()
+        return r
+
+    async def aclose(self):
+        await self._client.aclose()
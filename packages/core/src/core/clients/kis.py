@@ -1,53 +1,114 @@
 from __future__ import annotations
 import asyncio
 from datetime import datetime, timedelta
+import hashlib
+import os
 from typing import Any, Dict, Optional
 import httpx
+from core.clients import ratelimit, resilience
+from core.clients.token_store import TokenStore, default_store, token_key
+
+# (refill rate/s, burst) per environment; rate + burst stays under KIS's per-second cap
+# (실전 20건/초, 모의 2건/초)
+KIS_RATE_LIMITS = {"real": (18.0, 2), "virtual": (1.0, 1)}
+
+# Refresh this long before the issued expiry so no request goes out with a dying token
+TOKEN_REFRESH_MARGIN = timedelta(minutes=5)
 
 class KISClient:
     def __init__(self, base_url: str, app_key: str, app_secret: str,
-                 *, timeout: float = 10.0, oauth_path: str = "/oauth2/tokenP"):
+                 *, timeout: float = 10.0, oauth_path: str = "/oauth2/tokenP",
+                 limits: Optional[httpx.Limits] = None, http2: bool = False,
+                 token_store: Optional[TokenStore] = None, hedge: bool = False):
         self.base_url = base_url.rstrip("/")
         self.app_key = app_key
         self.app_secret = app_secret
         self.oauth_path = oauth_path
-        self._client = httpx.AsyncClient(timeout=timeout)
+        self._client = httpx.AsyncClient(timeout=timeout, limits=limits or httpx.Limits(), http2=http2)
         self._token: Optional[str] = None
         self._expires_at: Optional[datetime] = None
         self._lock = asyncio.Lock()
+        self.token_store = token_store or default_store()
+        self._token_key = token_key(self.base_url, app_key)
+        env = "virtual" if "vts" in self.base_url else "real"
+        rate, burst = KIS_RATE_LIMITS[env]
+        rate = float(os.getenv("KIS_RATE_PER_SEC", rate))
+        key_id = hashlib.sha256(app_key.encode()).hexdigest()[:8]
+        self.limiter = ratelimit.bucket(f"kis:{env}:{key_id}", rate, burst)
+        self.breaker = resilience.breaker("kis")
+        self.hedge = hedge  # quotation GETs are idempotent
+
+    def _valid(self, expires_at: Optional[datetime]) -> bool:
+        return expires_at is not None and datetime.now() < expires_at - TOKEN_REFRESH_MARGIN
 
     async def _ensure_token(self) -> str:
+        if self._token and self._valid(self._expires_at):
+            return self._token
         async with self._lock:
-            if self._token and self._expires_at and datetime.now() < self._expires_at:
+            if self._token and self._valid(self._expires_at):
+                return self._token
+
+            # another worker may already hold a valid token
+            stored = self.token_store.load(self._token_key)
+            if stored and self._valid(stored[1]):
+                self._token, self._expires_at = stored
                 return self._token
 
-            # tiny retry to dodge transient 403s
-            last_exc = None
-            for _ in range(2):
-                r = await self._client.post(
-                    f"{self.base_url}{self.oauth_path}",
-                    json={"grant_type": "client_credentials",
-                          "appkey": self.app_key, "appsecret": self.app_secret},
-                )
-                try:
-                    r.raise_for_status()
-                    data = r.json()
-                    self._token = data["access_token"]
-                    ttl = int(data.get("expires_in", 86400)) - 300
-                    self._expires_at = datetime.now() + timedelta(seconds=max(ttl, 600))
+            # cross-process: only one worker issues, the rest pick up its token
+            lock = self.token_store.lock(self._token_key)
+            await self._acquire(lock)
+            try:
+                stored = self.token_store.load(self._token_key)
+                if stored and self._valid(stored[1]):
+                    self._token, self._expires_at = stored
                     return self._token
-                except httpx.HTTPStatusError as e:
-                    last_exc = e
-                    await asyncio.sleep(0.2)  # brief backoff
+                self._token, self._expires_at = await self._issue_token()
+                self.token_store.save(self._token_key, self._token, self._expires_at)
+                return self._token
+            finally:
+                lock.__exit__(None, None, None)
+
+    @staticmethod
+    async def _acquire(lock) -> None:
+        """Enter a blocking file lock from a thread. If we are cancelled while waiting,
+        the thread still gets the lock eventually; release it then instead of leaking it."""
+        entering = asyncio.ensure_future(asyncio.to_thread(lock.__enter__))
+        try:
+            await asyncio.shield(entering)
+        except asyncio.CancelledError:
+            def release(f: asyncio.Future) -> None:
+                if not f.cancelled() and f.exception() is None:
+                    lock.__exit__(None, None, None)
+            entering.add_done_callback(release)
+            raise
 
-            # surface helpful message
-            detail = getattr(last_exc.response, "text", "")[:200].replace("\n", " ")
-            raise httpx.HTTPStatusError(
-                f"KIS token failed ({last_exc.response.status_code}). Hint: {detail}",
-                request=last_exc.request, response=last_exc.response
-            )
+    async def _issue_token(self) -> tuple[str, datetime]:
+        # tiny retry to dodge transient 403s
+        last_exc = None
+        for _ in range(2):
+            r = await self.breaker.call(lambda: self._client.post(
+                f"{self.base_url}{self.oauth_path}",
+                json={"grant_type": "client_credentials",
+                      "appkey": self.app_key, "appsecret": self.app_secret},
+            ))
+            try:
+                r.raise_for_status()
+                data = r.json()
+                ttl = int(data.get("expires_in", 86400))
+                return data["access_token"], datetime.now() + timedelta(seconds=ttl)
+            except httpx.HTTPStatusError as e:
+                last_exc = e
+                await asyncio.sleep(0.2)  # brief backoff
 
-    async def get(self, path: str, *, tr_id: str, params: Dict[str, Any]) -> dict:
+        # surface helpful message
+        detail = getattr(last_exc.response, "text", "")[:200].replace("\n", " ")
+        raise httpx.HTTPStatusError(
+            f"KIS token failed ({last_exc.response.status_code}). Hint: {detail}",
+            request=last_exc.request, response=last_exc.response
+        )
+
+    async def get(self, path: str, *, tr_id: str, params: Dict[str, Any],
+                  priority: Optional[int] = None) -> dict:
         token = await self._ensure_token()
         headers = {
             "Authorization": f"Bearer {token}",
@@ -56,7 +117,11 @@ class KISClient:
             "tr_id": tr_id,
             "custtype": "P",
         }
-        r = await self._client.get(f"{self.base_url}{path}", params=params, headers=headers)
+
+        # the limiter wait happens outside the breaker's clock: queueing is not upstream latency
+        r = await self.breaker.call(
+            lambda: self._client.get(f"{self.base_url}{path}", params=params, headers=headers),
+            hedge=self.hedge, acquire=lambda: self.limiter.acquire(priority))
         r.raise_for_status()
         data = r.json()
         if data.get("rt_cd") != "0":
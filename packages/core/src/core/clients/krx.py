@@ -0,0 +1,28 @@
+import httpx
+from core.clients import resilience
+
+KRX_BASE_URL = "http://data.krx.co.kr"
+_HEADERS = {"User-Agent": "Mozilla/5.0", "Referer": "http://data.krx.co.kr/contents/MDC/MDI/mdiLoader"}
+
+class KRXClient:
+    """KRX data portal file downloads (OTP, then CSV). No credentials needed."""
+
+    def __init__(self, *, timeout: float = 15.0, limits: httpx.Limits | None = None,
+                 http2: bool = False, base_url: str = KRX_BASE_URL):
+        self._client = httpx.AsyncClient(timeout=timeout, limits=limits or httpx.Limits(),
+                                         http2=http2, headers=_HEADERS)
+        self.base_url = base_url.rstrip("/")  # point at a recorded stub in tests
+        self.breaker = resilience.breaker("krx")
+
+    async def download_csv(self, form: dict) -> bytes:
+        """Raw CSV bytes (EUC-KR) for one MDC statistics screen, e.g. MDCSTAT01901."""
+        otp = await self.breaker.call(lambda: self._client.post(
+            f"{self.base_url}/comm/fileDn/GenerateOTP/generate.cmd", data=form))
+        otp.raise_for_status()
+        r = await self.breaker.call(lambda: self._client.post(
+            f"{self.base_url}/comm/fileDn/download_csv/download.cmd", data={"code": otp.text}))
+        r.raise_for_status()
+        return r.content
+
+    async def aclose(self):
+        await self._client.aclose()
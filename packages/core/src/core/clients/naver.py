@@ -4,6 +4,7 @@ import httpx
 from typing import Optional
 from datetime import datetime, timedelta
 from core.utils.cache import path, fresh, load_json, save_json
+from core.clients import resilience
 
 NAVER_ID = os.getenv("NAVER_SEARCH_CLIENT_ID")
 NAVER_SECRET = os.getenv("NAVER_SEARCH_CLIENT_SECRET")
@@ -35,10 +36,13 @@ async def company_logo(company_name: str, stock_code: str | None = None) -> str
         return None if logo_url == "NO_LOGO" else logo_url
     
 class NaverImageSearch:
-    def __init__(self, client_id: Optional[str], client_secret: Optional[str], *, timeout: float = 5.0):
+    def __init__(self, client_id: Optional[str], client_secret: Optional[str], *, timeout: float = 5.0,
+                 limits: Optional[httpx.Limits] = None, http2: bool = False, hedge: bool = False):
         self.client_id = client_id
         self.client_secret = client_secret
-        self._client = httpx.AsyncClient(timeout=timeout)
+        self._client = httpx.AsyncClient(timeout=timeout, limits=limits or httpx.Limits(), http2=http2)
+        self.breaker = resilience.breaker("naver")
+        self.hedge = hedge
 
     def _enabled(self) -> bool:
         return bool(self.client_id and self.client_secret)
@@ -47,14 +51,20 @@ class NaverImageSearch:
         if not self._enabled():
             # 자격 없으면 조용히 None
             return None
-        r = await self._client.get(
-            "https://openapi.naver.com/v1/search/image",
-            headers={"X-Naver-Client-Id": self.client_id, "X-Naver-Client-Secret": self.client_secret},
-            params={"query": query, "display": 1, "sort": "sim"},
-        )
+        try:
+            r = await self.breaker.call(lambda: self._client.get(
+                "https://openapi.naver.com/v1/search/image",
+                headers={"X-Naver-Client-Id": self.client_id, "X-Naver-Client-Secret": self.client_secret},
+                params={"query": query, "display": 1, "sort": "sim"},
+            ), hedge=self.hedge)
+        except resilience.CircuitOpenError:
+            return None  # 로고는 없어도 되는 데이터
         # 네이버 API는 200이어도 items 비어있을 수 있음
         if r.status_code // 100 != 2:
             return None
         data = r.json()
         items = data.get("items") or []
-        return items[0]["link"] if items else None
\ No newline at end of file
+        return items[0]["link"] if items else None
+
+    async def aclose(self):
+        await self._client.aclose()
@@ -0,0 +1,126 @@
+from __future__ import annotations
+import asyncio
+import contextvars
+import heapq
+import itertools
+import time
+from contextlib import contextmanager
+from typing import Iterator
+
+# Lower value = served first
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BACKGROUND = 10
+
+# 호출 경로마다 priority 인자를 넘기지 않도록 컨텍스트로 전달
+_priority: contextvars.ContextVar[int] = contextvars.ContextVar("upstream_priority", default=PRIORITY_INTERACTIVE)
+
+
+@contextmanager
+def priority(level: int) -> Iterator[None]:
+    """Run upstream calls made inside the block at ``level`` (e.g. background prefetch)."""
+    token = _priority.set(level)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def current_priority() -> int:
+    return _priority.get()
+
+
+class TokenBucket:
+    """Async token bucket whose waiters are served in priority order (FIFO within a level).
+
+    ``rate`` tokens/s refill up to ``burst``; keep ``rate + burst`` at or under the
+    upstream per-second limit so no sliding one-second window can exceed it.
+    """
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = float(rate)
+        self.burst = max(1, int(burst))
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._waiters: list[tuple[int, int, asyncio.Future]] = []
+        self._seq = itertools.count()
+        self._timer: asyncio.TimerHandle | None = None
+        self._stats = {"acquired": 0, "queued": 0, "wait_total_s": 0.0, "wait_max_s": 0.0}
+        self._by_priority: dict[int, dict[str, float]] = {}
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def _drain(self) -> None:
+        self._timer = None
+        self._refill()
+        while self._waiters and self._tokens >= 1.0:
+            _, _, fut = heapq.heappop(self._waiters)
+            if fut.done():  # cancelled while queued
+                continue
+            self._tokens -= 1.0
+            fut.set_result(None)
+        while self._waiters and self._waiters[0][2].done():
+            heapq.heappop(self._waiters)
+        if self._waiters:
+            delay = (1.0 - self._tokens) / self.rate
+            self._timer = asyncio.get_running_loop().call_later(max(delay, 0.0), self._drain)
+
+    def _record(self, level: int, waited: float) -> None:
+        self._stats["acquired"] += 1
+        self._stats["wait_total_s"] += waited
+        self._stats["wait_max_s"] = max(self._stats["wait_max_s"], waited)
+        p = self._by_priority.setdefault(level, {"acquired": 0, "wait_total_s": 0.0, "wait_max_s": 0.0})
+        p["acquired"] += 1
+        p["wait_total_s"] += waited
+        p["wait_max_s"] = max(p["wait_max_s"], waited)
+
+    async def acquire(self, level: int | None = None) -> float:
+        """Wait for a token; returns the seconds spent queued."""
+        level = current_priority() if level is None else level
+        self._refill()
+        if not self._waiters and self._tokens >= 1.0:
+            self._tokens -= 1.0
+            self._record(level, 0.0)
+            return 0.0
+
+        t0 = time.monotonic()
+        fut = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (level, next(self._seq), fut))
+        self._stats["queued"] += 1
+        if self._timer is None:
+            self._drain()
+        try:
+            await fut
+        except asyncio.CancelledError:
+            if fut.done() and not fut.cancelled():
+                self._tokens = min(self.burst, self._tokens + 1.0)  # granted but unused
+            raise
+        waited = time.monotonic() - t0
+        self._record(level, waited)
+        return waited
+
+    def snapshot(self) -> dict:
+        s = dict(self._stats)
+        s["wait_avg_s"] = s["wait_total_s"] / s["acquired"] if s["acquired"] else 0.0
+        s["queue_depth"] = sum(1 for _, _, f in self._waiters if not f.done())
+        s["rate_per_s"] = self.rate
+        s["burst"] = self.burst
+        s["by_priority"] = {str(k): dict(v) for k, v in sorted(self._by_priority.items())}
+        return s
+
+
+# Process-wide registry: every client sharing a credential shares one bucket
+_buckets: dict[str, TokenBucket] = {}
+
+
+def bucket(name: str, rate: float, burst: int = 1) -> TokenBucket:
+    b = _buckets.get(name)
+    if b is None:
+        b = _buckets[name] = TokenBucket(rate, burst)
+    return b
+
+
+def snapshot_all() -> dict[str, dict]:
+    return {name: b.snapshot() for name, b in _buckets.items()}
@@ -0,0 +1,145 @@
+from __future__ import annotations
+import importlib.util
+import logging
+import os
+from dataclasses import dataclass
+from typing import Optional
+import httpx
+from core.clients.dart import DART_BASE_URL, DARTClient
+from core.clients.kis import KISClient
+from core.clients.krx import KRX_BASE_URL, KRXClient
+from core.clients.naver import NaverImageSearch
+
+logger = logging.getLogger(__name__)
+
+
+class MissingCredentialsError(RuntimeError):
+    """An upstream's keys are not configured."""
+
+
+@dataclass
+class PoolConfig:
+    """Connection-pool settings shared by every upstream client."""
+    max_connections: int = 100
+    max_keepalive_connections: int = 20
+    keepalive_expiry: float = 30.0
+    http2: bool = False
+    hedge: bool = False  # race a second attempt for slow idempotent GETs
+
+    @classmethod
+    def from_env(cls) -> "PoolConfig":
+        return cls(
+            max_connections=int(os.getenv("UPSTREAM_MAX_CONNECTIONS", cls.max_connections)),
+            max_keepalive_connections=int(os.getenv("UPSTREAM_MAX_KEEPALIVE", cls.max_keepalive_connections)),
+            keepalive_expiry=float(os.getenv("UPSTREAM_KEEPALIVE_EXPIRY", cls.keepalive_expiry)),
+            http2=os.getenv("UPSTREAM_HTTP2", "0").lower() in ("1", "true", "yes"),
+            hedge=os.getenv("UPSTREAM_HEDGE", "0").lower() in ("1", "true", "yes"),
+        )
+
+    def limits(self) -> httpx.Limits:
+        return httpx.Limits(
+            max_connections=self.max_connections,
+            max_keepalive_connections=self.max_keepalive_connections,
+            keepalive_expiry=self.keepalive_expiry,
+        )
+
+    def http2_enabled(self) -> bool:
+        if self.http2 and importlib.util.find_spec("h2") is None:
+            logger.warning("UPSTREAM_HTTP2 requested but 'h2' is not installed; using HTTP/1.1")
+            return False
+        return self.http2
+
+
+class UpstreamClients:
+    """Process-wide owner of pooled keep-alive clients for DART, KIS, Naver and KRX.
+
+    Create once at app startup and ``aclose()`` at shutdown. Clients are built
+    lazily on first use, so a missing credential only fails the routes that need it.
+    """
+
+    def __init__(self, *, dart_api_key: Optional[str] = None, dart_base_url: str = DART_BASE_URL,
+                 kis_base_url: str = "https://openapi.koreainvestment.com:9443",
+                 kis_app_key: Optional[str] = None, kis_app_secret: Optional[str] = None,
+                 kis_oauth_path: str = "/oauth2/tokenP",
+                 naver_client_id: Optional[str] = None, naver_client_secret: Optional[str] = None,
+                 krx_base_url: str = KRX_BASE_URL, pool: Optional[PoolConfig] = None):
+        self.dart_api_key = dart_api_key
+        self.dart_base_url = dart_base_url
+        self.kis_base_url = kis_base_url
+        self.kis_app_key = kis_app_key
+        self.kis_app_secret = kis_app_secret
+        self.kis_oauth_path = kis_oauth_path
+        self.naver_client_id = naver_client_id
+        self.naver_client_secret = naver_client_secret
+        self.krx_base_url = krx_base_url
+        self.pool = pool or PoolConfig()
+        self._http2 = self.pool.http2_enabled()
+        self._dart: Optional[DARTClient] = None
+        self._kis: Optional[KISClient] = None
+        self._naver: Optional[NaverImageSearch] = None
+        self._krx: Optional[KRXClient] = None
+
+    @classmethod
+    def from_env(cls) -> "UpstreamClients":
+        return cls(
+            dart_api_key=os.getenv("API_KEY"),
+            dart_base_url=os.getenv("DART_BASE_URL", DART_BASE_URL),
+            kis_base_url=os.getenv("KIS_BASE_URL", "https://openapi.koreainvestment.com:9443"),
+            kis_app_key=os.getenv("APP_KEY"),
+            kis_app_secret=os.getenv("APP_SECRET"),
+            kis_oauth_path=os.getenv("KIS_OAUTH_PATH", "/oauth2/tokenP"),  # override to /oauth2/token if prod
+            naver_client_id=os.getenv("NAVER_SEARCH_CLIENT_ID"),
+            naver_client_secret=os.getenv("NAVER_SEARCH_CLIENT_SECRET"),
+            krx_base_url=os.getenv("KRX_BASE_URL", KRX_BASE_URL),
+            pool=PoolConfig.from_env(),
+        )
+
+    @property
+    def dart(self) -> DARTClient:
+        if self._dart is None:
+            if not self.dart_api_key:
+                raise MissingCredentialsError("Missing environment variable: API_KEY")
+            self._dart = DARTClient(self.dart_api_key, limits=self.pool.limits(), http2=self._http2,
+                                    base_url=self.dart_base_url, hedge=self.pool.hedge)
+        return self._dart
+
+    @property
+    def kis(self) -> KISClient:
+        if self._kis is None:
+            if not (self.kis_app_key and self.kis_app_secret):
+                raise MissingCredentialsError("Missing environment variable: APP_KEY / APP_SECRET")
+            self._kis = KISClient(
+                base_url=self.kis_base_url,
+                app_key=self.kis_app_key,
+                app_secret=self.kis_app_secret,
+                oauth_path=self.kis_oauth_path,
+                limits=self.pool.limits(),
+                http2=self._http2,
+                hedge=self.pool.hedge,
+            )
+        return self._kis
+
+    @property
+    def naver(self) -> NaverImageSearch:
+        # 자격이 없어도 생성 (search_one 이 None 리턴)
+        if self._naver is None:
+            self._naver = NaverImageSearch(self.naver_client_id, self.naver_client_secret,
+                                           limits=self.pool.limits(), http2=self._http2,
+                                           hedge=self.pool.hedge)
+        return self._naver
+
+    @property
+    def krx(self) -> KRXClient:
+        if self._krx is None:
+            self._krx = KRXClient(limits=self.pool.limits(), http2=self._http2, base_url=self.krx_base_url)
+        return self._krx
+
+    async def aclose(self) -> None:
+        for c in (self._dart, self._kis, self._naver, self._krx):
+            if c is None:
+                continue
+            try:
+                await c.aclose()
+            except Exception:
+                logger.exception("closing upstream client failed")
+        self._dart = self._kis = self._naver = self._krx = None
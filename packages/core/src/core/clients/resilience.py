@@ -0,0 +1,227 @@
+"""Per-upstream circuit breakers and hedged requests.
+
+A breaker watches the last ``window`` calls to one upstream (KIS, DART, Naver). When
+enough of them failed (transport errors, timeouts, 5xx/429) or were slow, it opens
+and calls fail fast with ``CircuitOpenError`` instead of queueing behind a dying
+upstream. After ``open_seconds`` a few trial calls are let through (half-open);
+success closes it again.
+
+Idempotent GETs can be hedged: if the first attempt hasn't answered after roughly
+the upstream's recent p95 latency, a second attempt is sent and the first answer
+wins. Hedges are capped at ``hedge_ratio`` of calls so they cannot double load.
+"""
+from __future__ import annotations
+import asyncio
+import os
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable
+import httpx
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+
+class CircuitOpenError(RuntimeError):
+    """The upstream's breaker is open; retry after ``retry_after`` seconds."""
+
+    def __init__(self, name: str, retry_after: float):
+        super().__init__(f"upstream '{name}' unavailable (circuit open)")
+        self.name = name
+        self.retry_after = retry_after
+
+
+@dataclass
+class BreakerConfig:
+    window: int = 50               # outcomes kept for the rates below
+    min_calls: int = 10            # don't judge on fewer than this
+    failure_rate: float = 0.5      # open at this share of failed calls
+    slow_call_seconds: float = 3.0
+    slow_rate: float = 0.8         # ... or this share of slow calls
+    open_seconds: float = 15.0
+    half_open_calls: int = 2       # trial calls allowed while half-open
+    hedge_ratio: float = 0.1       # at most this share of calls get a hedge
+    hedge_min_delay: float = 0.05
+    hedge_max_delay: float = 2.0
+
+
+# 업스트림별 기본값. 환경변수 UPSTREAM_<NAME>_OPEN_SECONDS 등으로 조정
+DEFAULTS = {
+    "kis": BreakerConfig(slow_call_seconds=3.0),
+    "dart": BreakerConfig(slow_call_seconds=5.0, open_seconds=30.0),
+    "naver": BreakerConfig(slow_call_seconds=2.0, open_seconds=60.0),
+    "krx": BreakerConfig(slow_call_seconds=10.0, open_seconds=300.0, min_calls=4),
+}
+
+
+def _config(name: str) -> BreakerConfig:
+    cfg = BreakerConfig(**vars(DEFAULTS.get(name, BreakerConfig())))
+    for field, value in vars(cfg).items():
+        env = os.getenv(f"UPSTREAM_{name.upper()}_{field.upper()}")
+        if env is not None:
+            setattr(cfg, field, type(value)(env))
+    return cfg
+
+
+def _failed(result: Any, exc: BaseException | None) -> bool:
+    if exc is not None:
+        return isinstance(exc, (httpx.TransportError, asyncio.TimeoutError))
+    return isinstance(result, httpx.Response) and (result.status_code >= 500 or result.status_code == 429)
+
+
+class CircuitBreaker:
+    def __init__(self, name: str, config: BreakerConfig | None = None):
+        self.name = name
+        self.config = config or _config(name)
+        self.state = CLOSED
+        self._outcomes: deque[tuple[bool, bool]] = deque(maxlen=self.config.window)  # (failed, slow)
+        self._latencies: deque[float] = deque(maxlen=200)
+        self._opened_at = 0.0
+        self._trials = 0
+        self._stats = {"calls": 0, "failures": 0, "rejected": 0, "opened": 0, "hedged": 0, "hedge_wins": 0}
+
+    # -- state machine --
+
+    def _admit(self) -> None:
+        if self.state == OPEN:
+            wait = self._opened_at + self.config.open_seconds - time.monotonic()
+            if wait > 0:
+                self._stats["rejected"] += 1
+                raise CircuitOpenError(self.name, wait)
+            self.state, self._trials = HALF_OPEN, 0
+        if self.state == HALF_OPEN:
+            if self._trials >= self.config.half_open_calls:
+                self._stats["rejected"] += 1
+                raise CircuitOpenError(self.name, self.config.open_seconds)
+            self._trials += 1
+
+    def _record(self, failed: bool, latency: float) -> None:
+        cfg = self.config
+        slow = latency >= cfg.slow_call_seconds
+        self._stats["calls"] += 1
+        self._stats["failures"] += failed
+        if not failed:
+            self._latencies.append(latency)
+        if self.state == HALF_OPEN:
+            if failed or slow:
+                self._open()
+            elif self._trials >= cfg.half_open_calls:
+                self.state = CLOSED
+                self._outcomes.clear()
+            return
+        self._outcomes.append((failed, slow))
+        n = len(self._outcomes)
+        if self.state == CLOSED and n >= cfg.min_calls:
+            failures = sum(f for f, _ in self._outcomes)
+            slows = sum(s for _, s in self._outcomes)
+            if failures / n >= cfg.failure_rate or slows / n >= cfg.slow_rate:
+                self._open()
+
+    def _open(self) -> None:
+        self.state = OPEN
+        self._opened_at = time.monotonic()
+        self._outcomes.clear()
+        self._stats["opened"] += 1
+
+    def p95(self) -> float | None:
+        if len(self._latencies) < 20:
+            return None
+        lat = sorted(self._latencies)
+        return lat[int(0.95 * (len(lat) - 1))]
+
+    # -- calls --
+
+    async def call(self, attempt: Callable[[], Awaitable[Any]], *, hedge: bool = False,
+                   acquire: Callable[[], Awaitable[Any]] | None = None) -> Any:
+        """Run ``attempt`` under the breaker; with ``hedge`` a second attempt may race it.
+
+        ``acquire`` (e.g. a rate-limit token) is awaited before every attempt, hedges
+        included, and is not counted as upstream latency.
+        """
+        self._admit()
+        try:
+            if acquire is not None:
+                await acquire()
+            t0 = time.monotonic()
+            try:
+                result, latency = await (self._hedged(attempt, acquire) if hedge else self._timed(attempt))
+            except BaseException as e:
+                if not isinstance(e, asyncio.CancelledError):
+                    self._record(_failed(None, e), time.monotonic() - t0)
+                raise
+        except asyncio.CancelledError:
+            if self.state == HALF_OPEN:
+                self._trials -= 1  # caller went away: the trial says nothing about the upstream
+            raise
+        self._record(_failed(result, None), latency)
+        return result
+
+    @staticmethod
+    async def _timed(attempt: Callable[[], Awaitable[Any]],
+                     acquire: Callable[[], Awaitable[Any]] | None = None) -> tuple[Any, float]:
+        if acquire is not None:
+            await acquire()
+        t0 = time.monotonic()
+        result = await attempt()
+        return result, time.monotonic() - t0
+
+    def _hedge_delay(self) -> float | None:
+        cfg = self.config
+        p95 = self.p95()
+        if p95 is None or self._stats["hedged"] >= cfg.hedge_ratio * max(self._stats["calls"], 1):
+            return None
+        return min(max(p95, cfg.hedge_min_delay), cfg.hedge_max_delay)
+
+    async def _hedged(self, attempt: Callable[[], Awaitable[Any]],
+                      acquire: Callable[[], Awaitable[Any]] | None) -> tuple[Any, float]:
+        delay = self._hedge_delay()
+        first = asyncio.ensure_future(self._timed(attempt))
+        second: asyncio.Future | None = None
+        try:
+            if delay is None:
+                return await first
+            done, _ = await asyncio.wait({first}, timeout=delay)
+            if done:
+                return first.result()
+            self._stats["hedged"] += 1
+            second = asyncio.ensure_future(self._timed(attempt, acquire))  # a hedge spends its own token
+            pending = {first, second}
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for t in done:
+                    if t.exception() is None and not _failed(t.result()[0], None):
+                        if t is second:
+                            self._stats["hedge_wins"] += 1
+                        return t.result()
+            # both failed: surface the original attempt's outcome
+            return first.result()
+        finally:
+            for t in (first, second):
+                if t is not None and not t.done():
+                    t.cancel()
+
+    def snapshot(self) -> dict[str, Any]:
+        n = len(self._outcomes)
+        p95 = self.p95()
+        return {
+            "state": self.state,
+            **self._stats,
+            "window_failure_rate": round(sum(f for f, _ in self._outcomes) / n, 3) if n else None,
+            "window_slow_rate": round(sum(s for _, s in self._outcomes) / n, 3) if n else None,
+            "p95_ms": round(p95 * 1000, 1) if p95 is not None else None,
+        }
+
+
+# Process-wide registry: every client for one upstream shares its breaker
+_breakers: dict[str, CircuitBreaker] = {}
+
+
+def breaker(name: str) -> CircuitBreaker:
+    b = _breakers.get(name)
+    if b is None:
+        b = _breakers[name] = CircuitBreaker(name)
+    return b
+
+
+def snapshot_all() -> dict[str, dict[str, Any]]:
+    return {name: b.snapshot() for name, b in _breakers.items()}
@@ -0,0 +1,100 @@
+from __future__ import annotations
+import hashlib
+import json
+import os
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from typing import ContextManager, Iterator, Optional, Protocol
+
+try:  # POSIX
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+def token_key(*parts: str) -> str:
+    """Stable, non-reversible key for a credential (never store the raw app key)."""
+    return hashlib.sha256("|".join(parts).encode()).hexdigest()[:16]
+
+
+class TokenStore(Protocol):
+    """Backend for sharing access tokens between processes."""
+
+    def load(self, key: str) -> Optional[tuple[str, datetime]]: ...
+
+    def save(self, key: str, token: str, expires_at: datetime) -> None: ...
+
+    def lock(self, key: str) -> ContextManager[None]:
+        """Exclusive, blocking lock held while one process refreshes the token."""
+        ...
+
+
+class MemoryTokenStore:
+    """Per-process store (the old behaviour); useful for tests."""
+
+    def __init__(self) -> None:
+        self._tokens: dict[str, tuple[str, datetime]] = {}
+        self._locks: dict[str, threading.Lock] = {}
+
+    def load(self, key: str) -> Optional[tuple[str, datetime]]:
+        return self._tokens.get(key)
+
+    def save(self, key: str, token: str, expires_at: datetime) -> None:
+        self._tokens[key] = (token, expires_at)
+
+    @contextmanager
+    def lock(self, key: str) -> Iterator[None]:
+        with self._locks.setdefault(key, threading.Lock()):
+            yield
+
+
+class FileTokenStore:
+    """JSON file per key plus an OS file lock; shared by every worker on the host."""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _file(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.json")
+
+    def load(self, key: str) -> Optional[tuple[str, datetime]]:
+        try:
+            with open(self._file(key), "r", encoding="utf-8") as f:
+                data = json.load(f)
+            return data["access_token"], datetime.fromisoformat(data["expires_at"])
+        except Exception:
+            return None
+
+    def save(self, key: str, token: str, expires_at: datetime) -> None:
+        p = self._file(key)
+        tmp = f"{p}.tmp-{os.getpid()}"
+        fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump({"access_token": token, "expires_at": expires_at.isoformat()}, f)
+        os.replace(tmp, p)
+
+    @contextmanager
+    def lock(self, key: str) -> Iterator[None]:
+        fd = os.open(os.path.join(self.directory, f"{key}.lock"), os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+            else:
+                msvcrt.locking(fd, msvcrt.LK_LOCK, 1)
+            yield
+        finally:
+            try:
+                if fcntl is not None:
+                    fcntl.flock(fd, fcntl.LOCK_UN)
+                else:
+                    msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+            finally:
+                os.close(fd)
+
+
+def default_store() -> FileTokenStore:
+    from core.utils.cache import BASE
+    return FileTokenStore(os.getenv("KIS_TOKEN_DIR", os.path.join(BASE, "tokens")))
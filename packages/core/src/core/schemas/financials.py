@@ -14,4 +14,5 @@ class FinancialStatement(BaseModel):
     corp_code: str
     year: int
     report_name: Optional[str] = None
-    rows: List[FSRow] = []
\ No newline at end of file
+    rows: List[FSRow] = []
+    stale: bool = False  # served from an expired cache entry while it is refreshed
\ No newline at end of file
@@ -13,4 +13,5 @@ class PricePoint(BaseModel):
 
 class PriceSeries(BaseModel):
     ticker: str
-    points: List[PricePoint] = []
\ No newline at end of file
+    points: List[PricePoint] = []
+    stale: bool = False  # served from an expired cache entry while it is refreshed
\ No newline at end of file
@@ -3,6 +3,7 @@ import logging
 from typing import Dict, Any
 import numpy as np
 import pandas as pd
+from core.services.fs_view import StatementView, as_view, coerce_number as _coerce_number
 
 logger = logging.getLogger(__name__)
 
@@ -10,33 +11,9 @@ logger = logging.getLogger(__name__)
 # Internal helpers
 # -----------------------------
 
-def _coerce_number(value: Any) -> float:
-    """Convert DART numeric strings like "1,234" → float, else NaN."""
-    try:
-        if value is None or (isinstance(value, float) and np.isnan(value)):
-            return np.nan
-        s = str(value).replace(",", "").strip()
-        if s == "" or s.lower() == "nan":
-            return np.nan
-        return float(s)
-    except Exception:
-        return np.nan
-
-
-def _get_account_value(fs_df: pd.DataFrame, account_name: str) -> float:
-    """Safely extract `thstrm_amount` for an exact account name from DART FS df."""
-    if fs_df is None or fs_df.empty:
-        return np.nan
-    if "account_nm" not in fs_df.columns:
-        return np.nan
-    try:
-        row = fs_df[fs_df["account_nm"] == account_name]
-        if row.empty:
-            return np.nan
-        value = row.iloc[0].get("thstrm_amount")
-        return _coerce_number(value)
-    except Exception:
-        return np.nan
+def _get_account_value(fs: pd.DataFrame | StatementView, account_name: str) -> float:
+    """`thstrm_amount` for an exact account name (build a StatementView once for many lookups)."""
+    return as_view(fs).get(account_name)
 
 
 # -----------------------------
@@ -68,7 +45,7 @@ def rim_intrinsic_price(*, bps: float, roe: float, cost_of_equity: float, growth
     return float(intrinsic / shares) if shares else float("nan")
 
 
-def calculate_financial_health(fs_df: pd.DataFrame) -> Dict[str, float | str]:
+def calculate_financial_health(fs_df: pd.DataFrame | StatementView) -> Dict[str, float | str]:
     """Compute debt/current ratios, ROE, op margin, interest coverage, Z-score-ish, score & grade."""
     if fs_df is None or fs_df.empty:
         return {
@@ -76,15 +53,16 @@ def calculate_financial_health(fs_df: pd.DataFrame) -> Dict[str, float | str]:
             "interest_coverage": np.nan, "z_score": np.nan, "total_score": np.nan, "grade": "N/A"
         }
 
-    total_assets = _get_account_value(fs_df, "자산총계")
-    total_liabilities = _get_account_value(fs_df, "부채총계")
-    equity = _get_account_value(fs_df, "자본총계")
-    current_assets = _get_account_value(fs_df, "유동자산")
-    current_liabilities = _get_account_value(fs_df, "유동부채")
-    revenue = _get_account_value(fs_df, "매출액")
-    operating_income = _get_account_value(fs_df, "영업이익")
-    net_income = _get_account_value(fs_df, "당기순이익")
-    interest_expense = _get_account_value(fs_df, "이자비용")
+    fs = as_view(fs_df)
+    total_assets = fs.get("자산총계")
+    total_liabilities = fs.get("부채총계")
+    equity = fs.get("자본총계")
+    current_assets = fs.get("유동자산")
+    current_liabilities = fs.get("유동부채")
+    revenue = fs.get("매출액")
+    operating_income = fs.get("영업이익")
+    net_income = fs.get("당기순이익")
+    interest_expense = fs.get("이자비용")
 
     debt_ratio = (total_liabilities / equity) * 100.0 if equity else np.nan
     current_ratio = (current_assets / current_liabilities) * 100.0 if current_liabilities else np.nan
@@ -145,7 +123,80 @@ def calculate_financial_health(fs_df: pd.DataFrame) -> Dict[str, float | str]:
     }
 
 
-def calculate_custom_ratios(fs_df: pd.DataFrame, price_df: pd.DataFrame) -> Dict[str, float]:
+HEALTH_ACCOUNTS = ["자산총계", "부채총계", "자본총계", "유동자산", "유동부채", "매출액", "영업이익", "당기순이익", "이자비용"]
+HEALTH_KEYS = ["debt_ratio", "current_ratio", "roe", "op_margin", "interest_coverage", "z_score", "total_score", "grade"]
+
+
+def calculate_financial_health_batch(fs_df: pd.DataFrame, *, key: str = "corp_code") -> pd.DataFrame:
+    """`calculate_financial_health` for many companies at once.
+
+    `fs_df` holds long DART rows for N companies, told apart by `key`. Rows are pivoted
+    into one (company x account) matrix and every ratio is computed column-wise; results
+    are identical to calling the single-company function per group. Returns one row per
+    company (index = `key`, in order of first appearance) with the same fields.
+    """
+    if fs_df is None or fs_df.empty or key not in fs_df.columns:
+        return pd.DataFrame(columns=HEALTH_KEYS)
+
+    companies = pd.Index(pd.unique(fs_df[key]), name=key)
+    if {"account_nm", "thstrm_amount"} <= set(fs_df.columns):
+        rows = fs_df.loc[fs_df["account_nm"].isin(HEALTH_ACCOUNTS), [key, "account_nm", "thstrm_amount"]]
+        rows = rows.drop_duplicates([key, "account_nm"], keep="first")  # first match wins, as in _get_account_value
+        rows = rows.assign(value=rows["thstrm_amount"].map(_coerce_number))
+        wide = rows.pivot(index=key, columns="account_nm", values="value")
+    else:
+        wide = pd.DataFrame()
+    wide = wide.reindex(index=companies, columns=HEALTH_ACCOUNTS).astype(float)
+
+    ta, tl, eq, ca, cl, rev, oi, ni, ie = (wide[c].to_numpy() for c in HEALTH_ACCOUNTS)
+    nan = np.nan
+
+    def div(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+        # NaN or 0 denominator → NaN (matches `x if b else nan` and `safe_div`)
+        ok = (b != 0) & ~np.isnan(b)
+        return np.where(ok, a / np.where(ok, b, 1.0), nan)
+
+    def nz(x: np.ndarray) -> np.ndarray:
+        return np.where(np.isnan(x), 0.0, x)
+
+    with np.errstate(all="ignore"):
+        # `(a / b) * 100.0 if b else nan`: a NaN denominator is truthy and yields NaN
+        debt_ratio = np.where(eq != 0, (tl / eq) * 100.0, nan)
+        current_ratio = np.where(cl != 0, (ca / cl) * 100.0, nan)
+        roe = np.where(eq != 0, (ni / eq) * 100.0, nan)
+        op_margin = np.where(rev != 0, (oi / rev) * 100.0, nan)
+        interest_coverage = np.where(ie != 0, oi / ie, nan)
+
+        wca = div(ca - cl, ta)
+        rea = div(eq, ta)
+        eita = div(oi, ta)
+        mvel = div(eq, tl)
+        sta = div(rev, ta)
+        parts = np.vstack([wca, rea, eita, mvel, sta])
+        z_score = np.where(
+            np.isnan(parts).all(axis=0), nan,
+            (1.2 * nz(wca)) + (1.4 * nz(rea)) + (3.3 * nz(eita)) + (0.6 * nz(mvel)) + (1.0 * nz(sta)),
+        )
+
+        s_debt = np.clip(100.0 - np.where(np.isnan(debt_ratio), 100.0, debt_ratio), 0.0, 100.0)
+        s_current = np.clip(nz(current_ratio), 0.0, 100.0)
+        s_roe = np.clip(nz(roe), 0.0, 100.0)
+        s_op = np.clip(nz(op_margin), 0.0, 100.0)
+        s_ic = np.clip(np.where(np.isnan(interest_coverage), 0.0, interest_coverage * 10.0), 0.0, 100.0)
+        s_z = np.clip(np.where(np.isnan(z_score), 0.0, z_score * 20.0), 0.0, 100.0)
+        total_score = (
+            (s_debt * 0.2) + (s_current * 0.2) + (s_roe * 0.2) +
+            (s_op * 0.15) + (s_ic * 0.15) + (s_z * 0.1)
+        )
+
+    grade = np.select([np.isnan(total_score), total_score >= 80.0, total_score >= 60.0], ["N/A", "A", "B"], "C")
+    return pd.DataFrame({
+        "debt_ratio": debt_ratio, "current_ratio": current_ratio, "roe": roe, "op_margin": op_margin,
+        "interest_coverage": interest_coverage, "z_score": z_score, "total_score": total_score, "grade": grade,
+    }, index=companies)
+
+
+def calculate_custom_ratios(fs_df: pd.DataFrame | StatementView, price_df: pd.DataFrame) -> Dict[str, float]:
     """Compute PER, PBR, dividend yield from FS + latest price."""
     if fs_df is None or fs_df.empty or price_df is None or price_df.empty:
         return {"PER": np.nan, "PBR": np.nan, "배당수익률(%)": np.nan}
@@ -155,10 +206,11 @@ def calculate_custom_ratios(fs_df: pd.DataFrame, price_df: pd.DataFrame) -> Dict
     if np.isnan(latest_price):
         return {"PER": np.nan, "PBR": np.nan, "배당수익률(%)": np.nan}
 
-    shares_outstanding = _get_account_value(fs_df, "발행주식수")
-    net_income = _get_account_value(fs_df, "당기순이익")
-    total_equity = _get_account_value(fs_df, "자본총계")
-    dividends = _get_account_value(fs_df, "배당금총액")
+    fs = as_view(fs_df)
+    shares_outstanding = fs.get("발행주식수")
+    net_income = fs.get("당기순이익")
+    total_equity = fs.get("자본총계")
+    dividends = fs.get("배당금총액")
 
     market_cap = latest_price * shares_outstanding if (not np.isnan(latest_price) and not np.isnan(shares_outstanding)) else np.nan
     per = (market_cap / net_income) if (not np.isnan(market_cap) and not np.isnan(net_income) and net_income != 0) else np.nan
@@ -184,22 +236,17 @@ def compare_by_industry(df: pd.DataFrame) -> pd.DataFrame:
     return df.groupby("업종")[numeric_cols].mean()
 
 
-def extract_fs_summary(fs_df: pd.DataFrame) -> Dict[str, float]:
+def extract_fs_summary(fs_df: pd.DataFrame | StatementView) -> Dict[str, float]:
     """Pick a few headline FS metrics for a card view."""
     if fs_df is None or fs_df.empty:
         return {"매출액": np.nan, "영업이익": np.nan, "당기순이익": np.nan, "총자산": np.nan, "총부채": np.nan, "자본총계": np.nan}
 
+    fs = as_view(fs_df)
+
     def pick(key: str) -> float:
         # use exact match first; fallback to contains
-        v = _get_account_value(fs_df, key)
-        if np.isnan(v):
-            try:
-                row = fs_df[fs_df["account_nm"].str.contains(key, na=False, regex=False)]
-                if not row.empty:
-                    return _coerce_number(row.iloc[0].get("thstrm_amount"))
-            except Exception:
-                pass
-        return v
+        v = fs.get(key)
+        return fs.find(key) if np.isnan(v) else v
 
     return {
         "매출액": pick("매출액"),
@@ -208,4 +255,4 @@ def extract_fs_summary(fs_df: pd.DataFrame) -> Dict[str, float]:
         "총자산": pick("자산총계"),
         "총부채": pick("부채총계"),
         "자본총계": pick("자본총계"),
-    }
\ No newline at end of file
+    }
@@ -0,0 +1,87 @@
+from __future__ import annotations
+from typing import Any, Iterable
+import numpy as np
+import pandas as pd
+from core.schemas.financials import FinancialStatement
+
+
+def coerce_number(value: Any) -> float:
+    """Convert DART numeric strings like "1,234" → float, else NaN."""
+    try:
+        if value is None or (isinstance(value, float) and np.isnan(value)):
+            return np.nan
+        s = str(value).replace(",", "").strip()
+        if s == "" or s.lower() == "nan":
+            return np.nan
+        return float(s)
+    except Exception:
+        return np.nan
+
+
+class StatementView:
+    """Account → `thstrm_amount` lookup for one statement, built in a single pass.
+
+    Keyed by both `account_nm` and `account_id`; the first row for a key wins (same as
+    `df[df["account_nm"] == name].iloc[0]`). Values are already coerced to float.
+    """
+
+    __slots__ = ("_by_nm", "_by_id")
+
+    def __init__(self, by_nm: dict[str, float], by_id: dict[str, float]):
+        self._by_nm = by_nm
+        self._by_id = by_id
+
+    @classmethod
+    def from_records(cls, records: Iterable[tuple[Any, Any, Any]]) -> "StatementView":
+        """Build from `(account_nm, account_id, thstrm_amount)` triples in row order."""
+        by_nm: dict[str, float] = {}
+        by_id: dict[str, float] = {}
+        for nm, aid, amount in records:
+            if (isinstance(nm, str) and nm not in by_nm) or (isinstance(aid, str) and aid not in by_id):
+                v = coerce_number(amount)
+                if isinstance(nm, str):
+                    by_nm.setdefault(nm, v)
+                if isinstance(aid, str):
+                    by_id.setdefault(aid, v)
+        return cls(by_nm, by_id)
+
+    @classmethod
+    def from_df(cls, fs_df: pd.DataFrame | None) -> "StatementView":
+        if fs_df is None or fs_df.empty:
+            return cls({}, {})
+        n = len(fs_df)
+        col = lambda c: fs_df[c].tolist() if c in fs_df.columns else [None] * n
+        return cls.from_records(zip(col("account_nm"), col("account_id"), col("thstrm_amount")))
+
+    @classmethod
+    def from_statement(cls, fs: FinancialStatement) -> "StatementView":
+        return cls.from_records((r.account_nm, r.account_id, r.thstrm_amount) for r in fs.rows)
+
+    @property
+    def empty(self) -> bool:
+        return not self._by_nm and not self._by_id
+
+    def __len__(self) -> int:
+        return len(self._by_nm)
+
+    def get(self, account: str) -> float:
+        """Value for an exact account name, else account id, else NaN."""
+        v = self._by_nm.get(account)
+        if v is None:
+            v = self._by_id.get(account)
+        return np.nan if v is None else v
+
+    def find(self, fragment: str) -> float:
+        """Value of the first account whose name contains `fragment`, else NaN."""
+        for nm, v in self._by_nm.items():
+            if fragment in nm:
+                return v
+        return np.nan
+
+
+def as_view(fs: pd.DataFrame | StatementView | FinancialStatement | None) -> StatementView:
+    if isinstance(fs, StatementView):
+        return fs
+    if isinstance(fs, FinancialStatement):
+        return StatementView.from_statement(fs)
+    return StatementView.from_df(fs)
@@ -0,0 +1,495 @@
+"""Background jobs for work that outlives an HTTP request (big optimisations, price
+backfills, watchlist reports).
+
+Jobs live in SQLite (``jobs/jobs.sqlite3`` under the cache dir), so status, progress
+and results survive restarts:
+
+- ``submit`` dedupes by input hash: a finished job whose result is still valid (until
+  the next KRX close) is returned as-is, a queued/running one is joined. Results a
+  task marks ``partial`` (some upstream call failed) are never reused.
+- Runner workers claim queued jobs atomically, so several API processes can share
+  one database. Upstream calls run at background priority.
+- A claimed job carries its runner's lease, renewed by a heartbeat. Jobs whose lease
+  ran out (the process died) are queued again by whichever runner notices; a live
+  process's jobs are never touched. Tasks checkpoint what they finished, and the
+  price store / warehouse make redone fetches cheap.
+- SQLite calls run in a thread, never on the event loop.
+- Cancel stops a queued job at once and a running one at its next progress report.
+"""
+from __future__ import annotations
+import asyncio
+import hashlib
+import json
+import logging
+import math
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, List, Optional
+import numpy as np
+import pandas as pd
+from pydantic import BaseModel, Field
+from core.clients import ratelimit
+from core.clients.registry import MissingCredentialsError, UpstreamClients
+from core.services.analysis import calculate_financial_health, extract_fs_summary
+from core.services.fs_view import StatementView
+from core.services.lookup import directory
+from core.services.market_data import dart_financials, kis_daily_price, kis_investment_opinion, kis_prices_panel
+from core.services.portfolio import DEFAULT_RISK_FREE_RATE, optimize_portfolio
+from core.utils import compute, krx_calendar
+from core.utils.cache import path, load_parquet, save_parquet
+
+logger = logging.getLogger(__name__)
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+MAX_ATTEMPTS = 3               # interrupted by this many restarts → failed
+POLL_SECONDS = 5.0             # pick up jobs submitted by other processes
+PROGRESS_EVERY = 0.5           # seconds between progress writes
+LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", "60"))  # heartbeat renews every third of this
+KEEP_DAYS = int(os.getenv("JOB_KEEP_DAYS", "7"))
+
+QUEUED, RUNNING, DONE, FAILED, CANCELLED = "queued", "running", "done", "failed", "cancelled"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    params TEXT NOT NULL,
+    input_hash TEXT NOT NULL,
+    status TEXT NOT NULL,
+    progress REAL NOT NULL DEFAULT 0,
+    message TEXT,
+    checkpoint TEXT,
+    result TEXT,
+    error TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    cancel_requested INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    valid_until REAL,
+    owner TEXT,
+    lease_until REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_hash ON jobs (input_hash, status);
+CREATE INDEX IF NOT EXISTS jobs_queue ON jobs (status, created_at);
+"""
+
+
+class JobCancelled(Exception):
+    pass
+
+
+# -----------------------------
+# Store
+# -----------------------------
+
+def _row(r: sqlite3.Row | None) -> dict[str, Any] | None:
+    if r is None:
+        return None
+    d = dict(r)
+    for k in ("params", "checkpoint", "result"):
+        d[k] = json.loads(d[k]) if d[k] else None
+    return d
+
+
+class JobStore:
+    def __init__(self, db_path: str | None = None):
+        self.db_path = db_path or path("jobs", "jobs.sqlite3")
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None, timeout=10)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(_SCHEMA)
+        cols = {r[1] for r in self._db.execute("PRAGMA table_info(jobs)")}
+        for col, decl in (("owner", "TEXT"), ("lease_until", "REAL")):  # db from before leases
+            if col not in cols:
+                self._db.execute(f"ALTER TABLE jobs ADD COLUMN {col} {decl}")
+
+    def _exec(self, sql: str, args: tuple = ()) -> list[sqlite3.Row]:
+        with self._lock:
+            return self._db.execute(sql, args).fetchall()
+
+    def get(self, job_id: str) -> dict[str, Any] | None:
+        rows = self._exec("SELECT * FROM jobs WHERE id = ?", (job_id,))
+        return _row(rows[0]) if rows else None
+
+    def list(self, status: str | None = None, limit: int = 50) -> list[dict[str, Any]]:
+        sql, args = "SELECT * FROM jobs", ()
+        if status:
+            sql, args = sql + " WHERE status = ?", (status,)
+        return [_row(r) for r in self._exec(sql + " ORDER BY created_at DESC LIMIT ?", args + (limit,))]
+
+    def reusable(self, input_hash: str) -> dict[str, Any] | None:
+        """A job with the same input that is pending, or done with a still-valid result."""
+        rows = self._exec(
+            "SELECT * FROM jobs WHERE input_hash = ? AND (status IN (?, ?) OR (status = ? AND valid_until > ?))"
+            " ORDER BY created_at DESC LIMIT 1", (input_hash, QUEUED, RUNNING, DONE, time.time()))
+        return _row(rows[0]) if rows else None
+
+    def insert(self, kind: str, params: dict, input_hash: str) -> dict[str, Any]:
+        job_id = uuid.uuid4().hex
+        self._exec("INSERT INTO jobs (id, kind, params, input_hash, status, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+                   (job_id, kind, json.dumps(params, ensure_ascii=False), input_hash, QUEUED, time.time()))
+        return self.get(job_id)
+
+    def claim(self, owner: str) -> dict[str, Any] | None:
+        now = time.time()
+        rows = self._exec(
+            "UPDATE jobs SET status = ?, started_at = ?, attempts = attempts + 1, owner = ?, lease_until = ?"
+            " WHERE id = (SELECT id FROM jobs WHERE status = ? ORDER BY created_at LIMIT 1) AND status = ?"
+            " RETURNING *", (RUNNING, now, owner, now + LEASE_SECONDS, QUEUED, QUEUED))
+        return _row(rows[0]) if rows else None
+
+    def renew(self, owner: str) -> int:
+        """Extend the lease on every job ``owner`` is running."""
+        return len(self._exec("UPDATE jobs SET lease_until = ? WHERE owner = ? AND status = ? RETURNING id",
+                              (time.time() + LEASE_SECONDS, owner, RUNNING)))
+
+    def progress(self, job_id: str, progress: float, message: str | None, checkpoint: dict | None) -> bool:
+        """Record progress; returns True when a cancel was requested."""
+        cp = json.dumps(checkpoint, ensure_ascii=False) if checkpoint is not None else None
+        rows = self._exec("UPDATE jobs SET progress = ?, message = COALESCE(?, message),"
+                          " checkpoint = COALESCE(?, checkpoint) WHERE id = ? RETURNING cancel_requested",
+                          (progress, message, cp, job_id))
+        return bool(rows and rows[0][0])
+
+    def finish(self, job_id: str, owner: str, status: str, *, result: Any = None, error: str | None = None,
+               valid_until: datetime | None = None) -> None:
+        """Close a job this runner owns; a no-op if the lease was lost and it moved on."""
+        self._exec("UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ?, valid_until = ?,"
+                   " lease_until = NULL, progress = CASE WHEN ? = 'done' THEN 1 ELSE progress END"
+                   " WHERE id = ? AND owner = ? AND status = ?",
+                   (status, json.dumps(result, ensure_ascii=False) if result is not None else None, error,
+                    time.time(), valid_until.timestamp() if valid_until else None, status, job_id, owner, RUNNING))
+
+    def request_cancel(self, job_id: str) -> dict[str, Any] | None:
+        self._exec("UPDATE jobs SET status = ?, finished_at = ? WHERE id = ? AND status = ?",
+                   (CANCELLED, time.time(), job_id, QUEUED))
+        self._exec("UPDATE jobs SET cancel_requested = 1 WHERE id = ? AND status = ?", (job_id, RUNNING))
+        return self.get(job_id)
+
+    def requeue_expired(self) -> int:
+        """Jobs whose runner stopped renewing go back to the queue (or fail if they keep dying)."""
+        now = time.time()
+        expired = "status = ? AND (lease_until IS NULL OR lease_until < ?)"
+        self._exec(f"UPDATE jobs SET status = ?, error = 'interrupted too many times', finished_at = ?,"
+                   f" lease_until = NULL WHERE {expired} AND attempts >= ?", (FAILED, now, RUNNING, now, MAX_ATTEMPTS))
+        return len(self._exec(f"UPDATE jobs SET status = ?, owner = NULL, lease_until = NULL WHERE {expired}"
+                              " RETURNING id", (QUEUED, RUNNING, now)))
+
+    def release(self, owner: str) -> int:
+        """Hand ``owner``'s running jobs back to the queue at once (clean shutdown)."""
+        return len(self._exec("UPDATE jobs SET status = ?, owner = NULL, lease_until = NULL"
+                              " WHERE owner = ? AND status = ? RETURNING id", (QUEUED, owner, RUNNING)))
+
+    def counts(self) -> dict[str, int]:
+        return {r[0]: r[1] for r in self._exec("SELECT status, COUNT(*) FROM jobs GROUP BY status")}
+
+    def prune(self, keep_days: int = KEEP_DAYS) -> int:
+        cutoff = time.time() - keep_days * 86400
+        rows = self._exec("DELETE FROM jobs WHERE status IN (?, ?, ?) AND finished_at < ? RETURNING id, result",
+                          (DONE, FAILED, CANCELLED, cutoff))
+        for r in rows:
+            frame = (json.loads(r["result"]) or {}).get("frame") if r["result"] else None
+            if frame:
+                try:
+                    os.remove(path("jobs", frame))
+                except FileNotFoundError:
+                    pass
+        return len(rows)
+
+
+# -----------------------------
+# Tasks
+# -----------------------------
+
+@dataclass
+class JobContext:
+    job_id: str
+    store: JobStore
+    upstreams: UpstreamClients
+    checkpoint: dict
+    _last: float = 0.0
+
+    async def report(self, progress: float, message: str | None = None, *, force: bool = False,
+                     **checkpoint) -> None:
+        """Record progress (throttled) and any state to resume from; raises JobCancelled
+        once the job was cancelled."""
+        self.checkpoint.update(checkpoint)
+        now = time.monotonic()
+        if not (force or checkpoint or now - self._last >= PROGRESS_EVERY):
+            return
+        self._last = now
+        if await asyncio.to_thread(self.store.progress, self.job_id, round(progress, 4), message,
+                                   dict(self.checkpoint) if checkpoint else None):
+            raise JobCancelled()
+
+
+@dataclass
+class Task:
+    fn: Callable[[JobContext, Any], Awaitable[Any]]
+    params: type[BaseModel]
+
+
+TASKS: dict[str, Task] = {}
+
+
+def task(kind: str, params: type[BaseModel]):
+    def deco(fn):
+        TASKS[kind] = Task(fn, params)
+        return fn
+    return deco
+
+
+def _clean(v: Any) -> Any:
+    """JSON-safe: NaN/inf → None, numpy scalars → Python."""
+    if isinstance(v, dict):
+        return {k: _clean(x) for k, x in v.items()}
+    if isinstance(v, (list, tuple, np.ndarray)):
+        return [_clean(x) for x in v]
+    if isinstance(v, np.generic):
+        v = v.item()
+    if isinstance(v, float) and not math.isfinite(v):
+        return None
+    return v
+
+
+def _save_frame(job_id: str, df: pd.DataFrame) -> dict[str, Any]:
+    rel = os.path.join("results", f"{job_id}.parquet")
+    save_parquet(df.reset_index(names="date"), path("jobs", rel))
+    return {"frame": rel, "rows": len(df), "columns": list(df.columns)}
+
+
+def load_frame(result: dict[str, Any]) -> pd.DataFrame | None:
+    df = load_parquet(path("jobs", result["frame"]))
+    return None if df is None else df.set_index("date")
+
+
+class PricesPanelParams(BaseModel):
+    tickers: List[str] = Field(min_length=1)
+    start_date: str
+    end_date: str
+
+
+class OptimizeParams(PricesPanelParams):
+    risk_free: float = DEFAULT_RISK_FREE_RATE
+
+
+class ReportParams(BaseModel):
+    stock_codes: List[str] = Field(min_length=1)
+    year: Optional[int] = None  # 기본: 전년도 사업보고서
+
+
+async def _panel(ctx: JobContext, p: PricesPanelParams, share: float = 1.0) -> pd.DataFrame:
+    async def on_progress(done: int, total: int) -> None:
+        await ctx.report(share * done / total, f"prices {done}/{total}")
+    return await kis_prices_panel(ctx.upstreams.kis, p.tickers, p.start_date, p.end_date,
+                                  on_progress=on_progress)
+
+
+@task("prices_panel", PricesPanelParams)
+async def _prices_panel(ctx: JobContext, p: PricesPanelParams) -> dict[str, Any]:
+    """Daily returns for many tickers (backfills go to the price store)."""
+    return _save_frame(ctx.job_id, await _panel(ctx, p))
+
+
+@task("optimize", OptimizeParams)
+async def _optimize(ctx: JobContext, p: OptimizeParams) -> dict[str, Any]:
+    """Max-Sharpe weights over a large universe (prices, then the compute pool)."""
+    rets = await _panel(ctx, p, share=0.8)
+    if rets is None or rets.empty:
+        raise ValueError("no returns data")
+    await ctx.report(0.8, "optimizing", force=True)
+    result = await compute.run(optimize_portfolio, rets, risk_free_rate=p.risk_free,
+                               timeout=max(compute.pool.timeout, 120.0))
+    if not result.get("success"):
+        raise ValueError("optimization failed")
+    return _clean({**result, "tickers": list(rets.columns)})
+
+
+async def _company_report(ctx: JobContext, code: str, year: int) -> dict[str, Any]:
+    out: dict[str, Any] = {"stock_code": code}
+    info = await directory.by_stock(code, ctx.upstreams.dart)
+    if info is None:
+        return {**out, "error": "unknown stock_code"}
+    out.update(info)
+    fs = await dart_financials(ctx.upstreams.dart, info["corp_code"], year)
+    view = StatementView.from_statement(fs) if fs else StatementView.from_df(None)
+    out["report_name"] = fs.report_name if fs else None
+    out["summary"] = extract_fs_summary(view)
+    out["health"] = calculate_financial_health(view)
+    try:
+        kis = ctx.upstreams.kis
+    except MissingCredentialsError:
+        return _clean(out)  # KIS 키 없음: 재무 부분만
+    end = datetime.now(krx_calendar.KST).date()
+    px = await kis_daily_price(kis, code, str(end - timedelta(days=365)), str(end))
+    close = px["close"].astype(float) if px is not None and not px.empty else pd.Series(dtype=float)
+    if len(close) > 1:
+        rets = close.pct_change().dropna()
+        out["price"] = {"last": close.iloc[-1], "return_1y": close.iloc[-1] / close.iloc[0] - 1,
+                        "volatility_1y": rets.std() * np.sqrt(252)}
+    out["opinion"] = await kis_investment_opinion(kis, code)
+    return _clean(out)
+
+
+@task("report", ReportParams)
+async def _report(ctx: JobContext, p: ReportParams) -> dict[str, Any]:
+    """Per-company summary, health score, 1y price stats and opinion for a watchlist.
+    Finished companies are checkpointed, so a resumed job skips them. A company whose
+    upstream calls failed (circuit open, KIS/DART errors) is reported with its error
+    and makes the whole result partial."""
+    year = p.year or datetime.now().year - 1
+    done: dict[str, Any] = dict(ctx.checkpoint.get("reports", {}))
+    for i, code in enumerate(p.stock_codes):
+        if code not in done:
+            try:
+                done[code] = await _company_report(ctx, code, year)
+            except JobCancelled:
+                raise
+            except Exception as e:
+                done[code] = {"stock_code": code, "error": repr(e), "partial": True}
+            await ctx.report((i + 1) / len(p.stock_codes), f"{i + 1}/{len(p.stock_codes)}", reports=done)
+    companies = [done[c] for c in p.stock_codes]
+    return {"year": year, "companies": companies, "partial": any(c.get("partial") for c in companies)}
+
+
+def input_hash(kind: str, params: BaseModel) -> str:
+    blob = json.dumps({"kind": kind, "params": params.model_dump()}, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(blob.encode()).hexdigest()
+
+
+# -----------------------------
+# Runner
+# -----------------------------
+
+class JobRunner:
+    def __init__(self, workers: int = JOB_WORKERS):
+        self.workers = workers
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self._store: JobStore | None = None
+        self._upstreams: UpstreamClients | None = None
+        self._wake = asyncio.Event()
+        self._tasks: list[asyncio.Task] = []
+        self._running: dict[str, asyncio.Task] = {}
+
+    @property
+    def store(self) -> JobStore:
+        if self._store is None:
+            self._store = JobStore()
+        return self._store
+
+    async def call(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """A store method, off the event loop."""
+        return await asyncio.to_thread(fn, *args, **kwargs)
+
+    def start(self, upstreams: UpstreamClients) -> None:
+        self._upstreams = upstreams
+        self._tasks = [asyncio.create_task(self._heartbeat())]
+        self._tasks += [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    def stop(self) -> None:
+        for t in self._tasks:
+            t.cancel()
+        self._tasks = []
+        if self._store is not None:
+            # our running jobs are resumed by the next runner, without waiting out the lease
+            self.store.release(self.owner)
+
+    async def submit(self, kind: str, params: dict[str, Any]) -> tuple[dict[str, Any], bool]:
+        """Queue a job (``params`` validated against the task's model; raises
+        ``pydantic.ValidationError``). Returns ``(job, reused)``."""
+        if kind not in TASKS:
+            raise KeyError(kind)
+        model = TASKS[kind].params.model_validate(params)
+        h = input_hash(kind, model)
+        existing = await self.call(self.store.reusable, h)
+        if existing is not None:
+            return existing, True
+        job = await self.call(self.store.insert, kind, model.model_dump(), h)
+        self._wake.set()
+        return job, False
+
+    async def cancel(self, job_id: str) -> dict[str, Any] | None:
+        job = await self.call(self.store.request_cancel, job_id)
+        t = self._running.get(job_id)
+        if t is not None:
+            t.cancel()
+        return job
+
+    async def _heartbeat(self) -> None:
+        """Renew our leases; requeue jobs of runners that died (here or elsewhere)."""
+        await self.call(self.store.prune)
+        while True:
+            try:
+                await self.call(self.store.renew, self.owner)
+                n = await self.call(self.store.requeue_expired)
+                if n:
+                    logger.info("resuming %d interrupted job(s)", n)
+                    self._wake.set()
+            except sqlite3.Error:
+                logger.exception("job heartbeat failed")
+            await asyncio.sleep(LEASE_SECONDS / 3)
+
+    async def _worker(self) -> None:
+        while True:
+            job = await self.call(self.store.claim, self.owner)
+            if job is None:
+                self._wake.clear()
+                try:
+                    await asyncio.wait_for(self._wake.wait(), POLL_SECONDS)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            t = asyncio.create_task(self._execute(job))
+            self._running[job["id"]] = t
+            try:
+                await asyncio.shield(t)
+            except asyncio.CancelledError:
+                if not t.done():  # runner stopping: stop() hands the job back to the queue
+                    t.cancel()
+                    raise
+            finally:
+                self._running.pop(job["id"], None)
+
+    async def _execute(self, job: dict[str, Any]) -> None:
+        spec = TASKS.get(job["kind"])
+        store, owner = self.store, self.owner
+        if spec is None:
+            await self.call(store.finish, job["id"], owner, FAILED, error=f"unknown job kind {job['kind']!r}")
+            return
+        ctx = JobContext(job["id"], store, self._upstreams, dict(job["checkpoint"] or {}))
+        t0 = time.monotonic()
+        try:
+            with ratelimit.priority(ratelimit.PRIORITY_BACKGROUND):
+                result = await spec.fn(ctx, spec.params.model_validate(job["params"]))
+        except (JobCancelled, asyncio.CancelledError):
+            current = await asyncio.shield(self.call(store.get, job["id"]))
+            if current and (current["cancel_requested"] or current["status"] == CANCELLED):
+                await asyncio.shield(self.call(store.finish, job["id"], owner, CANCELLED))
+                return
+            raise
+        except Exception as e:
+            logger.warning("job %s (%s) failed: %r", job["id"], job["kind"], e)
+            await self.call(store.finish, job["id"], owner, FAILED, error=str(e) or repr(e))
+            return
+        partial = isinstance(result, dict) and result.get("partial")
+        await self.call(store.finish, job["id"], owner, DONE, result=result,  # partial: not reusable
+                        valid_until=None if partial else krx_calendar.daily_valid_until(datetime.now(krx_calendar.KST)))
+        logger.info("job %s (%s) done in %.1fs", job["id"], job["kind"], time.monotonic() - t0)
+
+    async def snapshot(self) -> dict[str, Any]:
+        if self._store is None:
+            return {"started": False}
+        return {"started": bool(self._tasks), "workers": self.workers, "running_here": len(self._running),
+                **await self.call(self.store.counts)}
+
+
+runner = JobRunner()
@@ -1,65 +1,524 @@
 from __future__ import annotations
-import io, zipfile, os
+import io, zipfile, os, time, asyncio, logging, heapq, tempfile
+import xml.etree.ElementTree as ET
+from bisect import bisect_left
+from collections import Counter
+from dataclasses import dataclass, replace
+from datetime import date, datetime
+from typing import IO, Any
 import pandas as pd
-import httpx
 from fastapi import HTTPException
-from core.utils.cache import path, fresh, save_parquet, load_parquet
+from core.clients.dart import DARTClient
+from core.clients.krx import KRXClient
+from core.utils.cache import path, save_parquet, load_parquet, save_json, load_json
+from core.utils.singleflight import SingleFlight
+from core.utils import hangul
+from core.utils.krx_calendar import KST, last_completed_session, next_close
+
+logger = logging.getLogger(__name__)
+
+# -----------------------------
+# Corp table ingestion (DART corpCode.xml)
+# -----------------------------
+
+CORP_COLUMNS = ["corp_code", "corp_name", "stock_code"]
+VERSIONS_KEEP = int(os.getenv("CORP_TABLE_VERSIONS_KEEP", "14"))
+
+
+def _table_path() -> str:
+    return path("corp_codes", "corp_code_list.parquet")
+
+
+def _version_path(version: int, suffix: str) -> str:
+    return path("corp_codes", "versions", f"{version:06d}{suffix}")
+
+
+def parse_corp_codes(src: str | IO[bytes]) -> pd.DataFrame:
+    """Listed companies from a corpCode zip. CORPCODE.xml is streamed with iterparse and
+    every finished <list> element is dropped, so memory stays flat whatever its size."""
+    rows = []
+    with zipfile.ZipFile(src) as z, z.open("CORPCODE.xml") as f:
+        it = ET.iterparse(f, events=("start", "end"))
+        _, root = next(it)
+        for event, e in it:
+            if event != "end" or e.tag != "list":
+                continue
+            stock = (e.findtext("stock_code") or "").strip()
+            if stock:
+                rows.append((e.findtext("corp_code"), e.findtext("corp_name"), stock.zfill(6)))
+            root.clear()
+    return pd.DataFrame(rows, columns=CORP_COLUMNS)
 
-async def corp_table(api_key: str) -> pd.DataFrame:
-    """
-    Fetch DART corpCode.zip (XML inside) safely.
-    - Requires api_key (do NOT read env here).
-    - Falls back to cached parquet if DART returns non-zip payloads.
-    """
-    cache_file = path("corp_codes", "corp_code_list.parquet")
-    if fresh(cache_file, days=1):
-        df = load_parquet(cache_file)
-        if df is not None:
-            return df
 
-    url = f"https://opendart.fss.or.kr/api/corpCode.xml?crtfc_key={api_key}"
-    async with httpx.AsyncClient(timeout=25) as c:
-        r = await c.get(url)
-        r.raise_for_status()
+def diff_tables(old: pd.DataFrame | None, new: pd.DataFrame) -> dict[str, list[dict]]:
+    """Changes between two corp tables by corp_code: listings, delistings, renames and
+    stock-code changes."""
+    if old is None:
+        old = pd.DataFrame(columns=CORP_COLUMNS)
+    m = old[CORP_COLUMNS].merge(new[CORP_COLUMNS], on="corp_code", how="outer",
+                                suffixes=("_old", ""), indicator=True)
+    both = m[m["_merge"] == "both"]
+    renamed = both[both["corp_name_old"] != both["corp_name"]]
+    recoded = both[both["stock_code_old"] != both["stock_code"]]
+    removed = m[m["_merge"] == "left_only"][["corp_code", "corp_name_old", "stock_code_old"]]
+    return {
+        "added": m[m["_merge"] == "right_only"][CORP_COLUMNS].to_dict("records"),
+        "removed": removed.set_axis(CORP_COLUMNS, axis=1).to_dict("records"),
+        "renamed": renamed[["corp_code", "stock_code", "corp_name_old", "corp_name"]]
+            .set_axis(["corp_code", "stock_code", "from", "to"], axis=1).to_dict("records"),
+        "recoded": recoded[["corp_code", "corp_name", "stock_code_old", "stock_code"]]
+            .set_axis(["corp_code", "corp_name", "from", "to"], axis=1).to_dict("records"),
+    }
 
+
+def _versions() -> list[int]:
+    try:
+        return sorted(int(f.split(".")[0]) for f in os.listdir(os.path.dirname(_version_path(0, "")))
+                      if f.endswith(".parquet"))
+    except (FileNotFoundError, ValueError):
+        return []
+
+
+def current_version() -> int:
+    v = _versions()
+    return v[-1] if v else 0
+
+
+def _publish(df: pd.DataFrame, changes: dict[str, list[dict]]) -> int:
+    """Write a new versioned snapshot + its change set, then swap the current table."""
+    version = current_version() + 1
+    save_parquet(df, _version_path(version, ".parquet"))
+    save_json({"version": version, "published_at": datetime.now().isoformat(timespec="seconds"),
+               **changes}, _version_path(version, ".changes.json"))
+    save_parquet(df, _table_path())
+    for old in _versions()[:-VERSIONS_KEEP]:
+        for suffix in (".parquet", ".changes.json"):
+            try:
+                os.remove(_version_path(old, suffix))
+            except FileNotFoundError:
+                pass
+    return version
+
+
+async def sync_corp_table(dart: DARTClient, previous: pd.DataFrame | None = None
+                          ) -> tuple[pd.DataFrame, dict[str, list[dict]], int]:
+    """Download and parse corpCode.xml and diff it against ``previous`` (default: the
+    stored table). A new version is published only when something changed.
+    Returns ``(table, changes, version)``."""
+    with tempfile.TemporaryFile() as f:
+        r = await dart.corp_codes_download(f)
+        f.seek(0)
+        head = f.read(200)
         # Guard: DART sometimes returns text (error) with 200
-        ctype = (r.headers.get("Content-Type") or "").lower()
-        is_zipish = "zip" in ctype or r.content[:2] == b"PK"
-        if not is_zipish:
-            # Fallback to cache if any
-            cached = load_parquet(cache_file)
-            if cached is not None:
-                return cached
-            snippet = r.text[:200].replace("\n", " ")
+        if "zip" not in (r.headers.get("Content-Type") or "").lower() and head[:2] != b"PK":
+            snippet = head.decode("utf-8", "replace").replace("\n", " ")
             raise HTTPException(status_code=502, detail=f"DART corpCode not zip; response hint: {snippet}")
-
         try:
-            with zipfile.ZipFile(io.BytesIO(r.content)) as z:
-                with z.open("CORPCODE.xml") as f:
-                    import xml.etree.ElementTree as ET
-                    tree = ET.parse(f)
+            df = await asyncio.to_thread(parse_corp_codes, f)
         except zipfile.BadZipFile as e:
-            cached = load_parquet(cache_file)
-            if cached is not None:
-                return cached
             raise HTTPException(status_code=502, detail=f"DART zip parse failed: {e}")
+    if previous is None:
+        previous = load_parquet(_table_path())
+    changes = await asyncio.to_thread(diff_tables, previous, df)
+    if previous is None or any(changes.values()):
+        version = await asyncio.to_thread(_publish, df, changes)
+    else:
+        os.utime(_table_path())  # unchanged: just mark it checked
+        version = current_version()
+    return df, changes, version
 
-    root = tree.getroot()
-    rows = []
-    for e in root.findall("list"):
-        stock = (e.findtext("stock_code") or "").strip()
-        if not stock:
-            continue
-        rows.append((e.findtext("corp_code"), e.findtext("corp_name"), stock))
-    df = pd.DataFrame(rows, columns=["corp_code", "corp_name", "stock_code"])
-    df["stock_code"] = df["stock_code"].astype(str).str.zfill(6)
-    save_parquet(df, cache_file)
+
+def changes_since(version: int) -> dict[str, Any]:
+    """Change sets published after ``version``; ``complete`` is False when some were
+    already pruned and the caller should reload the whole table."""
+    versions = [v for v in _versions() if v > version]
+    sets = [load_json(_version_path(v, ".changes.json")) for v in versions]
+    return {"version": current_version(),
+            "complete": not versions or versions[0] == version + 1,
+            "changes": [c for c in sets if c is not None]}
+
+
+async def corp_table(dart: DARTClient) -> pd.DataFrame:
+    """The stored listed-company table. DART is only called inline on a cold cache;
+    keeping it current is the symbol directory's background sync."""
+    df = load_parquet(_table_path())
+    if df is None:
+        df, _, _ = await sync_corp_table(dart)
     return df
 
-async def company_info_by_stock(stock_code: str, api_key: str) -> dict | None:
-    df = await corp_table(api_key)
-    row = df[df["stock_code"] == stock_code]
-    if row.empty:
-        return None
-    r = row.iloc[0]
-    return {"corp_name": r["corp_name"], "corp_code": r["corp_code"], "stock_code": r["stock_code"]}
+
+# -----------------------------
+# KRX listing / sector metadata
+# -----------------------------
+
+META_COLUMNS = ["market", "업종"]  # 업종: compare_by_industry 의 그룹 키
+KRX_LISTING_FORM = {"locale": "ko_KR", "mktId": "ALL", "share": "1", "csvxls_isNo": "false",
+                    "name": "fileDown", "url": "dbms/MDC/STAT/standard/MDCSTAT01901"}
+KRX_SECTOR_FORM = {"locale": "ko_KR", "money": "1", "csvxls_isNo": "false",
+                   "name": "fileDown", "url": "dbms/MDC/STAT/standard/MDCSTAT03901"}
+KRX_SECTOR_MARKETS = ("STK", "KSQ")  # 업종분류는 유가증권·코스닥만 제공
+
+
+def _meta_path() -> str:
+    return path("corp_codes", "krx_meta.parquet")
+
+
+def _read_krx_csv(content: bytes) -> pd.DataFrame:
+    for enc in ("cp949", "utf-8-sig"):
+        try:
+            return pd.read_csv(io.BytesIO(content), encoding=enc, dtype=str)
+        except UnicodeDecodeError:
+            continue
+    raise ValueError("KRX CSV is neither CP949 nor UTF-8")
+
+
+def _stock_codes(df: pd.DataFrame) -> pd.Series:
+    col = next((c for c in ("단축코드", "종목코드", "stock_code") if c in df.columns), None)
+    if col is None:
+        raise KeyError(f"KRX CSV has no stock code column: {list(df.columns)}")
+    return df[col].astype(str).str.strip().str.zfill(6)
+
+
+def parse_krx_listing(content: bytes) -> pd.DataFrame:
+    """``stock_code, market`` from a 상장종목 정보 (MDCSTAT01901) CSV download; also
+    reads the ``data/krx_listed_backup.csv`` layout."""
+    df = _read_krx_csv(content)
+    if "시장구분" not in df.columns:
+        raise KeyError(f"KRX listing CSV has no 시장구분 column: {list(df.columns)}")
+    out = pd.DataFrame({"stock_code": _stock_codes(df), "market": df["시장구분"].str.strip()})
+    return out.drop_duplicates("stock_code").reset_index(drop=True)
+
+
+def parse_krx_sectors(content: bytes) -> pd.DataFrame:
+    """``stock_code, 업종`` from an 업종분류 현황 (MDCSTAT03901) CSV download."""
+    df = _read_krx_csv(content)
+    if "업종명" not in df.columns:
+        raise KeyError(f"KRX sector CSV has no 업종명 column: {list(df.columns)}")
+    out = pd.DataFrame({"stock_code": _stock_codes(df), "업종": df["업종명"].str.strip()})
+    return out.drop_duplicates("stock_code").reset_index(drop=True)
+
+
+async def sync_krx_metadata(krx: KRXClient, day: date | None = None) -> pd.DataFrame:
+    """Download listing + sector CSVs concurrently, parse them off the event loop and
+    store ``stock_code, market, 업종`` for the symbol directory."""
+    trd = (day or last_completed_session()).strftime("%Y%m%d")
+    listing, *sectors = await asyncio.gather(
+        krx.download_csv({**KRX_LISTING_FORM, "trdDd": trd}),
+        *(krx.download_csv({**KRX_SECTOR_FORM, "mktId": m, "trdDd": trd}) for m in KRX_SECTOR_MARKETS))
+
+    def build() -> pd.DataFrame:
+        meta = parse_krx_listing(listing)
+        sector = pd.concat([parse_krx_sectors(c) for c in sectors]).drop_duplicates("stock_code")
+        meta = meta.merge(sector, on="stock_code", how="outer")
+        save_parquet(meta, _meta_path())
+        return meta
+    return await asyncio.to_thread(build)
+
+
+def _with_meta(df: pd.DataFrame, meta: pd.DataFrame | None) -> pd.DataFrame:
+    """Corp table plus market/업종 (None where KRX has no row, e.g. a fresh listing)."""
+    df = df[CORP_COLUMNS]
+    if meta is None:
+        return df.assign(**{c: None for c in META_COLUMNS})
+    out = df.merge(meta[["stock_code"] + META_COLUMNS], on="stock_code", how="left")
+    return out.astype({c: object for c in META_COLUMNS}).where(out.notna(), None)
+
+
+# -----------------------------
+# Symbol directory (in-memory indexes over corp_table)
+# -----------------------------
+
+DIRECTORY_REFRESH_SECONDS = float(os.getenv("SYMBOL_DIRECTORY_REFRESH_SECONDS", str(24 * 3600)))
+DIRECTORY_RETRY_SECONDS = 600
+
+
+def _prefixed(keys: list[tuple[str, int]], prefix: str):
+    """Indexes whose key starts with ``prefix`` in a sorted ``(key, index)`` list."""
+    k = bisect_left(keys, (prefix, -1))
+    while k < len(keys) and keys[k][0].startswith(prefix):
+        yield keys[k][1]
+        k += 1
+
+
+def _bigrams(s: str) -> set[str]:
+    return {s[i:i + 2] for i in range(len(s) - 1)}
+
+
+class _SearchIndex:
+    """Type-ahead over corp names, built once per directory snapshot.
+
+    Matches are tiered: exact, prefix (on typed jamo, so a half-typed last syllable
+    still matches; 6-digit codes by prefix too), 초성 ("ㅅㅅㅈㅈ", "삼ㅅㅈ"), substring,
+    then typo-tolerant jamo-bigram similarity. Within a tier shorter names rank first.
+    """
+
+    FUZZY_MIN_SCORE = 0.5
+
+    def __init__(self, records: list[dict[str, Any]]):
+        self.records = records
+        self.norm = [hangul.normalize(r["corp_name"]) for r in records]
+        self.exact: dict[str, list[int]] = {}
+        for i, n in enumerate(self.norm):
+            self.exact.setdefault(n, []).append(i)
+        self.jamo = sorted((hangul.jamo(n), i) for i, n in enumerate(self.norm))
+        self.cho = sorted((hangul.chosung(n), i) for i, n in enumerate(self.norm))
+        self.codes = sorted((r["stock_code"], i) for i, r in enumerate(records))
+        self.grams = [_bigrams(j) for j in (hangul.jamo(n) for n in self.norm)]
+        self.postings: dict[str, list[int]] = {}
+        for i, gs in enumerate(self.grams):
+            for g in gs:
+                self.postings.setdefault(g, []).append(i)
+        # 너무 흔한 bigram 은 후보 생성에서 제외 (점수 계산에는 사용)
+        self.common = max(64, len(records) // 10)
+
+    def _rank(self, idx, limit: int) -> list[int]:
+        return heapq.nsmallest(limit, idx, key=lambda i: (len(self.norm[i]), self.norm[i]))
+
+    def _chosung(self, q: str):
+        qj = [hangul.jamo(c) for c in q]
+        for i in _prefixed(self.cho, hangul.chosung(q)):
+            n = self.norm[i]
+            if all(hangul.is_consonant(c) or hangul.jamo(n[p]).startswith(qj[p]) for p, c in enumerate(q)):
+                yield i
+
+    def _fuzzy(self, q: str, limit: int) -> list[int]:
+        qg = _bigrams(hangul.jamo(q))
+        if len(qg) < 2:
+            return []
+        hits = Counter()
+        for g in qg:
+            posting = self.postings.get(g, ())
+            if len(posting) <= self.common:
+                hits.update(posting)
+        scored = []
+        for i in hits:
+            score = 2 * len(qg & self.grams[i]) / (len(qg) + len(self.grams[i]))
+            if score >= self.FUZZY_MIN_SCORE:
+                scored.append((-score, len(self.norm[i]), self.norm[i], i))
+        return [i for *_, i in heapq.nsmallest(limit, scored)]
+
+    def search(self, q: str, limit: int = 10) -> list[dict[str, Any]]:
+        q = hangul.normalize(q)
+        if not q:
+            return []
+        out: list[dict[str, Any]] = []
+        seen: set[int] = set()
+
+        def take(idx, match: str) -> None:
+            for i in idx:
+                if len(out) >= limit:
+                    return
+                if i not in seen:
+                    seen.add(i)
+                    out.append({**self.records[i], "match": match})
+
+        take(self.exact.get(q, ()), "exact")
+        prefix = set(_prefixed(self.jamo, hangul.jamo(q)))
+        if q.isdigit():
+            prefix.update(_prefixed(self.codes, q))
+        take(self._rank(prefix, limit), "prefix")
+        if len(out) < limit and any(hangul.is_consonant(c) for c in q):
+            take(self._rank(self._chosung(q), limit), "chosung")
+        if len(out) < limit:
+            take(self._rank((i for i, n in enumerate(self.norm) if q in n), limit), "contains")
+        if len(out) < limit:
+            take(self._fuzzy(q, limit), "fuzzy")
+        return out
+
+
+@dataclass(frozen=True)
+class _Snapshot:
+    """One immutable build of the directory; readers keep whichever one they grabbed."""
+    frame: pd.DataFrame
+    by_stock: dict[str, dict[str, Any]]
+    by_corp: dict[str, dict[str, Any]]
+    by_name: dict[str, list[dict[str, Any]]]
+    search: _SearchIndex
+    version: int
+    synced_at: float  # epoch seconds of the last check against DART
+
+
+def _build(df: pd.DataFrame, version: int, synced_at: float) -> _Snapshot:
+    records = df.to_dict("records")
+    by_stock, by_corp, by_name = {}, {}, {}
+    for r in records:
+        by_stock.setdefault(r["stock_code"], r)
+        by_corp.setdefault(r["corp_code"], r)
+        by_name.setdefault(r["corp_name"], []).append(r)
+    return _Snapshot(df, by_stock, by_corp, by_name, _SearchIndex(list(by_stock.values())),
+                     version, synced_at)
+
+
+def _apply(prev: _Snapshot, df: pd.DataFrame, changes: dict[str, list[dict]], version: int) -> _Snapshot:
+    """``prev`` plus a diff: only the changed companies are re-indexed, every other
+    record is shared with ``prev``. The search index is rebuilt (a few ms)."""
+    by_stock, by_corp, by_name = dict(prev.by_stock), dict(prev.by_corp), dict(prev.by_name)
+    touched = {r["corp_code"] for kind in ("renamed", "recoded") for r in changes[kind]}
+    for c in touched | {r["corp_code"] for r in changes["removed"]}:
+        old = by_corp.pop(c, None)
+        if old is None:
+            continue
+        if by_stock.get(old["stock_code"]) is old:
+            del by_stock[old["stock_code"]]
+        same_name = [r for r in by_name.get(old["corp_name"], []) if r is not old]
+        if same_name:
+            by_name[old["corp_name"]] = same_name
+        else:
+            by_name.pop(old["corp_name"], None)
+    touched |= {r["corp_code"] for r in changes["added"]}
+    for r in df[df["corp_code"].isin(touched)].to_dict("records"):
+        by_corp[r["corp_code"]] = by_stock[r["stock_code"]] = r
+        by_name[r["corp_name"]] = by_name.get(r["corp_name"], []) + [r]
+    return _Snapshot(df, by_stock, by_corp, by_name, _SearchIndex(list(by_stock.values())),
+                     version, time.time())
+
+
+class SymbolDirectory:
+    """corp_code / stock_code / name lookups from hash indexes over the corp table.
+
+    The first call loads the stored table (DART only on a cold cache). Lookups never
+    wait on DART after that: ``sync`` runs in the background (``run`` loop, or kicked
+    off by a lookup once the snapshot is older than the refresh interval), streams
+    corpCode.xml, and publishes only the diff as a new snapshot with one reference swap.
+    KRX market/업종 columns are merged in and refreshed by ``run_metadata``.
+    """
+
+    def __init__(self, refresh_seconds: float = DIRECTORY_REFRESH_SECONDS):
+        self.refresh_seconds = refresh_seconds
+        self._snap: _Snapshot | None = None
+        self._flight = SingleFlight()
+        self._syncing: asyncio.Task | None = None
+        self._last_sync: dict[str, Any] | None = None
+        self._meta: pd.DataFrame | None = None
+
+    async def load(self, dart: DARTClient) -> _Snapshot:
+        """Cold start: the stored table (+ KRX metadata), else a first sync."""
+        async def run() -> _Snapshot:
+            df = await asyncio.to_thread(load_parquet, _table_path())
+            if self._meta is None:
+                self._meta = await asyncio.to_thread(load_parquet, _meta_path())
+            if df is None:
+                return await self.sync(dart)
+            mtime = os.path.getmtime(_table_path())
+            if self._snap is None:
+                self._snap = await asyncio.to_thread(
+                    lambda: _build(_with_meta(df, self._meta), current_version(), mtime))
+            return self._snap
+        return await self._flight.do("load", run)
+
+    async def sync(self, dart: DARTClient) -> _Snapshot:
+        """Pull corpCode.xml and publish what changed; concurrent callers share one sync."""
+        async def run() -> _Snapshot:
+            base = self._snap
+            t0 = time.monotonic()
+            df, changes, version = await sync_corp_table(dart, base.frame if base else None)
+            changed = any(changes.values())
+            while True:
+                prev, meta = self._snap, self._meta
+                if prev is None:
+                    snap = await asyncio.to_thread(lambda: _build(_with_meta(df, meta), version, time.time()))
+                elif not changed:
+                    snap = replace(prev, synced_at=time.time())
+                else:
+                    snap = await asyncio.to_thread(lambda: _apply(prev, _with_meta(df, meta), changes, version))
+                if self._snap is prev:  # else a metadata rebuild landed meanwhile: redo on top of it
+                    self._snap = snap  # atomic publish
+                    break
+            self._last_sync = {"version": version, "seconds": round(time.monotonic() - t0, 2),
+                               **{k: len(v) for k, v in changes.items()}}
+            if changed:
+                logger.info("symbol directory v%d: %s", version, self._last_sync)
+            return snap
+        return await self._flight.do("sync", run)
+
+    async def sync_metadata(self, krx: KRXClient) -> None:
+        """Pull KRX market/업종 and re-publish the current snapshot with them."""
+        async def run() -> None:
+            meta = await sync_krx_metadata(krx)
+            self._meta = meta
+            while (prev := self._snap) is not None:
+                snap = await asyncio.to_thread(
+                    lambda: _build(_with_meta(prev.frame, meta), prev.version, prev.synced_at))
+                if self._snap is prev:
+                    self._snap = snap
+                    break
+        await self._flight.do("krx", run)
+
+    async def run_metadata(self, krx: KRXClient) -> None:
+        """Background task: KRX sync once after every session close (listings and
+        sectors only change on trading days)."""
+        while True:
+            try:
+                try:
+                    last = datetime.fromtimestamp(os.path.getmtime(_meta_path()), KST)
+                    wait = (next_close(last) - datetime.now(KST)).total_seconds()
+                except OSError:
+                    wait = 0
+                if wait > 0:
+                    await asyncio.sleep(wait)
+                await self.sync_metadata(krx)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("KRX metadata sync failed: %r", e)
+                await asyncio.sleep(DIRECTORY_RETRY_SECONDS)
+
+    async def run(self, dart: DARTClient) -> None:
+        """Background task: load, then sync whenever the snapshot comes due."""
+        while True:
+            try:
+                snap = self._snap or await self.load(dart)
+                wait = snap.synced_at + self.refresh_seconds - time.time()
+                if wait > 0:
+                    await asyncio.sleep(wait)
+                await self.sync(dart)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # 실패해도 기존 스냅샷으로 계속 서비스
+                logger.warning("symbol directory sync failed: %r", e)
+                await asyncio.sleep(DIRECTORY_RETRY_SECONDS)
+
+    async def ensure(self, dart: DARTClient) -> _Snapshot:
+        snap = self._snap or await self.load(dart)
+        if time.time() - snap.synced_at > self.refresh_seconds and self._syncing is None:
+            self._syncing = asyncio.create_task(self.sync(dart))
+            self._syncing.add_done_callback(self._synced)
+        return snap
+
+    def _synced(self, task: asyncio.Task) -> None:
+        self._syncing = None
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning("symbol directory sync failed: %r", task.exception())
+
+    async def by_stock(self, stock_code: str, dart: DARTClient) -> dict[str, Any] | None:
+        r = (await self.ensure(dart)).by_stock.get(stock_code)
+        return dict(r) if r is not None else None
+
+    async def by_corp(self, corp_code: str, dart: DARTClient) -> dict[str, Any] | None:
+        r = (await self.ensure(dart)).by_corp.get(corp_code)
+        return dict(r) if r is not None else None
+
+    async def by_name(self, corp_name: str, dart: DARTClient) -> list[dict[str, Any]]:
+        return [dict(r) for r in (await self.ensure(dart)).by_name.get(corp_name, [])]
+
+    async def search(self, q: str, dart: DARTClient, limit: int = 10) -> list[dict[str, Any]]:
+        return (await self.ensure(dart)).search.search(q, limit)
+
+    async def frame(self, dart: DARTClient) -> pd.DataFrame:
+        return (await self.ensure(dart)).frame
+
+    def snapshot(self) -> dict[str, Any]:
+        snap = self._snap
+        if snap is None:
+            return {"loaded": False}
+        return {"loaded": True, "version": snap.version, "symbols": len(snap.by_stock),
+                "age_seconds": round(time.time() - snap.synced_at, 1),
+                "syncing": self._syncing is not None, "last_sync": self._last_sync}
+
+
+directory = SymbolDirectory()
+
+
+async def company_info_by_stock(stock_code: str, dart: DARTClient) -> dict | None:
+    return await directory.by_stock(stock_code, dart)
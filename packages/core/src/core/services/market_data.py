@@ -1,23 +1,45 @@
 from __future__ import annotations
 import pandas as pd
 import asyncio
+import os
+import threading
+import time
+from datetime import date, datetime, timedelta
+from typing import Awaitable, Callable
+from core.clients import ratelimit, resilience
 from core.clients.kis import KISClient
-from core.clients.dart import DARTClient
-from core.utils.cache import path, fresh, save_parquet, load_parquet
+from core.clients.dart import DARTClient, MULTI_ACNT_MAX_CORPS
+from core.utils import price_store, fs_warehouse, krx_calendar
+from core.utils.cache import EXPIRED, cached
+from core.utils.singleflight import SingleFlight
 from core.schemas.financials import FinancialStatement, FSRow
 
+# Concurrent callers asking for the same key share one upstream call
+flights = SingleFlight()
+
+# ------------------
+# Caching policy
+# ------------------
+# 유예 기간 안의 만료 데이터는 즉시 반환(stale=True)하고 갱신은 백그라운드에서 한 번만
+PRICE_SWR_GRACE = timedelta(hours=float(os.getenv("SWR_PRICE_GRACE_HOURS", "24")))
+FS_SWR_GRACE = timedelta(days=float(os.getenv("SWR_FS_GRACE_DAYS", "7")))
+KIS_DAILY_SWR_GRACE = timedelta(days=1)  # ratios / opinions
+
+def _policy(**kw) -> dict:
+    """Shared options for every upstream-backed service below."""
+    return dict(flights=flights, fallback_on=(resilience.CircuitOpenError,),
+                refresh_context=lambda: ratelimit.priority(ratelimit.PRIORITY_BACKGROUND), **kw)
+
+def _day(d) -> date:
+    return pd.to_datetime(d).date()
+
 # ------------------
 # KIS: daily price
 # ------------------
-async def kis_daily_price(kis: KISClient, stock_code: str, start_date: str, end_date: str) -> pd.DataFrame:
-    start_dt = pd.to_datetime(start_date)
-    end_dt = pd.to_datetime(end_date)
-    cache_file = path("prices", stock_code, f"kis_{start_dt:%Y%m%d}_{end_dt:%Y%m%d}.parquet")
-    if fresh(cache_file, days=1):
-        cached = load_parquet(cache_file)
-        if cached is not None:
-            return cached
+KIS_DAILY_MAX_ROWS = 30          # rows returned per inquire-daily-price call
+KIS_PER_TICKER_CONCURRENCY = 4   # concurrent windows per ticker backfill
 
+async def _fetch_daily_price(kis: KISClient, stock_code: str, start_dt: pd.Timestamp, end_dt: pd.Timestamp) -> pd.DataFrame:
     data = await kis.get(
         "/uapi/domestic-stock/v1/quotations/inquire-daily-price",
         tr_id="FHKST01010400",
@@ -46,53 +68,266 @@ async def kis_daily_price(kis: KISClient, stock_code: str, start_date: str, end_
         "prdy_vrss": "change",
     })
 
-    cols = [c for c in ["date","open","high","low","close","volume","transaction_amount","change"] if c in df.columns]
+    cols = [c for c in price_store.PRICE_COLUMNS if c in df.columns]
     for c in cols:
         if c != "date":
             df[c] = pd.to_numeric(df[c], errors="coerce")
     df["date"] = pd.to_datetime(df["date"], format="%Y%m%d").dt.strftime("%Y-%m-%d")
-    df = df[cols].sort_values("date").reset_index(drop=True)
-    save_parquet(df, cache_file)
-    return df
+    return df[cols].sort_values("date").reset_index(drop=True)
+
+async def _fetch_window(kis: KISClient, stock_code: str, start_dt: pd.Timestamp, end_dt: pd.Timestamp) -> pd.DataFrame:
+    """One KIS-sized window; pages backwards while a call comes back full."""
+    frames = []
+    while start_dt <= end_dt:
+        df = await _fetch_daily_price(kis, stock_code, start_dt, end_dt)
+        frames.append(df)
+        if len(df) < KIS_DAILY_MAX_ROWS:
+            break
+        earliest = pd.Timestamp(df["date"].iloc[0])
+        if earliest <= start_dt:
+            break
+        end_dt = earliest - pd.Timedelta(days=1)
+    frames = [f for f in frames if not f.empty]
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+async def _fetch_spans(kis: KISClient, stock_code: str, spans: list[price_store.Span]) -> pd.DataFrame:
+    """Split spans into KIS-sized windows, fetch them concurrently (bounded per ticker)
+    and stitch the result into one sorted, de-duplicated frame."""
+    windows = []
+    for s, e in spans:
+        days = [pd.Timestamp(d) for d in krx_calendar.trading_days(s, e)]
+        for i in range(0, len(days), KIS_DAILY_MAX_ROWS):
+            chunk = days[i:i + KIS_DAILY_MAX_ROWS]
+            windows.append((chunk[0], chunk[-1]))
+
+    sem = asyncio.Semaphore(KIS_PER_TICKER_CONCURRENCY)
+
+    async def one(s: pd.Timestamp, e: pd.Timestamp) -> pd.DataFrame:
+        async with sem:
+            return await _fetch_window(kis, stock_code, s, e)
+
+    frames = [f for f in await asyncio.gather(*[one(s, e) for s, e in windows]) if not f.empty]
+    if not frames:
+        return pd.DataFrame()
+    return (pd.concat(frames, ignore_index=True)
+              .drop_duplicates(subset="date", keep="last")
+              .sort_values("date").reset_index(drop=True))
+
+class _PriceRanges:
+    """cached() store over the per-ticker price store (rows are appended by the call)."""
+
+    def load(self, key: tuple) -> tuple[pd.DataFrame, datetime] | None:
+        return price_store.lookup(*key)
+
+    def save(self, key: tuple, value: pd.DataFrame) -> None:
+        pass
+
+@cached("prices", key=lambda stock_code, start_date, end_date, **_: (stock_code, _day(start_date), _day(end_date)),
+        store=_PriceRanges(), **_policy(grace=PRICE_SWR_GRACE))
+async def kis_daily_price(kis: KISClient, stock_code: str, start_date: str, end_date: str) -> pd.DataFrame:
+    """Daily bars for [start_date, end_date], served from the per-ticker store.
+    Only trading days the store has not covered yet are fetched from KIS; the open
+    session's bar is reused until that session closes, and within PRICE_SWR_GRACE
+    after that it is served stale (``df.attrs["stale"]``) while a refresh runs.
+    """
+    start, end = _day(start_date), _day(end_date)
+    gaps = price_store.missing_spans(price_store.load_coverage(stock_code), start, end)
+    if gaps:
+        price_store.append(stock_code, await _fetch_spans(kis, stock_code, gaps), gaps)
+    return price_store.read_range(stock_code, start, end)
 
 # ------------------
 # DART: financials
 # ------------------
 REPORTS = [("11011", "사업보고서"), ("11014", "3분기보고서"), ("11012", "반기보고서"), ("11013", "1분기보고서")]
 FSDIVS  = [("CFS", "연결"), ("OFS", "별도")]
+COMBOS  = [(rp_code, fs_div) for rp_code, _ in REPORTS for fs_div, _ in FSDIVS]  # priority order
+FS_MAX_AGE_DAYS = 30    # corrections / non-December fiscal years can file outside the windows
+
+def _fs_from_rows(corp_code: str, year: int, rp_code: str, fs_div: str, rows: pd.DataFrame) -> FinancialStatement:
+    rows = rows.astype(object).where(rows.notna(), None)
+    return FinancialStatement(
+        corp_code=corp_code,
+        year=year,
+        report_name=f"{dict(REPORTS)[rp_code]} - {dict(FSDIVS)[fs_div]}",
+        rows=[FSRow(**r) for r in rows.to_dict(orient="records")],
+    )
 
+def _valid_until(entry: fs_warehouse.Statement) -> datetime:
+    # rows and "no data" answers alike hold until the next DART filing window
+    written = entry.written_at.astimezone()
+    return min(krx_calendar.statement_valid_until(written), written + timedelta(days=FS_MAX_AGE_DAYS))
+
+def _is_fresh(entry: fs_warehouse.Statement | None) -> bool:
+    return entry is not None and krx_calendar.is_valid(_valid_until(entry))
+
+def _plan(known: dict[tuple[str, str], fs_warehouse.Statement]) -> list[tuple[tuple[str, str], pd.DataFrame | None]]:
+    """What the warehouse already answers, in priority order, up to the first hit;
+    ``None`` marks combinations that must be probed."""
+    plan: list[tuple[tuple[str, str], pd.DataFrame | None]] = []
+    for combo in COMBOS:
+        entry = known.get(combo)
+        if _is_fresh(entry):
+            if entry.status == fs_warehouse.STATUS_OK:
+                plan.append((combo, entry.rows))
+                return plan
+            continue
+        plan.append((combo, None))
+    return plan
+
+class _Statements:
+    """cached() store over the statement warehouse (rows are written by the call).
+    A load that is not a fresh hit leaves what it read for ``take``, so the call that
+    follows does not read the warehouse again."""
+    blocking = True
+    KNOWN_MAX_AGE = 5.0  # seconds a loaded map may stand in for a new read
+
+    def __init__(self) -> None:
+        self._known: dict[tuple, tuple[float, dict]] = {}
+        self._lock = threading.Lock()  # load runs in worker threads
+
+    def take(self, key: tuple) -> dict[tuple[str, str], fs_warehouse.Statement] | None:
+        with self._lock:
+            hit = self._known.pop(key, None)
+        return hit[1] if hit is not None and time.monotonic() - hit[0] < self.KNOWN_MAX_AGE else None
+
+    def load(self, key: tuple) -> tuple[FinancialStatement | None, datetime] | None:
+        corp_code, year = key
+        known = fs_warehouse.load_company(corp_code, year)
+        entry = self._answer(corp_code, year, known)
+        if entry is None or not krx_calendar.is_valid(entry[1]):
+            now = time.monotonic()
+            with self._lock:
+                for k in [k for k, (t, _) in self._known.items() if now - t >= self.KNOWN_MAX_AGE]:
+                    del self._known[k]
+                self._known[key] = (now, known)
+        return entry
+
+    @staticmethod
+    def _answer(corp_code: str, year: int, known: dict) -> tuple[FinancialStatement | None, datetime] | None:
+        valid = datetime.max.replace(tzinfo=krx_calendar.KST)
+        for rp_code, fs_div in COMBOS:
+            entry = known.get((rp_code, fs_div))
+            if entry is None:
+                break  # a higher-priority report was never asked for
+            valid = min(valid, _valid_until(entry))
+            if entry.status == fs_warehouse.STATUS_OK:
+                return _fs_from_rows(corp_code, year, rp_code, fs_div, entry.rows), valid
+        else:
+            return None, valid  # every combination answered "no data"
+        # only good as a fallback: the best statement stored so far
+        best = next((c for c in COMBOS if c in known and known[c].status == fs_warehouse.STATUS_OK), None)
+        return (_fs_from_rows(corp_code, year, *best, known[best].rows), EXPIRED) if best else None
+
+    def save(self, key: tuple, value: FinancialStatement | None) -> None:
+        pass
+
+_statements = _Statements()
+
+@cached("financials", key=lambda corp_code, year, **_: (corp_code, int(year)),
+        store=_statements, **_policy(grace=FS_SWR_GRACE))
 async def dart_financials(dart: DARTClient, corp_code: str, year: int) -> FinancialStatement | None:
     """Return the first available FS for (corp_code, year) with a friendly report name.
-    Caches raw rows as parquet for 7 days.
+    All report/consolidation combinations are probed concurrently; rows live in the
+    financial-statement warehouse and stay fresh until the next filing window opens.
+    Expired answers within FS_SWR_GRACE are returned with ``stale=True`` and refreshed
+    in the background.
     """
-    for rp_code, rp_name in REPORTS:
-        for fs_div, fs_name in FSDIVS:
-            cache_file = path("financials", corp_code, f"{year}_{rp_code}_{fs_div}.parquet")
-            if fresh(cache_file, days=7):
-                cached = load_parquet(cache_file)
-                if cached is not None:
-                    return FinancialStatement(
-                        corp_code=corp_code,
-                        year=year,
-                        report_name=f"{rp_name} - {fs_name}",
-                        rows=[FSRow(**r) for r in cached.to_dict(orient="records")],
-                    )
-
-            data = await dart.single_fs(corp_code, year, rp_code, fs_div)
-            if data.get("status") == "000" and data.get("list"):
-                df = pd.DataFrame(data["list"])  # store raw
-                save_parquet(df, cache_file)
-                return FinancialStatement(
-                    corp_code=corp_code,
-                    year=year,
-                    report_name=f"{rp_name} - {fs_name}",
-                    rows=[FSRow(**r) for r in data["list"]],
-                )
+    year = int(year)
+    known = _statements.take((corp_code, year))
+    if known is None:
+        known = await asyncio.to_thread(fs_warehouse.load_company, corp_code, year)
+    plan = _plan(known)
+
+    # Probe every remaining candidate at once; decide in priority order as results land
+    probes = {combo: asyncio.ensure_future(dart.single_fs(corp_code, year, *combo))
+              for combo, rows in plan if rows is None}
+    try:
+        return await _decide(corp_code, year, plan, probes)
+    finally:
+        for t in probes.values():
+            if t.done() and not t.cancelled():
+                t.exception()  # lower-priority failures are irrelevant once decided
+            t.cancel()
+
+async def _decide(corp_code: str, year: int, plan: list, probes: dict) -> FinancialStatement | None:
+    for (rp_code, fs_div), rows in plan:
+        if rows is None:
+            data = await probes[(rp_code, fs_div)]
+            status = data.get("status")
+            if status != "000" or not data.get("list"):
+                if status in ("000", "013"):  # 조회된 데이터 없음 → negative cache
+                    await asyncio.to_thread(fs_warehouse.write, year, rp_code, [(corp_code, fs_div, None)])
+                continue
+            rows = pd.DataFrame(data["list"])  # store raw
+            await asyncio.to_thread(fs_warehouse.write, year, rp_code, [(corp_code, fs_div, rows)])
+        return _fs_from_rows(corp_code, year, rp_code, fs_div, rows)
     return None
 
-async def kis_prices_panel(kis: KISClient, stock_codes: list[str], start_date: str, end_date: str) -> pd.DataFrame:
+DART_BATCH_CONCURRENCY = 4
+
+async def dart_financials_batch(dart: DARTClient, corp_codes: list[str], year: int,
+                                reprt_code: str = "11011") -> dict[str, FinancialStatement | None]:
+    """Key-account statements for many companies via fnlttMultiAcnt (100 corps per call).
+
+    Fills the same warehouse as ``dart_financials`` (rows, plus "no data" entries for
+    fs_divs a company does not report) and returns one entry per requested corp_code.
+    """
+    corp_codes = list(dict.fromkeys(corp_codes))
+    out: dict[str, FinancialStatement | None] = {c: None for c in corp_codes}
+    known = await asyncio.to_thread(fs_warehouse.query, year=year, reprt_code=reprt_code,
+                                    corp_codes=corp_codes, include_empty=True)
+    by_key = {k: g for k, g in known.groupby(["corp_code", "fs_div"], sort=False)}
+    todo: list[str] = []
+    for corp_code in corp_codes:
+        for fs_div, _ in FSDIVS:
+            g = by_key.get((corp_code, fs_div))
+            entry = None if g is None else fs_warehouse.Statement(
+                status=g["_status"].iloc[0], written_at=g["_written_at"].iloc[0].to_pydatetime(), rows=g)
+            if _is_fresh(entry):
+                if entry.status == fs_warehouse.STATUS_OK:
+                    out[corp_code] = _fs_from_rows(corp_code, year, reprt_code, fs_div,
+                                                   g[fs_warehouse.ROW_COLUMNS + ["bsns_year", "reprt_code"]])
+                    break
+                continue
+            todo.append(corp_code)
+            break
+
+    sem = asyncio.Semaphore(DART_BATCH_CONCURRENCY)
+
+    async def chunk(codes: list[str]) -> list[dict]:
+        async with sem:
+            data = await dart.multi_fs(codes, year, reprt_code)
+        if data.get("status") not in ("000", "013"):
+            raise RuntimeError(f"DART fnlttMultiAcnt failed ({data.get('status')}): {data.get('message')}")
+        return data.get("list") or []
+
+    chunks = [todo[i:i + MULTI_ACNT_MAX_CORPS] for i in range(0, len(todo), MULTI_ACNT_MAX_CORPS)]
+    rows = [r for part in await asyncio.gather(*[chunk(c) for c in chunks]) for r in part]
+    df = pd.DataFrame(rows, columns=sorted({k for r in rows for k in r}) or ["corp_code", "fs_div"])
+
+    entries: list[tuple[str, str, pd.DataFrame | None]] = []
+    for corp_code in todo:
+        found = df[df["corp_code"] == corp_code]
+        for fs_div, _ in FSDIVS:
+            part = found[found["fs_div"] == fs_div].reset_index(drop=True)
+            entries.append((corp_code, fs_div, None if part.empty else part))
+            if not part.empty and out[corp_code] is None:
+                out[corp_code] = _fs_from_rows(corp_code, year, reprt_code, fs_div,
+                                               part.assign(reprt_code=reprt_code))
+    await asyncio.to_thread(fs_warehouse.write, year, reprt_code, entries)  # one part file for the whole batch
+    return out
+
+async def kis_prices_panel(kis: KISClient, stock_codes: list[str], start_date: str, end_date: str,
+                           on_progress: Callable[[int, int], Awaitable[None]] | None = None) -> pd.DataFrame:
+    done = 0
+
     async def one(code: str) -> pd.Series:
+        nonlocal done
         df = await kis_daily_price(kis, code, start_date, end_date)
+        done += 1
+        if on_progress is not None:
+            await on_progress(done, len(stock_codes))
         if df is None or df.empty:
             return pd.Series(name=code, dtype=float)
         s = df.set_index("date")["close"].astype(float)
@@ -100,11 +335,19 @@ async def kis_prices_panel(kis: KISClient, stock_codes: list[str], start_date: s
         s.name = code
         return s
 
-    series_list = await asyncio.gather(*[one(c) for c in stock_codes])
+    tasks = [asyncio.ensure_future(one(c)) for c in stock_codes]
+    try:
+        series_list = await asyncio.gather(*tasks)
+    except BaseException:
+        for t in tasks:  # gather leaves siblings running when one raises (e.g. a cancelled job)
+            t.cancel()
+        raise
     panel = pd.concat(series_list, axis=1).sort_index()
     returns = panel.pct_change().dropna(how="all")
     return returns
 
+@cached("kis_ratios", key=lambda stock_code, **_: stock_code, serializer="parquet",
+        ttl=krx_calendar.daily_valid_until, **_policy(grace=KIS_DAILY_SWR_GRACE))
 async def kis_financial_ratios(kis: KISClient, stock_code: str) -> pd.DataFrame:
     data = await kis.get(
         "/uapi/domestic-stock/v1/finance/financial-ratio",
@@ -124,6 +367,8 @@ async def kis_financial_ratios(kis: KISClient, stock_code: str) -> pd.DataFrame:
             df[c] = pd.to_numeric(df[c], errors="coerce")
     return df
 
+@cached("kis_opinion", key=lambda stock_code, **_: stock_code, serializer="json",
+        ttl=krx_calendar.daily_valid_until, **_policy(grace=KIS_DAILY_SWR_GRACE))
 async def kis_investment_opinion(kis: KISClient, stock_code: str) -> dict:
     data = await kis.get(
         "/uapi/domestic-stock/v1/quotations/invest-opinion",
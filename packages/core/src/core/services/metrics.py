@@ -1,28 +1,25 @@
 from __future__ import annotations
 import numpy as np
 import pandas as pd
+from core.services.fs_view import StatementView, as_view
 
-# Safe extract (matches legacy semantics)
+# Safe extract (matches legacy semantics; DART "1,234" strings are coerced too)
 
-def extract_value(df: pd.DataFrame | None, account_name: str) -> float:
-    if df is None or df.empty:
-        return float("nan")
-    row = df[df["account_nm"] == account_name]
-    if row.empty:
-        return float("nan")
-    return float(pd.to_numeric(row.iloc[0].get("thstrm_amount"), errors="coerce"))
+def extract_value(df: pd.DataFrame | StatementView | None, account_name: str) -> float:
+    return as_view(df).get(account_name)
 
 
-def calculate_custom_metrics(df_fs: pd.DataFrame | None, df_price: pd.DataFrame | None) -> dict:
+def calculate_custom_metrics(df_fs: pd.DataFrame | StatementView | None, df_price: pd.DataFrame | None) -> dict:
     if df_fs is None or df_fs.empty:
         return {}
+    fs = as_view(df_fs)
     m = {
-        "revenue": extract_value(df_fs, "매출액"),
-        "operating_income": extract_value(df_fs, "영업이익"),
-        "net_income": extract_value(df_fs, "당기순이익"),
-        "total_assets": extract_value(df_fs, "자산총계"),
-        "total_liabilities": extract_value(df_fs, "부채총계"),
-        "total_equity": extract_value(df_fs, "자본총계"),
+        "revenue": fs.get("매출액"),
+        "operating_income": fs.get("영업이익"),
+        "net_income": fs.get("당기순이익"),
+        "total_assets": fs.get("자산총계"),
+        "total_liabilities": fs.get("부채총계"),
+        "total_equity": fs.get("자본총계"),
     }
     if df_price is not None and not df_price.empty:
         m["latest_close_price"] = float(pd.to_numeric(df_price["close"].iloc[-1], errors="coerce"))
@@ -31,7 +28,8 @@ def calculate_custom_metrics(df_fs: pd.DataFrame | None, df_price: pd.DataFrame
 
 # Piotroski F-score
 
-def calculate_piotroski_f_score(df_curr: pd.DataFrame | None, df_prev: pd.DataFrame | None) -> tuple[int, dict]:
+def calculate_piotroski_f_score(df_curr: pd.DataFrame | StatementView | None,
+                                df_prev: pd.DataFrame | StatementView | None) -> tuple[int, dict]:
     MAP = {
         "NI": "당기순이익", "CFO": "영업활동으로인한현금흐름",
         "TA": "자산총계", "TL": "부채총계",
@@ -40,15 +38,15 @@ def calculate_piotroski_f_score(df_curr: pd.DataFrame | None, df_prev: pd.DataFr
         "SHARES": "유통주식수",
     }
 
-    def v(df: pd.DataFrame | None, key: str) -> float:
-        if df is None or df.empty:
-            return float("nan")
-        row = df[df["account_nm"] == MAP[key]]
-        return float(pd.to_numeric(row["thstrm_amount"].iloc[0], errors="coerce")) if not row.empty else float("nan")
-
     if df_curr is None or df_prev is None:
         return 0, {}
 
+    # one pass per statement instead of a full scan per account
+    df_curr, df_prev = as_view(df_curr), as_view(df_prev)
+
+    def v(fs: StatementView, key: str) -> float:
+        return fs.get(MAP[key])
+
     detail: dict[str, int] = {}
     roa_c = v(df_curr, "NI") / v(df_curr, "TA")
     detail["1. ROA > 0"] = int(roa_c > 0)
@@ -0,0 +1,290 @@
+"""Universe-wide stock screener over a precomputed per-company factor table.
+
+The table (``screener/factors.parquet``) holds one row per company with health
+scores, PER/PBR/dividend yield, Piotroski F-score, latest close and — when given —
+KIS ratio rows. Each row carries fingerprints of its inputs (warehouse batches,
+price-store mtime), so ``refresh_factors`` only recomputes companies whose
+statements or prices changed. Screens are parsed into vectorised masks over the
+table.
+"""
+from __future__ import annotations
+import ast
+import operator
+from dataclasses import dataclass
+from datetime import datetime
+import numpy as np
+import pandas as pd
+from core.services.analysis import calculate_financial_health_batch, calculate_custom_ratios, HEALTH_KEYS
+from core.services.fs_view import StatementView
+from core.services.metrics import calculate_piotroski_f_score
+from core.services.market_data import REPORTS, FSDIVS, COMBOS, kis_financial_ratios
+from core.utils import fs_warehouse, price_store
+from core.utils.cache import path, save_parquet, load_parquet
+
+ID_COLUMNS = ["corp_code", "stock_code", "corp_name"]
+FACTOR_COLUMNS = HEALTH_KEYS + ["per", "pbr", "dividend_yield", "f_score", "close", "price_date", "report"]
+FINGERPRINT_COLUMNS = ["year", "fs_fp", "price_fp", "updated_at"]
+
+# Friendly names accepted in expressions and sort keys
+ALIASES = {"f": "f_score", "dy": "dividend_yield", "배당수익률": "dividend_yield", "z": "z_score", "score": "total_score"}
+
+_PRIORITY = {combo: i for i, combo in enumerate(COMBOS)}
+
+
+def _table_file() -> str:
+    return path("screener", "factors.parquet")
+
+
+# -----------------------------
+# Factor table
+# -----------------------------
+
+def load_factors() -> pd.DataFrame:
+    """The factor table (served from the in-process cache tier once warm)."""
+    df = load_parquet(_table_file())
+    return df if df is not None else pd.DataFrame(columns=ID_COLUMNS + FACTOR_COLUMNS + FINGERPRINT_COLUMNS)
+
+
+def _pick_statements(idx: pd.DataFrame) -> pd.DataFrame:
+    """Per corp, the statement dart_financials would return (report/fs_div priority)."""
+    ok = idx[idx["_status"] == fs_warehouse.STATUS_OK].copy()
+    if ok.empty:
+        return ok
+    ok["_prio"] = [_PRIORITY.get((r, f), 99) for r, f in zip(ok["reprt_code"], ok["fs_div"])]
+    return ok.sort_values("_prio").drop_duplicates("corp_code").set_index("corp_code")
+
+
+def _rows_for(picked: pd.DataFrame, year: int) -> pd.DataFrame:
+    if picked.empty:
+        return pd.DataFrame(columns=["corp_code", "account_nm", "account_id", "thstrm_amount"])
+    rows = fs_warehouse.query(year=year, corp_codes=picked.index.tolist(),
+                              columns=["corp_code", "account_nm", "account_id", "thstrm_amount", "_batch"])
+    return rows[rows["_batch"].isin(picked["_batch"].tolist())]
+
+
+def refresh_factors(universe: pd.DataFrame, year: int, *, kis_ratios: pd.DataFrame | None = None,
+                    full: bool = False) -> dict:
+    """Bring the factor table up to date for ``universe`` (corp_code, stock_code, corp_name).
+
+    Only companies whose statement batches (``year`` and ``year - 1``) or price rows changed
+    since the last refresh are recomputed, unless ``full``. ``kis_ratios`` optionally holds
+    the latest KIS ratio row per stock_code (columns become ``kis_<name>``; see
+    ``stored_kis_ratios``).
+    """
+    universe = universe[ID_COLUMNS].drop_duplicates("corp_code").reset_index(drop=True)
+    cur = _pick_statements(fs_warehouse.index(year=year))
+    prev = _pick_statements(fs_warehouse.index(year=year - 1))
+
+    fs_fp = [f"{cur['_batch'].get(c, '')}|{prev['_batch'].get(c, '')}" for c in universe["corp_code"]]
+    price_fp = [str(price_store.last_modified(s) or "") for s in universe["stock_code"]]
+    universe = universe.assign(year=year, fs_fp=fs_fp, price_fp=price_fp)
+
+    old = load_factors()
+    if full or old.empty:
+        changed = universe
+    else:
+        merged = universe.merge(old[["corp_code", "year", "fs_fp", "price_fp"]], on="corp_code",
+                                how="left", suffixes=("", "_old"))
+        stale = ((merged["year"] != merged["year_old"]) | (merged["fs_fp"] != merged["fs_fp_old"])
+                 | (merged["price_fp"] != merged["price_fp_old"]))
+        changed = universe[stale.to_numpy()]
+
+    if not changed.empty:
+        codes = changed["corp_code"].tolist()
+        cur_rows = _rows_for(cur.loc[cur.index.intersection(codes)], year)
+        prev_rows = _rows_for(prev.loc[prev.index.intersection(codes)], year - 1)
+        health = calculate_financial_health_batch(cur_rows)
+        cur_views = {c: StatementView.from_df(g) for c, g in cur_rows.groupby("corp_code", sort=False)}
+        prev_views = {c: StatementView.from_df(g) for c, g in prev_rows.groupby("corp_code", sort=False)}
+
+        records = []
+        for corp_code, stock_code in zip(changed["corp_code"], changed["stock_code"]):
+            rec: dict = {"corp_code": corp_code}
+            view = cur_views.get(corp_code)
+            if view is not None and corp_code in health.index:
+                rec.update(health.loc[corp_code].to_dict())
+                rp, fs = cur.loc[corp_code, ["reprt_code", "fs_div"]]
+                rec["report"] = f"{dict(REPORTS)[rp]} - {dict(FSDIVS)[fs]}"
+            last = price_store.last_close(stock_code)
+            if last is not None:
+                rec["price_date"], rec["close"] = last
+            if view is not None and last is not None:
+                r = calculate_custom_ratios(view, pd.DataFrame({"close": [last[1]]}))
+                rec.update(per=r["PER"], pbr=r["PBR"], dividend_yield=r["배당수익률(%)"])
+            if view is not None and corp_code in prev_views:
+                try:
+                    rec["f_score"] = calculate_piotroski_f_score(view, prev_views[corp_code])[0]
+                except ZeroDivisionError:
+                    rec["f_score"] = np.nan
+            records.append(rec)
+
+        fresh_rows = changed.merge(pd.DataFrame(records), on="corp_code", how="left")
+        fresh_rows["updated_at"] = pd.Timestamp(datetime.now())
+        keep = old[~old["corp_code"].isin(fresh_rows["corp_code"])] if not old.empty else old
+        table = pd.concat([keep, fresh_rows], ignore_index=True)
+        for c in FACTOR_COLUMNS:
+            if c not in table.columns:
+                table[c] = np.nan
+    else:
+        table = old
+
+    if kis_ratios is not None:
+        # KIS ratio rows change independently of statements/prices: re-attach for every row
+        kis = kis_ratios.drop_duplicates("stock_code", keep="last")
+        kis = kis.rename(columns={c: f"kis_{c}" for c in kis.columns if c != "stock_code"})
+        table = table.drop(columns=[c for c in table.columns if c.startswith("kis_")])
+        table = table.merge(kis, on="stock_code", how="left")
+    if kis_ratios is not None or not changed.empty:
+        table = table[table["corp_code"].isin(universe["corp_code"])]
+        save_parquet(table.sort_values("corp_code").reset_index(drop=True), _table_file())
+
+    return {"universe": len(universe), "recomputed": len(changed),
+            "kis_ratios": 0 if kis_ratios is None else len(kis_ratios)}
+
+
+def stored_kis_ratios(stock_codes: list[str]) -> pd.DataFrame | None:
+    """Latest KIS ratio row per stock from the ratio cache; never calls KIS, so only
+    stocks someone has looked up (or a warm-up has fetched) get ``kis_*`` factors."""
+    rows = []
+    for code in stock_codes:
+        df = kis_financial_ratios.peek(None, code)
+        if df is None or df.empty:
+            continue
+        latest = df.sort_values("결산년월").iloc[-1] if "결산년월" in df.columns else df.iloc[0]
+        rows.append({"stock_code": code, **latest.to_dict()})
+    return pd.DataFrame(rows) if rows else None
+
+
+# -----------------------------
+# Screen expressions
+# -----------------------------
+
+class ScreenError(ValueError):
+    """Invalid screen expression or sort key."""
+
+
+_CMP = {ast.Lt: operator.lt, ast.LtE: operator.le, ast.Gt: operator.gt, ast.GtE: operator.ge,
+        ast.Eq: operator.eq, ast.NotEq: operator.ne}
+_ARITH = {ast.Add: operator.add, ast.Sub: operator.sub, ast.Mult: operator.mul, ast.Div: operator.truediv}
+
+
+def _column(df: pd.DataFrame, name: str) -> str:
+    lookup = {c.lower(): c for c in df.columns}
+    key = ALIASES.get(name.lower(), name.lower())
+    if key not in lookup:
+        raise ScreenError(f"unknown factor: {name}")
+    return lookup[key]
+
+
+@dataclass
+class _Truth:
+    """Three-valued result of a comparison: 1.0 true, 0.0 false, NaN unknown (a NaN
+    operand). ``and``/``or``/``not`` follow SQL, so unknown never turns into a match."""
+    values: np.ndarray
+
+
+def _truth(v) -> np.ndarray:
+    if isinstance(v, _Truth):
+        return v.values
+    arr = np.asarray(v)
+    out = np.asarray(arr != 0, dtype=float) if arr.dtype.kind in "biuf" else np.asarray(arr, dtype=bool).astype(float)
+    return np.where(pd.isna(arr), np.nan, out)
+
+
+def _and(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    return np.where((a == 0) | (b == 0), 0.0, np.where(np.isnan(a) | np.isnan(b), np.nan, 1.0))
+
+
+def _or(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    return np.where((a == 1) | (b == 1), 1.0, np.where(np.isnan(a) | np.isnan(b), np.nan, 0.0))
+
+
+def _eval(node: ast.AST, df: pd.DataFrame):
+    if isinstance(node, ast.Expression):
+        return _eval(node.body, df)
+    if isinstance(node, ast.BoolOp):
+        vals = [_truth(_eval(v, df)) for v in node.values]
+        fn = _and if isinstance(node.op, ast.And) else _or
+        out = vals[0]
+        for v in vals[1:]:
+            out = fn(out, v)
+        return _Truth(out)
+    if isinstance(node, ast.UnaryOp):
+        if isinstance(node.op, ast.Not):
+            return _Truth(1.0 - _truth(_eval(node.operand, df)))
+        if isinstance(node.op, ast.USub):
+            v = _eval(node.operand, df)
+            if isinstance(v, (_Truth, str, list)) or (isinstance(v, np.ndarray) and v.dtype.kind not in "biuf"):
+                raise ScreenError("unary minus needs a number")
+            return -v
+    if isinstance(node, ast.Compare):
+        out, left = None, _eval(node.left, df)
+        for op, comp in zip(node.ops, node.comparators):
+            right = _eval(comp, df)
+            if isinstance(op, (ast.In, ast.NotIn)):
+                res = np.asarray(pd.Series(left).isin(right))
+                res = ~res if isinstance(op, ast.NotIn) else res
+                unknown = np.asarray(pd.isna(left))
+            elif type(op) in _CMP:
+                res = np.asarray(_CMP[type(op)](left, right), dtype=bool)
+                unknown = np.asarray(pd.isna(left)) | np.asarray(pd.isna(right))
+            else:
+                raise ScreenError("unsupported comparison")
+            res = np.where(unknown, np.nan, res.astype(float))
+            out = res if out is None else _and(out, res)
+            left = right
+        return _Truth(out)
+    if isinstance(node, ast.BinOp) and type(node.op) in _ARITH:
+        with np.errstate(all="ignore"):
+            return _ARITH[type(node.op)](_eval(node.left, df), _eval(node.right, df))
+    if isinstance(node, ast.Name):
+        return df[_column(df, node.id)].to_numpy()
+    if isinstance(node, ast.Constant) and isinstance(node.value, (int, float, str)):
+        return node.value
+    if isinstance(node, (ast.Tuple, ast.List)):
+        return [_eval(e, df) for e in node.elts]
+    raise ScreenError(f"unsupported syntax: {ast.dump(node)[:40]}")
+
+
+def compile_mask(df: pd.DataFrame, expr: str) -> np.ndarray:
+    """Boolean mask for an expression like ``debt_ratio < 100 and roe > 10 and F >= 7``.
+    Only factor names, numbers/strings, comparisons, arithmetic and and/or/not are allowed.
+    A comparison with a NaN operand is unknown, and unknown never matches, even under
+    ``!=`` or ``not``."""
+    src = expr.replace("≥", ">=").replace("≤", "<=").replace("&&", " and ").replace("||", " or ")
+    try:
+        tree = ast.parse(src, mode="eval")
+    except SyntaxError as e:
+        raise ScreenError(f"invalid expression: {e.msg}") from None
+    try:
+        result = _eval(tree, df)
+    except TypeError:
+        raise ScreenError("operands must be numbers (or strings compared with strings)") from None
+    values = _truth(result)
+    if np.ndim(values) == 0:
+        raise ScreenError("expression must compare factors")
+    return np.broadcast_to(values == 1.0, (len(df),)).copy()
+
+
+def screen(expr: str | None = None, *, sort: str | None = None, page: int = 1, page_size: int = 50) -> dict:
+    """Filter/sort the factor table and return one page.
+
+    ``sort`` is a comma list of factors, each optionally prefixed with ``-`` or suffixed
+    with `` desc`` for descending (NaN last)."""
+    df = load_factors()
+    if expr and expr.strip():
+        df = df[compile_mask(df, expr)]
+    if sort:
+        keys, asc = [], []
+        for part in (p.strip() for p in sort.split(",") if p.strip()):
+            desc = part.startswith("-") or part.lower().endswith(" desc")
+            name = part.lstrip("-+").split()[0]
+            keys.append(_column(df, name))
+            asc.append(not desc)
+        df = df.sort_values(keys, ascending=asc, na_position="last", kind="stable")
+    total = len(df)
+    page, page_size = max(1, page), max(1, min(page_size, 500))
+    items = df.iloc[(page - 1) * page_size: page * page_size]
+    items = items.drop(columns=[c for c in ("fs_fp", "price_fp") if c in items.columns])
+    items = items.astype(object).where(items.notna(), None)
+    return {"total": total, "page": page, "page_size": page_size, "items": items.to_dict(orient="records")}
@@ -0,0 +1,190 @@
+"""Pre-market cache warm-up for the companies people actually open.
+
+Before each KRX session (``WARMUP_AT``, default 08:00 KST) the companies in
+``data/recent_companies.json`` (names, most recent first) and ``data/watchlist.json``
+(stock codes) are walked in that order. Each one gets exactly what the Company page
+asks for on first load (its default statement year and price window, see
+``apps/web/src/pages/Company.tsx``), plus prices through today, KIS ratios and
+opinion, and the logo. Everything runs at background upstream priority, so it only
+uses rate limit that interactive requests leave free. Per-company and per-step
+durations are kept in ``warmup/last_run.json``. A file lock keeps API workers and
+sidecars from warming at the same time.
+
+Runs inside the API (startup task) or as a sidecar::
+
+    python -m core.services.warmup [--now] [--loop]
+"""
+from __future__ import annotations
+import asyncio
+import json
+import logging
+import os
+import time
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable
+from core.clients import ratelimit
+from core.clients.registry import UpstreamClients
+from core.services.logo import get_logo_cached
+from core.services.lookup import directory
+from core.services.market_data import dart_financials, kis_daily_price, kis_financial_ratios, kis_investment_opinion
+from core.utils import krx_calendar
+from core.utils.cache import path, load_json, save_json, try_lock
+
+logger = logging.getLogger(__name__)
+
+WATCHLIST_FILE = os.getenv("WARMUP_WATCHLIST_FILE", os.path.join("data", "watchlist.json"))
+RECENT_FILE = os.getenv("WARMUP_RECENT_FILE", os.path.join("data", "recent_companies.json"))
+WARMUP_AT = datetime.strptime(os.getenv("WARMUP_AT", "08:00"), "%H:%M").time()  # KST, 장 시작 전
+MAX_COMPANIES = int(os.getenv("WARMUP_MAX_COMPANIES", "50"))
+CONCURRENCY = int(os.getenv("WARMUP_CONCURRENCY", "2"))
+# Company 페이지 기본값과 맞춤 (year, start, end)
+FS_YEAR = int(os.getenv("WARMUP_FS_YEAR", "2024"))
+PRICE_START = os.getenv("WARMUP_PRICE_START", "2024-01-01")
+PRICE_END = os.getenv("WARMUP_PRICE_END", "2025-08-01")
+BUSY_RETRY_SECONDS = 60.0      # another process holds the warm-up lock
+IN_API = os.getenv("WARMUP_IN_API", "1") != "0"  # 0 → 사이드카(python -m core.services.warmup --loop)
+
+
+def _read_list(p: str) -> list[str]:
+    try:
+        with open(p, encoding="utf-8") as f:
+            items = json.load(f)
+    except (OSError, ValueError):
+        return []
+    return [str(x).strip() for x in items if str(x).strip()] if isinstance(items, list) else []
+
+
+async def targets(dart) -> list[dict[str, Any]]:
+    """Recently viewed companies first, then the watchlist; deduped, capped."""
+    out: dict[str, dict[str, Any]] = {}
+    for name in _read_list(RECENT_FILE):
+        for info in await directory.by_name(name, dart):
+            out.setdefault(info["stock_code"], info)
+    for code in _read_list(WATCHLIST_FILE):
+        info = await directory.by_stock(code.zfill(6), dart)
+        if info is not None:
+            out.setdefault(info["stock_code"], info)
+    return list(out.values())[:MAX_COMPANIES]
+
+
+async def _timed(steps: dict[str, Any], name: str, fn: Callable[[], Awaitable[Any]]) -> None:
+    t0 = time.monotonic()
+    try:
+        await fn()
+        steps[name] = round(time.monotonic() - t0, 3)
+    except Exception as e:
+        steps[name] = {"seconds": round(time.monotonic() - t0, 3), "error": repr(e)}
+
+
+async def warm_company(upstreams: UpstreamClients, info: dict[str, Any]) -> dict[str, Any]:
+    code, corp = info["stock_code"], info["corp_code"]
+    today = datetime.now(krx_calendar.KST).date()
+    steps: dict[str, Any] = {}
+    t0 = time.monotonic()
+    await _timed(steps, "financials", lambda: dart_financials(upstreams.dart, corp, FS_YEAR))
+    # bars through today go to the price store; the page's own window then reads from it
+    await _timed(steps, "prices", lambda: kis_daily_price(upstreams.kis, code, PRICE_START, str(today)))
+    await _timed(steps, "page_prices", lambda: kis_daily_price(upstreams.kis, code, PRICE_START, PRICE_END))
+    await _timed(steps, "ratios", lambda: kis_financial_ratios(upstreams.kis, code))
+    await _timed(steps, "opinion", lambda: kis_investment_opinion(upstreams.kis, code))
+    await _timed(steps, "logo", lambda: get_logo_cached(upstreams.naver, company_name=info["corp_name"],
+                                                        stock_code=code))
+    return {"stock_code": code, "corp_name": info["corp_name"],
+            "seconds": round(time.monotonic() - t0, 3), "steps": steps}
+
+
+async def run_once(upstreams: UpstreamClients) -> dict[str, Any] | None:
+    """Warm every target at background priority; returns (and stores) the timings, or
+    None when another process is already warming."""
+    with try_lock(path("warmup", "run.lock")) as locked:
+        return await _run(upstreams) if locked else None
+
+
+async def _run(upstreams: UpstreamClients) -> dict[str, Any]:
+    started = datetime.now(krx_calendar.KST)
+    t0 = time.monotonic()
+    sem = asyncio.Semaphore(CONCURRENCY)
+
+    async def one(info: dict[str, Any]) -> dict[str, Any]:
+        async with sem:
+            return await warm_company(upstreams, info)
+
+    with ratelimit.priority(ratelimit.PRIORITY_BACKGROUND):
+        companies = await asyncio.gather(*(one(i) for i in await targets(upstreams.dart)))
+    report = {
+        "started_at": started.isoformat(timespec="seconds"),
+        "seconds": round(time.monotonic() - t0, 3),
+        "companies": list(companies),
+        "errors": sum(isinstance(v, dict) for c in companies for v in c["steps"].values()),
+    }
+    save_json(report, path("warmup", "last_run.json"))
+    logger.info("cache warm-up: %d companies in %.1fs (%d failed steps)",
+                len(companies), report["seconds"], report["errors"])
+    return report
+
+
+def next_run(after: datetime) -> datetime:
+    """The first WARMUP_AT on a trading day strictly after ``after``."""
+    after = after.astimezone(krx_calendar.KST)
+    d = after.date()
+    while True:
+        at = datetime.combine(d, WARMUP_AT, tzinfo=krx_calendar.KST)
+        if at > after and krx_calendar.is_trading_day(d):
+            return at
+        d += timedelta(days=1)
+
+
+def last_run() -> dict[str, Any] | None:
+    return load_json(path("warmup", "last_run.json"))
+
+
+async def warmup_loop(upstreams: UpstreamClients) -> None:
+    """Background task: warm before every session; catches up once if a run was missed
+    (e.g. the API was down at WARMUP_AT)."""
+    while True:
+        prev = last_run()
+        now = datetime.now(krx_calendar.KST)
+        due = next_run(datetime.fromisoformat(prev["started_at"])) if prev else now
+        wait = (due - now).total_seconds()
+        try:
+            if wait > 0:
+                await asyncio.sleep(wait)
+            if await run_once(upstreams) is None:
+                await asyncio.sleep(BUSY_RETRY_SECONDS)  # its report moves next_run on
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("cache warm-up failed")
+            await asyncio.sleep(600)
+
+
+def snapshot() -> dict[str, Any]:
+    prev = last_run()
+    if prev is None:
+        return {"last_run": None, "next_run": next_run(datetime.now(krx_calendar.KST)).isoformat()}
+    slowest = sorted(prev["companies"], key=lambda c: c["seconds"], reverse=True)[:5]
+    return {"last_run": prev["started_at"], "seconds": prev["seconds"], "companies": len(prev["companies"]),
+            "errors": prev["errors"], "slowest": [{k: c[k] for k in ("stock_code", "corp_name", "seconds")} for c in slowest],
+            "next_run": next_run(datetime.fromisoformat(prev["started_at"])).isoformat()}
+
+
+if __name__ == "__main__":
+    import argparse
+    from dotenv import load_dotenv, find_dotenv
+    ap = argparse.ArgumentParser(description="Prefetch caches for recent and watchlisted companies.")
+    ap.add_argument("--now", action="store_true", help="run once immediately")
+    ap.add_argument("--loop", action="store_true", help="keep running before every session")
+    args = ap.parse_args()
+    load_dotenv(find_dotenv())
+    logging.basicConfig(level=logging.INFO)
+
+    async def main() -> None:
+        upstreams = UpstreamClients.from_env()
+        try:
+            if args.now or not args.loop:
+                print(json.dumps(await run_once(upstreams), ensure_ascii=False, indent=2))
+            if args.loop:
+                await warmup_loop(upstreams)
+        finally:
+            await upstreams.aclose()
+    asyncio.run(main())
@@ -1,42 +1,649 @@
 from __future__ import annotations
-import os, json
-from datetime import datetime, timedelta
+import os, json, copy, threading, asyncio, contextlib, functools, inspect, logging
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+import time
 import pandas as pd
-from typing import Any
+from typing import Any, Awaitable, Callable, ContextManager, Hashable, Iterator, Protocol
+try:
+    import fcntl
+except ImportError:  # Windows: locks below are per-process only
+    fcntl = None
 
 BASE = os.getenv("CORE_CACHE_DIR", os.path.join("data", "cache"))
 
+# In-process tier in front of the disk files: decoded objects keyed by path, validated
+# against the file's (mtime, size) on every hit so writes from any process are seen.
+MEM_BUDGET_BYTES = int(os.getenv("CORE_CACHE_MEM_BYTES", str(256 * 1024 * 1024)))
+MEM_DEFAULT_TTL = float(os.getenv("CORE_CACHE_MEM_TTL", "600"))
+# 네임스페이스(캐시 디렉터리 첫 단계)별 메모리 TTL(초). 0 이면 메모리 캐시 안 함
+MEM_TTLS: dict[str, float] = {
+    "prices": 300,
+    "corp_codes": 3600,
+    "logos": 3600,
+    "screener": 3600,
+    "tokens": 0,
+}
+
 def path(*parts: str) -> str:
     p = os.path.join(BASE, *parts)
     os.makedirs(os.path.dirname(p), exist_ok=True)
     return p
 
 def fresh(p: str, days: int = 1) -> bool:
-    if not os.path.exists(p):
+    try:
+        mt = os.stat(p).st_mtime
+    except OSError:
         return False
-    mt = datetime.fromtimestamp(os.path.getmtime(p))
-    return (datetime.now() - mt) < timedelta(days=days)
+    return (datetime.now() - datetime.fromtimestamp(mt)) < timedelta(days=days)
+
+_file_locks: dict[str, threading.Lock] = {}
+
+@contextlib.contextmanager
+def try_lock(p: str) -> Iterator[bool]:
+    """Non-blocking exclusive lock on file ``p``, across threads and processes on the
+    host; yields whether it was acquired. Held until the block exits."""
+    if fcntl is None:
+        lock = _file_locks.setdefault(p, threading.Lock())
+        ok = lock.acquire(blocking=False)
+        try:
+            yield ok
+        finally:
+            if ok:
+                lock.release()
+        return
+    fd = os.open(p, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            ok = True
+        except BlockingIOError:
+            ok = False
+        yield ok
+    finally:
+        os.close(fd)  # releases the flock
+
+# -----------------------------
+# Memory tier
+# -----------------------------
+
+@dataclass
+class _Entry:
+    value: Any
+    sig: tuple[int, int]  # (st_mtime_ns, st_size) of the file it was decoded from
+    nbytes: int
+    expires: float
+    namespace: str
+
+
+class MemoryTier:
+    """Byte-bounded LRU of decoded cache files with per-namespace TTLs."""
+
+    def __init__(self, budget_bytes: int = MEM_BUDGET_BYTES):
+        self.budget_bytes = budget_bytes
+        self._entries: OrderedDict[str, _Entry] = OrderedDict()
+        self._lock = threading.Lock()
+        self._bytes = 0
+        self.hits = self.misses = self.evictions = self.expirations = self.invalidations = 0
+
+    def get(self, key: str, sig: tuple[int, int]) -> Any | None:
+        with self._lock:
+            e = self._entries.get(key)
+            if e is None:
+                self.misses += 1
+                return None
+            if e.sig != sig:
+                self._drop(key)
+                self.invalidations += 1
+                self.misses += 1
+                return None
+            if e.expires < time.monotonic():
+                self._drop(key)
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return e.value
+
+    def put(self, key: str, value: Any, sig: tuple[int, int], nbytes: int) -> None:
+        ns = _namespace(key)
+        ttl = MEM_TTLS.get(ns, MEM_DEFAULT_TTL)
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            if ttl <= 0 or nbytes > self.budget_bytes:
+                return
+            self._entries[key] = _Entry(value, sig, nbytes, time.monotonic() + ttl, ns)
+            self._bytes += nbytes
+            while self._bytes > self.budget_bytes:
+                old, _ = next(iter(self._entries.items()))
+                self._drop(old)
+                self.evictions += 1
+
+    def invalidate(self, key: str) -> None:
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+                self.invalidations += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def _drop(self, key: str) -> None:
+        self._bytes -= self._entries.pop(key).nbytes
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            by_ns: dict[str, dict] = {}
+            for e in self._entries.values():
+                s = by_ns.setdefault(e.namespace, {"entries": 0, "bytes": 0})
+                s["entries"] += 1
+                s["bytes"] += e.nbytes
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries), "bytes": self._bytes, "budget_bytes": self.budget_bytes,
+                "hits": self.hits, "misses": self.misses, "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+                "evictions": self.evictions, "expirations": self.expirations,
+                "invalidations": self.invalidations, "namespaces": by_ns,
+            }
+
+
+memory = MemoryTier()
+
+# path → last read time; folded into the files' atime by the janitor (relatime/noatime
+# mounts and memory hits would otherwise hide reads)
+_accessed: dict[str, float] = {}
+
+
+def _key(p: str) -> str:
+    return os.path.abspath(p)
+
+
+def _namespace(key: str) -> str:
+    rel = os.path.relpath(key, os.path.abspath(BASE))
+    return rel.split(os.sep, 1)[0] if not rel.startswith("..") else ""
+
+
+def _sig(p: str) -> tuple[int, int] | None:
+    try:
+        st = os.stat(p)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+def stats() -> dict:
+    return {"memory": memory.snapshot(), "functions": {k: dict(v) for k, v in _fn_stats.items()}}
+
+
+def invalidate(p: str) -> None:
+    memory.invalidate(_key(p))
 
 # JSON helpers
 
 def save_json(obj: Any, p: str) -> None:
     with open(p, "w", encoding="utf-8") as f:
         json.dump(obj, f, ensure_ascii=False, indent=2)
+    sig = _sig(p)
+    if sig is not None:
+        memory.put(_key(p), copy.deepcopy(obj), sig, sig[1])
 
 def load_json(p: str) -> Any | None:
+    key, sig = _key(p), _sig(p)
+    if sig is None:
+        memory.invalidate(key)
+        return None
+    _accessed[key] = time.time()
+    hit = memory.get(key, sig)
+    if hit is not None:
+        return copy.deepcopy(hit)  # callers may mutate what they get back
     try:
         with open(p, "r", encoding="utf-8") as f:
-            return json.load(f)
+            obj = json.load(f)
     except Exception:
         return None
+    memory.put(key, obj, sig, sig[1])
+    return copy.deepcopy(obj)
 
 # Parquet helpers
 
 def save_parquet(df: pd.DataFrame, p: str) -> None:
-    df.to_parquet(p, index=False)
+    # write-then-rename so concurrent readers never see a half-written file
+    tmp = f"{p}.tmp-{os.getpid()}-{threading.get_ident()}"
+    df.to_parquet(tmp, index=False)
+    os.replace(tmp, p)
+    memory.invalidate(_key(p))  # re-read once so dtypes match what readers get from disk
 
 def load_parquet(p: str) -> pd.DataFrame | None:
+    return _load_frame(p, pd.read_parquet)
+
+def _load_frame(p: str, reader: Callable[[str], pd.DataFrame]) -> pd.DataFrame | None:
+    key, sig = _key(p), _sig(p)
+    if sig is None:
+        memory.invalidate(key)
+        return None
+    _accessed[key] = time.time()
+    hit = memory.get(key, sig)
+    if hit is not None:
+        return hit.copy(deep=False)  # pandas 3 copy-on-write keeps callers' edits out of the cached frame
     try:
-        return pd.read_parquet(p)
+        df = reader(p)
     except Exception:
-        return None
\ No newline at end of file
+        return None
+    memory.put(key, df, sig, int(df.memory_usage(index=True, deep=True).sum()))
+    return df.copy(deep=False)
+
+# Arrow IPC (feather) helpers: no compression, so larger on disk but cheapest to decode
+
+def save_arrow(df: pd.DataFrame, p: str) -> None:
+    import pyarrow.feather as feather
+    tmp = f"{p}.tmp-{os.getpid()}-{threading.get_ident()}"
+    feather.write_feather(df.reset_index(drop=True), tmp, compression="uncompressed")
+    os.replace(tmp, p)
+    memory.invalidate(_key(p))
+
+def load_arrow(p: str) -> pd.DataFrame | None:
+    import pyarrow.feather as feather
+    return _load_frame(p, feather.read_feather)
+
+# -----------------------------
+# Declarative caching for upstream-backed services
+# -----------------------------
+
+logger = logging.getLogger(__name__)
+
+SERIALIZERS: dict[str, tuple[Callable[[Any, str], None], Callable[[str], Any], str]] = {
+    "parquet": (save_parquet, load_parquet, ".parquet"),
+    "json": (save_json, load_json, ".json"),
+    "arrow": (save_arrow, load_arrow, ".arrow"),
+}
+
+# TTL policy: a fixed lifetime, or written_at → valid_until (e.g. krx_calendar.daily_valid_until)
+TTLPolicy = timedelta | Callable[[datetime], datetime]
+
+EXPIRED = datetime.min.replace(tzinfo=timezone.utc)  # valid_until of an answer only good as a fallback
+
+
+class Store(Protocol):
+    """Where a ``cached`` function's answers live. ``load`` returns the value and the
+    moment it stops being fresh (ignoring freshness otherwise), or None if unknown.
+    A store whose ``load`` does real I/O sets ``blocking = True``; the wrapper then
+    runs it in a worker thread."""
+
+    def load(self, key: tuple) -> tuple[Any, datetime] | None: ...
+
+    def save(self, key: tuple, value: Any) -> None: ...
+
+
+class FileStore:
+    """One file per key under ``<BASE>/<namespace>/``; freshness from the file's mtime."""
+
+    def __init__(self, namespace: str, serializer: str = "parquet", ttl: TTLPolicy = timedelta(days=1)):
+        self.namespace = namespace
+        self.saver, self.loader, self.ext = SERIALIZERS[serializer]
+        self.ttl = ttl
+
+    def _path(self, key: tuple) -> str:
+        parts = [str(k).replace(os.sep, "_") for k in key]
+        return path(self.namespace, *parts[:-1], f"{parts[-1]}{self.ext}")
+
+    def load(self, key: tuple) -> tuple[Any, datetime] | None:
+        p = self._path(key)
+        sig = _sig(p)
+        value = self.loader(p) if sig is not None else None
+        if value is None:
+            return None
+        written = datetime.fromtimestamp(sig[0] / 1e9).astimezone()
+        valid = written + self.ttl if isinstance(self.ttl, timedelta) else self.ttl(written)
+        return value, valid
+
+    def save(self, key: tuple, value: Any) -> None:
+        if value is not None:
+            self.saver(value, self._path(key))
+
+
+def _mark_stale(value: Any) -> Any:
+    if isinstance(value, pd.DataFrame):
+        value = value.copy(deep=False)
+        value.attrs["stale"] = True
+    elif hasattr(value, "stale"):
+        value.stale = True
+    return value
+
+
+_fn_stats: dict[str, dict[str, float]] = {}
+
+
+def cached(namespace: str, *, key: Callable[..., Hashable], store: Store | None = None,
+           ttl: TTLPolicy = timedelta(days=1), serializer: str = "parquet",
+           grace: timedelta | None = None, flights: Any = None,
+           fallback_on: tuple[type[BaseException], ...] = (),
+           refresh_context: Callable[[], ContextManager] | None = None):
+    """Cache an async upstream call.
+
+    ``key`` receives the call's arguments by name and returns the cache key (a tuple,
+    or a single value). Answers live in ``store`` (default: a ``FileStore`` with
+    ``serializer`` and ``ttl``). Concurrent misses for a key share one call through
+    ``flights`` (a ``SingleFlight``). Within ``grace`` after expiry the old answer is
+    returned marked stale and one background refresh runs under ``refresh_context``.
+    When the call raises one of ``fallback_on``, any stored answer is served stale.
+    The wrapper's ``peek(...)`` returns the stored answer without calling upstream.
+    """
+    from core.utils.singleflight import SingleFlight
+    store = store or FileStore(namespace, serializer, ttl)
+    flights = flights or SingleFlight()
+    stats = _fn_stats.setdefault(namespace, {"hits": 0, "misses": 0, "stale": 0, "fallbacks": 0,
+                                             "refreshes": 0, "errors": 0, "upstream_seconds": 0.0})
+    refreshing: set[Hashable] = set()
+
+    def deco(fn: Callable[..., Awaitable[Any]]):
+        sig = inspect.signature(fn)
+
+        def key_of(args: tuple, kwargs: dict) -> tuple:
+            bound = sig.bind(*args, **kwargs)
+            bound.apply_defaults()
+            k = key(**bound.arguments)
+            return k if isinstance(k, tuple) else (k,)
+
+        async def load_through(k: tuple, args: tuple, kwargs: dict) -> Any:
+            t0 = time.monotonic()
+            try:
+                value = await fn(*args, **kwargs)
+            except BaseException:
+                stats["errors"] += 1
+                raise
+            finally:
+                stats["upstream_seconds"] += time.monotonic() - t0
+            store.save(k, value)
+            return value
+
+        def refresh(k: tuple, args: tuple, kwargs: dict) -> None:
+            if k in refreshing:
+                return
+            refreshing.add(k)
+            stats["refreshes"] += 1
+            with refresh_context() if refresh_context else contextlib.nullcontext():
+                task = asyncio.ensure_future(flights.do((namespace, k), lambda: load_through(k, args, kwargs)))
+
+            def done(t: asyncio.Task) -> None:
+                refreshing.discard(k)
+                if not t.cancelled() and t.exception() is not None:
+                    logger.warning("background refresh %s%s failed: %r", namespace, k, t.exception())
+            task.add_done_callback(done)
+
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            k = key_of(args, kwargs)
+            entry = await asyncio.to_thread(store.load, k) if getattr(store, "blocking", False) else store.load(k)
+            now = datetime.now().astimezone()
+            if entry is not None and now < entry[1]:
+                stats["hits"] += 1
+                return entry[0]
+            if entry is not None and grace is not None and entry[1] != EXPIRED and now < entry[1] + grace:
+                stats["stale"] += 1
+                refresh(k, args, kwargs)
+                return _mark_stale(entry[0])
+            stats["misses"] += 1
+            try:
+                return await flights.do((namespace, k), lambda: load_through(k, args, kwargs))
+            except fallback_on:
+                if entry is None:
+                    raise
+                stats["fallbacks"] += 1
+                return _mark_stale(entry[0])
+
+        def peek(*args, **kwargs) -> Any | None:
+            entry = store.load(key_of(args, kwargs))
+            return entry[0] if entry is not None else None
+
+        wrapper.peek = peek
+        wrapper.uncached = fn
+        return wrapper
+    return deco
+
+
+# -----------------------------
+# Disk janitor
+# -----------------------------
+
+GiB, MiB = 1024 ** 3, 1024 ** 2
+DISK_DEFAULT_BUDGET = int(os.getenv("CORE_CACHE_DISK_BYTES", str(1 * GiB)))
+# 네임스페이스별 디스크 예산(bytes). 초과 시 마지막 접근이 오래된 것부터 삭제
+DISK_BUDGETS: dict[str, int] = {
+    "prices": 2 * GiB,
+    "logos": 64 * MiB,
+    "corp_codes": 64 * MiB,
+    "screener": 256 * MiB,
+    "kis_ratios": 64 * MiB,
+    "kis_opinion": 64 * MiB,
+}
+DISK_TTLS_DAYS: dict[str, float] = {"logos": 30}  # older than any fresh() window that reads them
+GROUPED = {"prices"}  # evict prices/<code>/ as a unit: rows and coverage must go together
+UNMANAGED = {"tokens", "warehouse", "jobs"}  # credentials; warehouse is compacted; jobs pruned by the runner
+TMP_MAX_AGE = 3600
+WAREHOUSE_COMPACT_MIN_PARTS = 8
+JANITOR_INTERVAL = float(os.getenv("CORE_CACHE_JANITOR_INTERVAL", "3600"))
+
+_LEGACY_PRICE = "kis_"        # prices/<code>/kis_<start>_<end>.parquet (one file per range)
+_LEGACY_PAGE_ROWS = 30        # those were a single KIS page: a full page may be truncated
+
+
+def _flush_access() -> None:
+    pending = list(_accessed.items())
+    _accessed.clear()
+    for p, t in pending:
+        try:
+            st = os.stat(p)
+            if t > st.st_atime:
+                os.utime(p, ns=(int(t * 1e9), st.st_mtime_ns))  # mtime (and memory sigs) untouched
+        except OSError:
+            pass
+
+
+def _remove(p: str) -> None:
+    try:
+        os.remove(p)
+    except FileNotFoundError:
+        pass
+    memory.invalidate(_key(p))
+
+
+def _walk(d: str):
+    for root, _, files in os.walk(d):
+        for f in files:
+            p = os.path.join(root, f)
+            try:
+                st = os.stat(p)
+            except OSError:
+                continue
+            yield p, st
+
+
+def _compact_legacy_prices(dry_run: bool) -> int:
+    from core.utils import price_store
+    d = os.path.join(BASE, "prices")
+    if not os.path.isdir(d):
+        return 0
+    n = 0
+    for code in os.listdir(d):
+        if not os.path.isdir(os.path.join(d, code)):
+            continue
+        legacy = sorted(f for f in os.listdir(os.path.join(d, code))
+                        if f.startswith(_LEGACY_PRICE) and f.endswith(".parquet"))
+        if not legacy:
+            continue
+        n += len(legacy)
+        if dry_run:
+            continue
+        frames, spans = [], []
+        for f in legacy:
+            p = os.path.join(d, code, f)
+            try:
+                start, end = (datetime.strptime(x, "%Y%m%d").date() for x in f[len(_LEGACY_PRICE):-8].split("_"))
+                df = pd.read_parquet(p)
+            except Exception:
+                _remove(p)
+                continue
+            if not df.empty:
+                frames.append(df)
+                if len(df) >= _LEGACY_PAGE_ROWS:
+                    start = max(start, pd.Timestamp(df["date"].min()).date())
+                # the file only knew sessions closed before it was written
+                end = min(end, datetime.fromtimestamp(os.stat(p).st_mtime).date() - timedelta(days=1))
+                if start <= end:
+                    spans.append((start, end))
+        rows = pd.concat(frames, ignore_index=True) if frames else None
+        current = load_parquet(os.path.join(d, code, "daily.parquet"))
+        if rows is not None and current is not None:
+            rows = rows[~rows["date"].isin(current["date"])]  # rows already in the store win
+        price_store.append(code, rows, spans)
+        for f in legacy:
+            _remove(os.path.join(d, code, f))
+    return n
+
+
+def _compact_legacy_financials(dry_run: bool) -> int:
+    from core.utils import fs_warehouse
+    d = os.path.join(BASE, "financials")
+    if not os.path.isdir(d):
+        return 0
+    batches: dict[tuple[int, str], list] = {}
+    files = []
+    for p, st in _walk(d):
+        name = os.path.basename(p)
+        stem = name[:-len(".empty.json")] if name.endswith(".empty.json") else name[:-len(".parquet")] if name.endswith(".parquet") else None
+        parts = stem.split("_") if stem else []
+        files.append(p)
+        if len(parts) != 3 or dry_run:
+            continue
+        year, rp, fs_div = parts
+        try:
+            df = None if name.endswith(".empty.json") else pd.read_parquet(p)
+        except Exception:
+            continue
+        written = datetime.fromtimestamp(st.st_mtime)
+        batches.setdefault((int(year), rp), []).append((os.path.basename(os.path.dirname(p)), fs_div, df, written))
+    for (year, rp), entries in batches.items():
+        # one part per original write time keeps the warehouse's freshness honest
+        for written in sorted({e[3] for e in entries}):
+            fs_warehouse.write(year, rp, [(c, f, df) for c, f, df, w in entries if w == written], written_at=written)
+    if not dry_run:
+        for p in files:
+            _remove(p)
+    return len(files)
+
+
+def _compact_warehouse(dry_run: bool) -> int:
+    from core.utils import fs_warehouse
+    n = 0
+    for p_dir, _, files in os.walk(fs_warehouse.ROOT):
+        parts = [f for f in files if f.endswith(".parquet") and not f.startswith(".")]
+        if len(parts) < WAREHOUSE_COMPACT_MIN_PARTS:
+            continue
+        y, rp = (os.path.basename(x).split("=", 1)[1] for x in (os.path.dirname(p_dir), p_dir))
+        n += 1
+        if not dry_run:
+            fs_warehouse.compact(int(y), rp)
+    return n
+
+
+def run_janitor(*, dry_run: bool = False) -> dict:
+    """One pass: fold legacy per-range files into their consolidated stores, drop stale
+    temp files, expire by namespace TTL, then evict least-recently-read units until each
+    namespace fits its byte budget. Returns what was (or, with ``dry_run``, would be) done."""
+    t0 = time.monotonic()
+    _flush_access()
+    report: dict[str, Any] = {
+        "legacy_prices": _compact_legacy_prices(dry_run),
+        "legacy_financials": _compact_legacy_financials(dry_run),
+        "warehouse_compacted": _compact_warehouse(dry_run),
+        "tmp_removed": 0, "namespaces": {},
+    }
+    if not os.path.isdir(BASE):
+        return report
+    now = time.time()
+    for ns in sorted(os.listdir(BASE)):
+        d = os.path.join(BASE, ns)
+        if ns in UNMANAGED or not os.path.isdir(d):
+            continue
+        units: dict[str, list] = {}
+        for p, st in _walk(d):
+            if ".tmp" in os.path.basename(p):
+                if now - st.st_mtime > TMP_MAX_AGE:
+                    report["tmp_removed"] += 1
+                    if not dry_run:
+                        _remove(p)
+                continue
+            rel = os.path.relpath(p, d)
+            unit = os.path.join(d, rel.split(os.sep, 1)[0]) if ns in GROUPED and os.sep in rel else p
+            units.setdefault(unit, []).append((p, st.st_size, max(st.st_atime, st.st_mtime), st.st_mtime))
+        ttl = DISK_TTLS_DAYS.get(ns)
+        budget = DISK_BUDGETS.get(ns, DISK_DEFAULT_BUDGET)
+        used = sum(sz for fs in units.values() for _, sz, _, _ in fs)
+        stats_ns = {"files": sum(map(len, units.values())), "bytes": used, "budget_bytes": budget,
+                    "expired": 0, "evicted": 0, "freed_bytes": 0}
+
+        def drop(unit, files, counter):
+            nonlocal used
+            size = sum(sz for _, sz, _, _ in files)
+            used -= size
+            stats_ns[counter] += len(files)
+            stats_ns["freed_bytes"] += size
+            if dry_run:
+                return
+            if ns == "prices" and os.path.isdir(unit):
+                from core.utils import price_store
+                price_store.evict(os.path.basename(unit))  # under the ticker's append lock
+                return
+            for p, *_ in files:
+                _remove(p)
+
+        order = sorted(units.items(), key=lambda kv: max(a for _, _, a, _ in kv[1]))
+        kept = []
+        for unit, files in order:
+            if ttl is not None and now - max(m for *_, m in files) > ttl * 86400:
+                drop(unit, files, "expired")
+            else:
+                kept.append((unit, files))
+        for unit, files in kept:
+            if used <= budget:
+                break
+            drop(unit, files, "evicted")
+        report["namespaces"][ns] = stats_ns
+        if not dry_run:
+            for root, dirs, files in os.walk(d, topdown=False):
+                if root != d and not dirs and not files:
+                    try:
+                        os.rmdir(root)
+                    except OSError:
+                        pass
+    report["seconds"] = round(time.monotonic() - t0, 3)
+    return report
+
+
+async def janitor_loop(interval: float = JANITOR_INTERVAL) -> None:
+    """Run the janitor every ``interval`` seconds off the event loop (API background task)."""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            report = await asyncio.to_thread(run_janitor)
+            logger.info("cache janitor: %s", report)
+        except Exception:
+            logger.exception("cache janitor failed")
+
+
+if __name__ == "__main__":
+    import argparse
+    ap = argparse.ArgumentParser(description="Enforce data/cache budgets and compact legacy files.")
+    ap.add_argument("--dry-run", action="store_true", help="report only, delete nothing")
+    ap.add_argument("--loop", type=float, metavar="SECONDS", help="keep running every SECONDS")
+    args = ap.parse_args()
+    while True:
+        print(json.dumps(run_janitor(dry_run=args.dry_run), ensure_ascii=False, indent=2))
+        if not args.loop:
+            break
+        time.sleep(args.loop)
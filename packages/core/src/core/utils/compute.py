@@ -0,0 +1,290 @@
+"""Process pool for CPU-bound analytics (portfolio optimisation, backtests, batch scoring).
+
+Handlers ``await compute.run(fn, *args)`` instead of calling ``fn`` inline, so a long
+SLSQP solve no longer stalls the event loop for every other request.
+
+- Workers are started with the API and already have numpy/pandas/scipy imported.
+- Float64 DataFrame arguments (return/price matrices) travel through shared memory:
+  the worker wraps the block in a DataFrame without copying or unpickling it.
+- Each task has a timeout, enforced inside the worker (SIGALRM), with a parent-side
+  backstop that recycles the pool if a worker is stuck in C code. The backstop clock
+  starts when a worker actually picks the task up, not when it is queued.
+- At most ``workers + queue`` tasks are admitted; beyond that ``run`` fails fast with
+  ``ComputeBusyError`` (503) instead of piling up. A task whose caller went away is
+  cancelled if still queued; if already running, it keeps its slot until it ends.
+
+``COMPUTE_WORKERS=0`` runs tasks in a thread instead (no process support, debugging).
+"""
+from __future__ import annotations
+import asyncio
+import logging
+import multiprocessing as mp
+import os
+import pickle
+import signal
+import struct
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+from multiprocessing.shared_memory import SharedMemory
+from typing import Any, Callable
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+WORKERS = int(os.getenv("COMPUTE_WORKERS", str(min(4, os.cpu_count() or 1))))
+QUEUE = int(os.getenv("COMPUTE_QUEUE", str(4 * max(WORKERS, 1))))
+TIMEOUT = float(os.getenv("COMPUTE_TIMEOUT", "30"))
+BACKSTOP_GRACE = 10.0          # parent gives up this long after the worker's own alarm
+SHM_MIN_BYTES = 64 * 1024      # smaller frames are cheaper to pickle
+PRELOAD = ["numpy", "pandas", "scipy.optimize", "core.services.portfolio", "core.services.analysis"]
+
+
+class ComputeBusyError(RuntimeError):
+    """Compute queue is full; retry after ``retry_after`` seconds."""
+
+    def __init__(self, retry_after: float):
+        super().__init__("compute pool busy")
+        self.retry_after = retry_after
+
+
+class ComputeTimeoutError(TimeoutError):
+    """A task ran past its timeout."""
+
+
+# -----------------------------
+# Shared-memory frames
+# -----------------------------
+
+@dataclass
+class SharedFrame:
+    """A float64 DataFrame parked in shared memory; pickles as a name, shape and labels."""
+    name: str
+    shape: tuple[int, int]
+    index: pd.Index
+    columns: pd.Index
+
+    @classmethod
+    def create(cls, df: pd.DataFrame) -> tuple["SharedFrame", SharedMemory]:
+        shm = SharedMemory(create=True, size=max(df.size * 8, 1))
+        np.ndarray(df.shape, np.float64, buffer=shm.buf)[:] = df.to_numpy(dtype=np.float64)
+        return cls(shm.name, df.shape, df.index, df.columns), shm
+
+    def attach(self) -> tuple[pd.DataFrame, SharedMemory]:
+        shm = SharedMemory(name=self.name)
+        arr = np.ndarray(self.shape, np.float64, buffer=shm.buf)
+        return pd.DataFrame(arr, index=self.index, columns=self.columns, copy=False), shm
+
+
+def _shareable(v: Any) -> bool:
+    return (isinstance(v, pd.DataFrame) and v.size * 8 >= SHM_MIN_BYTES
+            and bool((v.dtypes == np.float64).all()))
+
+
+# -----------------------------
+# Worker side
+# -----------------------------
+
+def _warm() -> None:
+    import importlib
+    for m in PRELOAD:
+        importlib.import_module(m)
+
+
+def _ping() -> int:
+    return os.getpid()
+
+
+def _alarm(signum, frame):
+    raise ComputeTimeoutError("compute task timed out")
+
+
+_ABANDONED = -1.0             # written to the start block by a parent whose caller went away
+
+
+def _begin(name: str) -> bool:
+    """Stamp the start time into the task's 8-byte block; False if it was abandoned."""
+    shm = SharedMemory(name=name)
+    try:
+        if struct.unpack_from("d", shm.buf)[0] == _ABANDONED:
+            return False
+        struct.pack_into("d", shm.buf, 0, time.time())
+        return True
+    finally:
+        shm.close()
+
+
+def _invoke(fn: Callable[..., Any], args: tuple, kwargs: dict, timeout: float, started: str) -> bytes:
+    """Run ``fn`` with shared frames attached. The result is pickled here, before the
+    shared blocks are closed, so it never holds a view into them. ``started`` names an
+    8-byte block the start time is written to, for the parent's backstop."""
+    if not _begin(started):
+        return b""  # nobody is waiting for it
+    handles: list[SharedMemory] = []
+
+    def attach(v: Any) -> Any:
+        if isinstance(v, SharedFrame):
+            df, shm = v.attach()
+            handles.append(shm)
+            return df
+        return v
+
+    args = tuple(attach(a) for a in args)
+    kwargs = {k: attach(v) for k, v in kwargs.items()}
+    signal.signal(signal.SIGALRM, _alarm)
+    signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        payload = pickle.dumps(fn(*args, **kwargs), protocol=pickle.HIGHEST_PROTOCOL)
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        del args, kwargs
+        for shm in handles:
+            try:
+                shm.close()
+            except BufferError:
+                pass  # still referenced; unmapped when collected
+    return payload
+
+
+# -----------------------------
+# Pool
+# -----------------------------
+
+class ComputePool:
+    def __init__(self, workers: int = WORKERS, queue: int = QUEUE, timeout: float = TIMEOUT):
+        self.workers = workers
+        self.queue = queue
+        self.timeout = timeout
+        self._executor: ProcessPoolExecutor | None = None
+        self._inflight = 0
+        self._stats = {"submitted": 0, "completed": 0, "failed": 0, "rejected": 0, "timeouts": 0,
+                       "recycled": 0, "shared_bytes": 0, "busy_seconds": 0.0}
+
+    def start(self) -> None:
+        """Spawn and warm every worker now rather than on the first request."""
+        if self.workers <= 0 or self._executor is not None:
+            return
+        method = "forkserver" if "forkserver" in mp.get_all_start_methods() else "spawn"
+        ctx = mp.get_context(method)
+        if method == "forkserver":
+            ctx.set_forkserver_preload(PRELOAD)
+        self._executor = ProcessPoolExecutor(self.workers, mp_context=ctx, initializer=_warm)
+        for _ in range(self.workers):
+            self._executor.submit(_ping)
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def _recycle(self, executor: ProcessPoolExecutor) -> None:
+        """Kill a pool with a stuck or dead worker and start a fresh one."""
+        if self._executor is not executor:
+            return  # someone else already did
+        self._executor = None
+        self._stats["recycled"] += 1
+        for p in list(getattr(executor, "_processes", {}).values()):
+            p.kill()
+        executor.shutdown(wait=False, cancel_futures=True)
+        self.start()
+
+    async def _await(self, executor: ProcessPoolExecutor, fut: Future, timeout: float,
+                     started: SharedMemory) -> bytes:
+        waiter = asyncio.wrap_future(fut)
+        while True:
+            done, _ = await asyncio.wait({waiter}, timeout=1.0)
+            if done:
+                return waiter.result()
+            t_start = struct.unpack_from("d", started.buf)[0]
+            if t_start > 0 and time.time() - t_start > timeout + BACKSTOP_GRACE:
+                self._recycle(executor)
+                raise ComputeTimeoutError("compute task timed out (worker recycled)")
+
+    async def run(self, fn: Callable[..., Any], *args, timeout: float | None = None, **kwargs) -> Any:
+        """``fn(*args, **kwargs)`` in a worker; ``fn`` must be a module-level function."""
+        if self._inflight >= max(self.workers, 1) + self.queue:
+            self._stats["rejected"] += 1
+            raise ComputeBusyError(retry_after=max(1.0, self._stats["busy_seconds"] / max(self._stats["completed"], 1)))
+        timeout = timeout or self.timeout
+        self._inflight += 1
+        self._stats["submitted"] += 1
+        t0 = time.monotonic()
+        shms: list[SharedMemory] = []
+        fut: Future | None = None
+
+        def release() -> None:
+            self._inflight -= 1
+            self._stats["busy_seconds"] += time.monotonic() - t0
+            for shm in shms:
+                shm.close()
+                shm.unlink()
+
+        try:
+            if self.workers <= 0:
+                return await asyncio.wait_for(asyncio.to_thread(fn, *args, **kwargs), timeout)
+
+            def share(v: Any) -> Any:
+                if not _shareable(v):
+                    return v
+                ref, shm = SharedFrame.create(v)
+                shms.append(shm)
+                self._stats["shared_bytes"] += shm.size
+                return ref
+
+            args = tuple(share(a) for a in args)
+            kwargs = {k: share(v) for k, v in kwargs.items()}
+            flag = SharedMemory(create=True, size=8)  # worker stamps its start time here
+            shms.append(flag)
+            self.start()
+            for attempt in range(2):
+                executor = self._executor
+                struct.pack_into("d", flag.buf, 0, 0.0)
+                try:
+                    fut = executor.submit(_invoke, fn, args, kwargs, timeout, flag.name)
+                    payload = await self._await(executor, fut, timeout, flag)
+                    break
+                except BrokenProcessPool:
+                    # a worker died (OOM, recycled under us): pure functions, retry once
+                    self._recycle(executor)
+                    if attempt:
+                        raise
+            self._stats["completed"] += 1
+            return pickle.loads(payload)
+        except (ComputeTimeoutError, asyncio.TimeoutError):
+            self._stats["timeouts"] += 1
+            raise ComputeTimeoutError(f"{getattr(fn, '__name__', fn)} exceeded {timeout:.0f}s") from None
+        except BaseException:
+            self._stats["failed"] += 1
+            if fut is not None and not fut.cancel() and struct.unpack_from("d", flag.buf)[0] == 0:
+                # already handed to the pool's call queue: tell the worker to skip it
+                struct.pack_into("d", flag.buf, 0, _ABANDONED)
+            raise
+        finally:
+            if fut is None or fut.done():
+                release()
+            else:
+                # still running in a worker (caller cancelled): it holds its slot and its
+                # shared blocks until it ends, so the admission bound counts it
+                loop = asyncio.get_running_loop()
+                fut.add_done_callback(lambda _: _threadsafe(loop, release))
+
+    def snapshot(self) -> dict[str, Any]:
+        return {"workers": self.workers, "capacity": max(self.workers, 1) + self.queue,
+                "inflight": self._inflight, "started": self._executor is not None,
+                **{k: round(v, 3) if isinstance(v, float) else v for k, v in self._stats.items()}}
+
+
+def _threadsafe(loop: asyncio.AbstractEventLoop, fn: Callable[[], None]) -> None:
+    try:
+        loop.call_soon_threadsafe(fn)
+    except RuntimeError:
+        pass  # loop closed (shutdown)
+
+
+pool = ComputePool()
+
+
+async def run(fn: Callable[..., Any], *args, timeout: float | None = None, **kwargs) -> Any:
+    return await pool.run(fn, *args, timeout=timeout, **kwargs)
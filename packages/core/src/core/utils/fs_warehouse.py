@@ -0,0 +1,319 @@
+"""Partitioned Parquet warehouse for DART financial statement rows.
+
+Layout under ``warehouse/financials/`` (hive partitioning)::
+
+    bsns_year=2024/reprt_code=11011/part-<ts>-<batch>.parquet
+
+Every write appends one part file holding one or more ``(corp_code, fs_div)``
+statements, sorted by ``corp_code`` and ``account_id`` so Parquet statistics let
+scans skip row groups. A write is a *batch*: readers only see the newest batch per
+``(corp_code, bsns_year, reprt_code, fs_div)``, so re-fetching a statement simply
+supersedes the old rows. "No data" answers are stored as a single tombstone row
+with ``_status`` ``"013"``. Reads resolve the newest batches from an in-process index
+with one row per batch per part file; parts are immutable, so each one is indexed
+once, and only the files holding wanted batches are scanned. ``compact`` folds a partition's parts into one file; once
+a partition collects ``COMPACT_AFTER_PARTS`` parts, a write queues that on a
+background thread rather than doing it in the caller's request.
+"""
+from __future__ import annotations
+import functools
+import logging
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from core.utils.cache import BASE, try_lock
+
+logger = logging.getLogger(__name__)
+
+ROOT = os.path.join(BASE, "warehouse", "financials")
+
+# Raw DART columns kept (fnlttSinglAcntAll ∪ fnlttMultiAcnt), all stored as strings
+ROW_COLUMNS = [
+    "corp_code", "fs_div", "account_id", "account_nm", "account_detail", "sj_div", "sj_nm",
+    "thstrm_nm", "thstrm_amount", "thstrm_add_amount", "frmtrm_nm", "frmtrm_amount",
+    "frmtrm_q_nm", "frmtrm_q_amount", "frmtrm_add_amount", "bfefrm_nm", "bfefrm_amount",
+    "ord", "currency", "rcept_no", "stock_code", "fs_nm",
+]
+META = [("_status", pa.string()), ("_batch", pa.string()), ("_row", pa.int32()),
+        ("_written_at", pa.timestamp("us"))]
+FILE_SCHEMA = pa.schema([(c, pa.string()) for c in ROW_COLUMNS] + META)
+PARTITIONING = ds.partitioning(pa.schema([("bsns_year", pa.int32()), ("reprt_code", pa.string())]), flavor="hive")
+SCHEMA = pa.schema(list(FILE_SCHEMA) + list(PARTITIONING.schema))
+
+STATUS_OK = "000"
+STATUS_EMPTY = "013"
+
+COMPACT_AFTER_PARTS = 64  # fold a partition once it accumulates this many part files
+ROW_GROUP_SIZE = 16_384   # small groups so corp_code statistics can skip most of a file
+SCAN_RETRIES = 3          # a compaction may remove parts between listing and reading
+
+_compactor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="warehouse-compact")
+_queued: set[tuple[int, str]] = set()
+_queued_lock = threading.Lock()
+
+
+@dataclass
+class Statement:
+    """What the warehouse knows about one (corp_code, year, reprt_code, fs_div)."""
+    status: str
+    written_at: datetime
+    rows: pd.DataFrame
+
+
+def _partition_dir(year: int, reprt_code: str) -> str:
+    return os.path.join(ROOT, f"bsns_year={int(year)}", f"reprt_code={reprt_code}")
+
+
+def _to_table(entries: list[tuple[str, str, pd.DataFrame | None]], written_at: datetime) -> pa.Table:
+    frames, corp, fs, status, batch, row = [], [], [], [], [], []
+    for corp_code, fs_div, df in entries:
+        empty = df is None or df.empty
+        n = 1 if empty else len(df)
+        frames.append(pd.DataFrame(index=range(1)) if empty else df.reset_index(drop=True))
+        corp += [corp_code] * n
+        fs += [fs_div] * n
+        status += [STATUS_EMPTY if empty else STATUS_OK] * n
+        batch += [uuid.uuid4().hex] * n
+        row += range(n)
+    df = pd.concat(frames, ignore_index=True).reindex(columns=ROW_COLUMNS)
+    df["corp_code"], df["fs_div"] = corp, fs
+    for c in ROW_COLUMNS:
+        df[c] = df[c].astype(object).where(df[c].isna(), df[c].astype(str)).where(df[c].notna(), None)
+    df["_status"], df["_batch"], df["_row"] = status, batch, row
+    df["_written_at"] = pd.Timestamp(written_at)
+    df = df.sort_values(["corp_code", "account_id", "fs_div", "_row"], na_position="first", kind="stable")
+    return pa.Table.from_pandas(df, schema=FILE_SCHEMA, preserve_index=False)
+
+
+def write(year: int, reprt_code: str, entries: list[tuple[str, str, pd.DataFrame | None]],
+          *, written_at: datetime | None = None) -> None:
+    """Append statements for one partition. ``entries`` are ``(corp_code, fs_div, rows)``;
+    ``rows`` None/empty records a "no data" answer. ``written_at`` backdates imported data."""
+    if not entries:
+        return
+    d = _partition_dir(year, reprt_code)
+    os.makedirs(d, exist_ok=True)
+    table = _to_table(entries, written_at or datetime.now())
+    name = f"part-{time.time_ns()}-{uuid.uuid4().hex[:8]}.parquet"
+    tmp = os.path.join(d, f".{name}.tmp")
+    pq.write_table(table, tmp, row_group_size=ROW_GROUP_SIZE)
+    os.replace(tmp, os.path.join(d, name))  # readers never see half-written parts
+    _remember(os.path.join(d, name), _batches_of(table, os.path.join(d, name)))
+    if len([f for f in os.listdir(d) if f.endswith(".parquet")]) >= COMPACT_AFTER_PARTS:
+        compact_later(year, reprt_code)
+
+
+def compact_later(year: int, reprt_code: str) -> None:
+    """Queue ``compact`` on the background compactor (at most once per partition)."""
+    key = (int(year), reprt_code)
+    with _queued_lock:
+        if key in _queued:
+            return
+        _queued.add(key)
+
+    def run() -> None:
+        try:
+            compact(*key)
+        except Exception:
+            logger.exception("warehouse compaction of %s failed", key)
+        finally:
+            with _queued_lock:
+                _queued.discard(key)
+    _compactor.submit(run)
+
+
+# ----- batch index -------------------------------------------------------
+_BATCH_COLUMNS = ["corp_code", "fs_div", "_batch", "_status", "_written_at"]
+_part_batches: dict[str, pd.DataFrame] = {}                      # part path → one row per batch
+_partition_latest: dict[str, tuple[tuple[str, ...], pd.DataFrame]] = {}  # dir → (parts, newest per key)
+_index_lock = threading.Lock()
+
+
+def _batches_of(table: pa.Table, path: str) -> pd.DataFrame:
+    df = table.select(_BATCH_COLUMNS).to_pandas().drop_duplicates("_batch")
+    df["_file"] = path
+    return df
+
+
+def _remember(path: str, batches: pd.DataFrame) -> None:
+    with _index_lock:
+        _part_batches[path] = batches
+
+
+def _partition_dirs(year: int | None, reprt_code: str | None) -> list[str]:
+    if not os.path.isdir(ROOT):
+        return []
+    years = [f"bsns_year={int(year)}"] if year is not None else sorted(
+        y for y in os.listdir(ROOT) if y.startswith("bsns_year="))
+    out = []
+    for y in years:
+        yd = os.path.join(ROOT, y)
+        if not os.path.isdir(yd):
+            continue
+        out += [os.path.join(yd, r) for r in sorted(os.listdir(yd))
+                if r.startswith("reprt_code=") and (reprt_code is None or r == f"reprt_code={reprt_code}")]
+    return out
+
+
+def _latest_in(d: str) -> pd.DataFrame:
+    """Newest batch per (corp_code, fs_div) in one partition, with the part file holding it.
+    Only parts not seen before are read (key columns only)."""
+    parts = tuple(sorted(f for f in os.listdir(d) if f.endswith(".parquet")))
+    with _index_lock:
+        hit = _partition_latest.get(d)
+        if hit is not None and hit[0] == parts:
+            return hit[1]
+    frames = []
+    for f in parts:
+        path = os.path.join(d, f)
+        b = _part_batches.get(path)
+        if b is None:
+            b = _batches_of(pq.ParquetFile(path).read(columns=_BATCH_COLUMNS), path)
+            _remember(path, b)
+        frames.append(b)
+    y, rp = os.path.basename(os.path.dirname(d)), os.path.basename(d)
+    if frames:
+        # a batch and its compacted copy tie on _written_at; the later (compacted) file wins
+        df = pd.concat(frames, ignore_index=True).sort_values(["_written_at", "_file"], kind="stable")
+        df = df.drop_duplicates(["corp_code", "fs_div"], keep="last")
+    else:
+        df = pd.DataFrame(columns=_BATCH_COLUMNS + ["_file"])
+    df = df.assign(bsns_year=int(y.split("=", 1)[1]), reprt_code=rp.split("=", 1)[1]).reset_index(drop=True)
+    with _index_lock:
+        for path in [p for p in _part_batches if os.path.dirname(p) == d and os.path.basename(p) not in parts]:
+            del _part_batches[path]  # compacted away
+        _partition_latest[d] = (parts, df)
+    return df
+
+
+def _latest(year=None, reprt_code=None, corp_codes=None, fs_div=None) -> pd.DataFrame:
+    frames = [_latest_in(d) for d in _partition_dirs(year, reprt_code)]
+    if not frames:
+        return pd.DataFrame(columns=_BATCH_COLUMNS + ["_file", "bsns_year", "reprt_code"])
+    df = pd.concat(frames, ignore_index=True)
+    if corp_codes is not None:
+        df = df[df["corp_code"].isin(list(corp_codes))]
+    if fs_div is not None:
+        df = df[df["fs_div"] == fs_div]
+    return df
+
+
+@functools.lru_cache(maxsize=64)
+def _dataset(files: tuple[str, ...]) -> ds.Dataset:
+    """Dataset over exactly these parts (no directory discovery); reused until the part set changes."""
+    return ds.dataset(list(files), format="parquet", partitioning=PARTITIONING, partition_base_dir=ROOT,
+                      schema=SCHEMA, exclude_invalid_files=False)
+
+
+def _rescan(fn):
+    """Retry a read whose dataset listing went stale (parts compacted away mid-scan)."""
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        for attempt in range(SCAN_RETRIES):
+            try:
+                return fn(*args, **kwargs)
+            except FileNotFoundError:
+                if attempt == SCAN_RETRIES - 1:
+                    raise
+    return wrapper
+
+
+@_rescan
+def index(*, year: int | None = None, corp_codes: list[str] | None = None) -> pd.DataFrame:
+    """Newest batch per (corp_code, bsns_year, reprt_code, fs_div) with its status and
+    write time; served from the batch index. Cheap change detection for derived tables."""
+    cols = ["corp_code", "bsns_year", "reprt_code", "fs_div", "_batch", "_status", "_written_at"]
+    return _latest(year, None, corp_codes)[cols].sort_values("_written_at").reset_index(drop=True)
+
+
+@_rescan
+def query(*, year: int | None = None, reprt_code: str | None = None,
+          corp_codes: list[str] | None = None, fs_div: str | None = None,
+          account_ids: list[str] | None = None, account_nms: list[str] | None = None,
+          columns: list[str] | None = None, include_empty: bool = False) -> pd.DataFrame:
+    """Newest rows matching the filters. The batch index picks the batches and the part
+    files to open; account/corp filters are pushed down into the scan (row-group statistics)."""
+    latest = _latest(year, reprt_code, corp_codes, fs_div)
+    if not include_empty:
+        latest = latest[latest["_status"] == STATUS_OK]
+    if latest.empty:
+        return pd.DataFrame(columns=columns or SCHEMA.names)
+
+    f = pc.field("_batch").isin(latest["_batch"].tolist())
+    if corp_codes is not None:
+        f = f & pc.field("corp_code").isin(list(corp_codes))
+    if account_ids is not None:
+        f = f & pc.field("account_id").isin(list(account_ids))
+    if account_nms is not None:
+        f = f & pc.field("account_nm").isin(list(account_nms))
+    cols = None if columns is None else list(dict.fromkeys(list(columns) + ["_batch", "_row"]))
+    df = _dataset(tuple(sorted(latest["_file"].unique()))).to_table(filter=f, columns=cols).to_pandas()
+    # a part and its compacted copy may both be visible mid-compaction
+    df = df.drop_duplicates(["_batch", "_row"])
+    order = [c for c in ("corp_code", "bsns_year", "reprt_code", "fs_div") if c in df.columns]
+    df = df.sort_values(order + ["_batch", "_row"], kind="stable")
+    if "bsns_year" in df.columns:
+        df["bsns_year"] = df["bsns_year"].astype(str)
+    df = df.reset_index(drop=True)
+    return df[columns] if columns is not None else df
+
+
+def load_company(corp_code: str, year: int) -> dict[tuple[str, str], Statement]:
+    """Every known statement of one company-year, keyed by ``(reprt_code, fs_div)``."""
+    df = query(year=year, corp_codes=[corp_code], include_empty=True)
+    out: dict[tuple[str, str], Statement] = {}
+    for (rp, fs), g in df.groupby(["reprt_code", "fs_div"], sort=False):
+        g = g.sort_values("_row")
+        status = g["_status"].iloc[0]
+        rows = g[ROW_COLUMNS + ["bsns_year", "reprt_code"]].reset_index(drop=True) if status == STATUS_OK else g.iloc[0:0]
+        out[(rp, fs)] = Statement(status=status, written_at=g["_written_at"].iloc[0].to_pydatetime(), rows=rows)
+    return out
+
+
+def compact(year: int, reprt_code: str) -> None:
+    """Fold a partition into one sorted file, dropping superseded batches. One compactor
+    per partition at a time (background compactor, janitor, other processes); the others skip."""
+    d = _partition_dir(year, reprt_code)
+    if not os.path.isdir(d):
+        return
+    with try_lock(os.path.join(d, ".compact.lock")) as locked:
+        if locked:
+            _compact(d)
+
+
+def _compact(d: str) -> None:
+    parts, tables = [], []
+    for f in sorted(f for f in os.listdir(d) if f.endswith(".parquet")):
+        try:
+            tables.append(pq.read_table(os.path.join(d, f), schema=FILE_SCHEMA))
+        except FileNotFoundError:
+            continue  # removed since listing (another process's compaction)
+        parts.append(f)
+    if len(parts) <= 1:
+        return
+    t = pa.concat_tables(tables)
+    df = t.to_pandas().drop_duplicates(["_batch", "_row"])
+    keys = ["corp_code", "fs_div"]
+    newest = df.drop_duplicates("_batch").sort_values("_written_at").groupby(keys)["_batch"].last()
+    df = df[df["_batch"].isin(newest.tolist())]
+    df = df.sort_values(["corp_code", "account_id", "fs_div", "_row"], na_position="first", kind="stable")
+    name = f"part-{time.time_ns()}-compact.parquet"
+    tmp = os.path.join(d, f".{name}.tmp")
+    table = pa.Table.from_pandas(df, schema=FILE_SCHEMA, preserve_index=False)
+    pq.write_table(table, tmp, row_group_size=ROW_GROUP_SIZE)
+    os.replace(tmp, os.path.join(d, name))
+    _remember(os.path.join(d, name), _batches_of(table, os.path.join(d, name)))
+    for f in parts:
+        try:
+            os.remove(os.path.join(d, f))
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,48 @@
+"""Hangul helpers for name search: keystroke-level jamo and initial consonants (초성).
+
+Syllables are split the way they are typed on a 2-set keyboard, compound vowels and
+finals included (와 → ㅇㅗㅏ, 닭 → ㄷㅏㄹㄱ). A half-typed query ("삼성저", "LG에너") is
+then a plain prefix of the full name's jamo string.
+"""
+from __future__ import annotations
+
+_BASE, _LAST = 0xAC00, 0xD7A3
+CHO = "ㄱㄲㄴㄷㄸㄹㅁㅂㅃㅅㅆㅇㅈㅉㅊㅋㅌㅍㅎ"
+JUNG = ["ㅏ", "ㅐ", "ㅑ", "ㅒ", "ㅓ", "ㅔ", "ㅕ", "ㅖ", "ㅗ", "ㅗㅏ", "ㅗㅐ", "ㅗㅣ", "ㅛ", "ㅜ",
+        "ㅜㅓ", "ㅜㅔ", "ㅜㅣ", "ㅠ", "ㅡ", "ㅡㅣ", "ㅣ"]
+JONG = ["", "ㄱ", "ㄲ", "ㄱㅅ", "ㄴ", "ㄴㅈ", "ㄴㅎ", "ㄷ", "ㄹ", "ㄹㄱ", "ㄹㅁ", "ㄹㅂ", "ㄹㅅ", "ㄹㅌ",
+        "ㄹㅍ", "ㄹㅎ", "ㅁ", "ㅂ", "ㅂㅅ", "ㅅ", "ㅆ", "ㅇ", "ㅈ", "ㅊ", "ㅋ", "ㅌ", "ㅍ", "ㅎ"]
+# 단독 입력된 겹자모(ㄳ, ㅘ …)도 타건 순서로 분해
+_COMPOUND = {"ㄳ": "ㄱㅅ", "ㄵ": "ㄴㅈ", "ㄶ": "ㄴㅎ", "ㄺ": "ㄹㄱ", "ㄻ": "ㄹㅁ", "ㄼ": "ㄹㅂ", "ㄽ": "ㄹㅅ",
+             "ㄾ": "ㄹㅌ", "ㄿ": "ㄹㅍ", "ㅀ": "ㄹㅎ", "ㅄ": "ㅂㅅ", "ㅘ": "ㅗㅏ", "ㅙ": "ㅗㅐ", "ㅚ": "ㅗㅣ",
+             "ㅝ": "ㅜㅓ", "ㅞ": "ㅜㅔ", "ㅟ": "ㅜㅣ", "ㅢ": "ㅡㅣ"}
+_CONSONANTS = frozenset("ㄱㄲㄳㄴㄵㄶㄷㄸㄹㄺㄻㄼㄽㄾㄿㅀㅁㅂㅃㅄㅅㅆㅇㅈㅉㅊㅋㅌㅍㅎ")
+
+
+def normalize(s: str) -> str:
+    """Search key: no whitespace, case-folded (``"LG 전자"`` → ``"lg전자"``)."""
+    return "".join(s.split()).casefold()
+
+
+def is_syllable(ch: str) -> bool:
+    return _BASE <= ord(ch) <= _LAST
+
+
+def is_consonant(ch: str) -> bool:
+    return ch in _CONSONANTS
+
+
+def jamo(s: str) -> str:
+    out = []
+    for ch in s:
+        if is_syllable(ch):
+            i = ord(ch) - _BASE
+            out.append(CHO[i // 588] + JUNG[(i % 588) // 28] + JONG[i % 28])
+        else:
+            out.append(_COMPOUND.get(ch, ch))
+    return "".join(out)
+
+
+def chosung(s: str) -> str:
+    """Initial consonant per syllable; other characters are kept (``"LG전자"`` → ``"LGㅈㅈ"``)."""
+    return "".join(CHO[(ord(ch) - _BASE) // 588] if is_syllable(ch) else ch for ch in s)
@@ -0,0 +1,165 @@
+"""KRX trading calendar and the cache-validity rules built on it.
+
+- Daily market data is valid until the next session close after it was written
+  (a Friday-evening fetch lasts through the weekend; a 10:00 fetch expires at 15:30).
+- Financial statements are valid until the next DART filing window opens; inside a
+  window new filings can land any day, so they last one session there.
+
+Holidays are listed for 2024–2026. Add closures (e.g. a snap election) or further
+years with KRX_HOLIDAYS_FILE, a JSON list of "YYYY-MM-DD". A year with no holiday data
+at all falls back to weekends only, and a warning is logged once for it.
+"""
+from __future__ import annotations
+import json
+import logging
+import os
+from datetime import date, datetime, time, timedelta
+from functools import lru_cache
+from zoneinfo import ZoneInfo
+
+logger = logging.getLogger(__name__)
+
+KST = ZoneInfo("Asia/Seoul")
+SESSION_OPEN = time(9, 0)
+SESSION_CLOSE = time(15, 30)
+SETTLE = timedelta(minutes=10)  # 종가 확정·시세 반영 여유
+
+# 휴장일 (주말 제외). 12/31 은 연말 휴장
+HOLIDAYS = {
+    # 2024
+    "2024-01-01", "2024-02-09", "2024-02-12", "2024-03-01", "2024-04-10", "2024-05-01",
+    "2024-05-06", "2024-05-15", "2024-06-06", "2024-08-15", "2024-09-16", "2024-09-17",
+    "2024-09-18", "2024-10-01", "2024-10-03", "2024-10-09", "2024-12-25", "2024-12-31",
+    # 2025
+    "2025-01-01", "2025-01-27", "2025-01-28", "2025-01-29", "2025-01-30", "2025-03-03",
+    "2025-05-01", "2025-05-05", "2025-05-06", "2025-06-03", "2025-06-06", "2025-08-15",
+    "2025-10-03", "2025-10-06", "2025-10-07", "2025-10-08", "2025-10-09", "2025-12-25",
+    "2025-12-31",
+    # 2026
+    "2026-01-01", "2026-02-16", "2026-02-17", "2026-02-18", "2026-03-02", "2026-05-01",
+    "2026-05-05", "2026-05-25", "2026-06-03", "2026-08-17", "2026-09-24", "2026-09-25",
+    "2026-10-05", "2026-10-09", "2026-12-25", "2026-12-31",
+}
+
+# DART 정기보고서 제출 기간 (month, day) ~ (month, day): 사업·1분기·반기·3분기
+FILING_WINDOWS = [((2, 1), (4, 15)), ((5, 1), (5, 31)), ((8, 1), (8, 31)), ((11, 1), (11, 30))]
+
+
+@lru_cache(maxsize=1)
+def _holidays() -> frozenset[date]:
+    days = set(HOLIDAYS)
+    extra = os.getenv("KRX_HOLIDAYS_FILE")
+    if extra:
+        try:
+            with open(extra, encoding="utf-8") as f:
+                days.update(json.load(f))
+        except (OSError, ValueError):
+            pass
+    return frozenset(date.fromisoformat(d) for d in days)
+
+
+def _kst(ts: datetime | None) -> datetime:
+    """Aware KST datetime; naive values are taken as this machine's local time."""
+    if ts is None:
+        return datetime.now(KST)
+    return ts.astimezone(KST)
+
+
+# -----------------------------
+# Sessions
+# -----------------------------
+
+@lru_cache(maxsize=1)
+def _holiday_years() -> frozenset[int]:
+    return frozenset(d.year for d in _holidays())
+
+
+@lru_cache(maxsize=None)
+def _warn_uncovered(year: int) -> None:
+    logger.warning("no KRX holiday data for %d: treating only weekends as closed "
+                   "(add the year's holidays via KRX_HOLIDAYS_FILE)", year)
+
+
+def is_trading_day(d: date) -> bool:
+    holidays = _holidays()
+    if d.year not in _holiday_years():
+        _warn_uncovered(d.year)
+    return d.weekday() < 5 and d not in holidays
+
+
+def next_trading_day(d: date) -> date:
+    """First trading day strictly after ``d``."""
+    d += timedelta(days=1)
+    while not is_trading_day(d):
+        d += timedelta(days=1)
+    return d
+
+
+def previous_trading_day(d: date) -> date:
+    """Last trading day strictly before ``d``."""
+    d -= timedelta(days=1)
+    while not is_trading_day(d):
+        d -= timedelta(days=1)
+    return d
+
+
+def trading_days(start: date, end: date) -> list[date]:
+    out, d = [], start
+    while d <= end:
+        if is_trading_day(d):
+            out.append(d)
+        d += timedelta(days=1)
+    return out
+
+
+def session_close(d: date) -> datetime:
+    return datetime.combine(d, SESSION_CLOSE, tzinfo=KST)
+
+
+def next_close(after: datetime | None = None) -> datetime:
+    """The first settled session close strictly after ``after`` (default now)."""
+    now = _kst(after)
+    d = now.date()
+    if not (is_trading_day(d) and now < session_close(d) + SETTLE):
+        d = next_trading_day(d)
+    return session_close(d) + SETTLE
+
+
+def last_completed_session(now: datetime | None = None) -> date:
+    """Latest trading day whose bar is final at ``now``."""
+    now = _kst(now)
+    d = now.date()
+    if is_trading_day(d) and now >= session_close(d) + SETTLE:
+        return d
+    return previous_trading_day(d)
+
+
+# -----------------------------
+# Cache validity
+# -----------------------------
+
+def daily_valid_until(written_at: datetime) -> datetime:
+    """Daily bars/ratios fetched at ``written_at`` can only change at the next close."""
+    return next_close(written_at)
+
+
+def in_filing_window(d: date) -> bool:
+    return any(date(d.year, *s) <= d <= date(d.year, *e) for s, e in FILING_WINDOWS)
+
+
+def next_filing_window(after: date) -> date:
+    """Opening day of the first filing window strictly after ``after``."""
+    starts = sorted(date(y, *s) for y in (after.year, after.year + 1) for s, _ in FILING_WINDOWS)
+    return next(d for d in starts if d > after)
+
+
+def statement_valid_until(written_at: datetime) -> datetime:
+    """Statements (and "no data" answers) only change when reports are filed."""
+    ts = _kst(written_at)
+    if in_filing_window(ts.date()):
+        return next_close(ts)
+    return datetime.combine(next_filing_window(ts.date()), time(0, 0), tzinfo=KST)
+
+
+def is_valid(valid_until: datetime, now: datetime | None = None) -> bool:
+    return _kst(now) < valid_until
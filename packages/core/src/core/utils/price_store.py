@@ -0,0 +1,178 @@
+"""Per-ticker append-only daily price store.
+
+Layout under ``prices/<stock_code>/``:
+- ``daily.parquet``  every bar fetched so far, one row per date (sorted)
+- ``coverage.json``  merged ``[start, end]`` date spans known to be complete, plus
+  the still-open session's span and the close it is valid until
+
+Any requested range is answered from local rows; only the gaps in coverage
+need to go upstream.
+"""
+from __future__ import annotations
+import os
+import threading
+from datetime import date, datetime, timedelta
+import pandas as pd
+from core.utils import krx_calendar
+from core.utils.cache import EXPIRED, path, load_json, save_json, load_parquet, save_parquet
+
+Span = tuple[date, date]
+
+PRICE_COLUMNS = ["date", "open", "high", "low", "close", "volume", "transaction_amount", "change"]
+
+# append() is read-modify-write; serialise it per ticker (request path vs cache janitor)
+_append_locks: dict[str, threading.Lock] = {}
+
+
+def _files(stock_code: str) -> tuple[str, str]:
+    return path("prices", stock_code, "daily.parquet"), path("prices", stock_code, "coverage.json")
+
+
+def _as_date(d: str | date | pd.Timestamp) -> date:
+    return pd.Timestamp(d).date()
+
+
+# -----------------------------
+# Span arithmetic
+# -----------------------------
+
+def merge_spans(spans: list[Span]) -> list[Span]:
+    """Sort and merge overlapping or day-adjacent spans."""
+    out: list[Span] = []
+    for s, e in sorted(spans):
+        if out and s <= out[-1][1] + timedelta(days=1):
+            out[-1] = (out[-1][0], max(out[-1][1], e))
+        else:
+            out.append((s, e))
+    return out
+
+
+def missing_spans(covered: list[Span], start: date, end: date) -> list[Span]:
+    """Sub-spans of ``[start, end]`` not present in ``covered`` (which must be merged).
+    Days after today (KST) have no bars yet and are never reported missing."""
+    end = min(end, datetime.now(krx_calendar.KST).date())
+    gaps: list[Span] = []
+    cur = start
+    for s, e in covered:
+        if e < cur:
+            continue
+        if s > end:
+            break
+        if s > cur:
+            gaps.append((cur, min(end, s - timedelta(days=1))))
+        cur = max(cur, e + timedelta(days=1))
+        if cur > end:
+            break
+    if cur <= end:
+        gaps.append((cur, end))
+    # 휴장일(주말·공휴일)만으로 이루어진 구간은 조회 불필요
+    return [(s, e) for s, e in gaps if krx_calendar.trading_days(s, e)]
+
+
+# -----------------------------
+# Store I/O
+# -----------------------------
+
+def load_coverage(stock_code: str, now: datetime | None = None) -> list[Span]:
+    """Covered spans: closed sessions, plus the open session's rows until its close."""
+    _, cov_file = _files(stock_code)
+    raw = load_json(cov_file) or {}
+    spans = [(_as_date(s), _as_date(e)) for s, e in raw.get("spans", [])]
+    partial = raw.get("partial")
+    if partial and krx_calendar.is_valid(datetime.fromisoformat(partial[2]), now):
+        spans.append((_as_date(partial[0]), _as_date(partial[1])))
+    return merge_spans(spans)
+
+
+def lookup(stock_code: str, start: date, end: date) -> tuple[pd.DataFrame, datetime] | None:
+    """Stored rows for ``[start, end]`` and the moment they stop being fresh: never for
+    closed sessions, the open session's close when it is included. Ranges the store
+    does not fully cover return their rows as already expired (None if there are none)."""
+    _, cov_file = _files(stock_code)
+    raw = load_json(cov_file) or {}
+    closed = merge_spans([(_as_date(s), _as_date(e)) for s, e in raw.get("spans", [])])
+    if not missing_spans(closed, start, end):
+        return read_range(stock_code, start, end), datetime.max.replace(tzinfo=krx_calendar.KST)
+    partial = raw.get("partial")
+    if partial and not missing_spans(merge_spans(closed + [(_as_date(partial[0]), _as_date(partial[1]))]), start, end):
+        return read_range(stock_code, start, end), datetime.fromisoformat(partial[2])
+    df = read_range(stock_code, start, end)
+    return (df, EXPIRED) if not df.empty else None
+
+
+def read_range(stock_code: str, start: date, end: date) -> pd.DataFrame:
+    data_file, _ = _files(stock_code)
+    df = load_parquet(data_file)
+    if df is None or df.empty:
+        return pd.DataFrame(columns=PRICE_COLUMNS)
+    mask = (df["date"] >= f"{start:%Y-%m-%d}") & (df["date"] <= f"{end:%Y-%m-%d}")
+    return df[mask].reset_index(drop=True)
+
+
+def last_modified(stock_code: str) -> float | None:
+    """mtime of the ticker's rows (change detection for derived tables)."""
+    data_file, _ = _files(stock_code)
+    try:
+        return os.path.getmtime(data_file)
+    except OSError:
+        return None
+
+
+def last_close(stock_code: str) -> tuple[str, float] | None:
+    data_file, _ = _files(stock_code)
+    df = load_parquet(data_file)
+    if df is None or df.empty:
+        return None
+    close = df["close"].dropna()
+    return (df.loc[close.index[-1], "date"], float(close.iloc[-1])) if not close.empty else None
+
+
+def append(stock_code: str, df: pd.DataFrame, spans: list[Span]) -> None:
+    """Merge freshly fetched rows into the store and mark ``spans`` as covered.
+
+    Spans past the last closed session only count until the next close: the current
+    session's bar is still forming, so it is refetched once that close has passed.
+    """
+    with _append_locks.setdefault(stock_code, threading.Lock()):
+        _append(stock_code, df, spans)
+
+
+def evict(stock_code: str) -> None:
+    """Drop a ticker's rows and coverage together (cache janitor). Coverage goes first,
+    under the append lock, so no reader sees spans whose rows are gone."""
+    from core.utils.cache import _remove
+    data_file, cov_file = _files(stock_code)
+    d = os.path.dirname(data_file)
+    with _append_locks.setdefault(stock_code, threading.Lock()):
+        _remove(cov_file)
+        _remove(data_file)
+        for f in os.listdir(d):
+            _remove(os.path.join(d, f))
+
+
+def _append(stock_code: str, df: pd.DataFrame | None, spans: list[Span]) -> None:
+    data_file, cov_file = _files(stock_code)
+    if df is not None and not df.empty:
+        existing = load_parquet(data_file)
+        merged = df if existing is None or existing.empty else pd.concat([existing, df], ignore_index=True)
+        merged = (merged.drop_duplicates(subset="date", keep="last")
+                        .sort_values("date").reset_index(drop=True))
+        save_parquet(merged, data_file)
+
+    now = datetime.now(krx_calendar.KST)
+    last_complete = krx_calendar.last_completed_session(now)
+    raw = load_json(cov_file) or {}
+    closed = [(_as_date(s), _as_date(e)) for s, e in raw.get("spans", [])]
+    closed += [(s, min(e, last_complete)) for s, e in spans if s <= last_complete]
+    partial = raw.get("partial")
+    open_spans = [(max(s, last_complete + timedelta(days=1)), e) for s, e in spans if e > last_complete]
+    if open_spans:
+        valid = krx_calendar.next_close(now)
+        partial = [f"{min(s for s, _ in open_spans):%Y-%m-%d}", f"{max(e for _, e in open_spans):%Y-%m-%d}",
+                   valid.isoformat()]
+    elif not spans:
+        return
+    out = {"spans": [[f"{s:%Y-%m-%d}", f"{e:%Y-%m-%d}"] for s, e in merge_spans(closed)]}
+    if partial and krx_calendar.is_valid(datetime.fromisoformat(partial[2]), now):
+        out["partial"] = partial
+    save_json(out, cov_file)
@@ -0,0 +1,26 @@
+from fastapi import HTTPException, Request
+from core.clients.registry import UpstreamClients
+from core.clients.dart import DARTClient
+from core.clients.kis import KISClient
+from core.clients.naver import NaverImageSearch
+
+# Shared upstream clients: created in main.py at startup, closed at shutdown
+
+def get_upstreams(request: Request) -> UpstreamClients:
+    return request.app.state.upstreams
+
+def _client(request: Request, name: str):
+    try:
+        return getattr(get_upstreams(request), name)
+    except RuntimeError as e:
+        # 500 + 친절 메시지 (missing credentials)
+        raise HTTPException(500, detail=str(e))
+
+async def get_dart(request: Request) -> DARTClient:
+    return _client(request, "dart")
+
+async def get_kis(request: Request) -> KISClient:
+    return _client(request, "kis")
+
+async def get_naver(request: Request) -> NaverImageSearch:
+    return _client(request, "naver")
@@ -1,9 +1,17 @@
-from fastapi import FastAPI, Depends, HTTPException, APIRouter
+import asyncio
+from fastapi import FastAPI, Depends, HTTPException, APIRouter, Request
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
-from .routes import market, analysis, portfolio, lookup, metrics
+from .routes import market, analysis, portfolio, lookup, metrics, screener, jobs
+from .deps import get_dart
 from core.clients.dart import DARTClient
+from core.clients.registry import UpstreamClients
+from core.clients.resilience import CircuitOpenError
 from core.services.market_data import dart_financials
-import os
+from core.services.lookup import directory
+from core.services.jobs import runner as job_runner
+from core.services import warmup
+from core.utils import cache, compute
 from dotenv import load_dotenv, find_dotenv
 load_dotenv(find_dotenv())  # 루트 .env까지 탐색해서 로드
 
@@ -15,6 +23,8 @@ app.include_router(analysis.router, prefix="/analysis", tags=["analysis"])
 app.include_router(portfolio.router, prefix="/portfolio", tags=["portfolio"])
 app.include_router(lookup.router, prefix="/lookup", tags=["lookup"])
 app.include_router(metrics.router, prefix="/metrics", tags=["metrics"])
+app.include_router(screener.router, prefix="/screener", tags=["screener"])
+app.include_router(jobs.router, prefix="/jobs", tags=["jobs"])
 
 app.add_middleware(
     CORSMiddleware,
@@ -24,15 +34,66 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-market.setup_shutdown(app)
+@app.on_event("startup")
+async def _open_upstreams():
+    app.state.upstreams = UpstreamClients.from_env()
+
+@app.on_event("shutdown")
+async def _close_upstreams():
+    await app.state.upstreams.aclose()
+
+@app.on_event("startup")
+async def _start_background():
+    compute.pool.start()  # 워커 선기동 (numpy/scipy import 완료 상태)
+    app.state.background = []
+    if cache.JANITOR_INTERVAL > 0:  # CORE_CACHE_JANITOR_INTERVAL=0 → 외부 cron 으로 CLI 실행
+        app.state.background.append(asyncio.create_task(cache.janitor_loop()))
+    try:
+        # 심볼 디렉터리: 시작 시 적재 후 요청 경로 밖에서 corpCode 동기화
+        app.state.background.append(asyncio.create_task(directory.run(app.state.upstreams.dart)))
+    except RuntimeError:
+        pass  # DART 키 없음 → 첫 요청 시 오류로 안내
+    # KRX 시장구분·업종: 장 마감 후 하루 한 번
+    app.state.background.append(asyncio.create_task(directory.run_metadata(app.state.upstreams.krx)))
+    job_runner.start(app.state.upstreams)  # 재시작 시 중단된 작업 재개
+    if warmup.IN_API:  # 장 시작 전 최근 조회·관심 종목 캐시 예열
+        app.state.background.append(asyncio.create_task(warmup.warmup_loop(app.state.upstreams)))
+
+@app.on_event("shutdown")
+async def _stop_background():
+    for task in app.state.background:
+        task.cancel()
+    job_runner.stop()
+    compute.pool.shutdown()
+
+@app.exception_handler(CircuitOpenError)
+async def _circuit_open(request: Request, exc: CircuitOpenError):
+    # 업스트림 장애 시 대기하지 않고 즉시 503
+    return JSONResponse(status_code=503, content={"detail": str(exc)},
+                        headers={"Retry-After": str(max(1, int(exc.retry_after + 0.999)))})
+
+@app.exception_handler(compute.ComputeBusyError)
+async def _compute_busy(request: Request, exc: compute.ComputeBusyError):
+    return JSONResponse(status_code=503, content={"detail": str(exc)},
+                        headers={"Retry-After": str(max(1, int(exc.retry_after + 0.999)))})
+
+@app.exception_handler(compute.ComputeTimeoutError)
+async def _compute_timeout(request: Request, exc: compute.ComputeTimeoutError):
+    return JSONResponse(status_code=504, content={"detail": str(exc)})
 
 @app.get("/health")
 async def _health():
     from datetime import datetime
     return {"ok": True, "ts": datetime.utcnow().isoformat()}
 
-async def get_dart() -> DARTClient:
-    return DARTClient(api_key=os.environ["API_KEY"])
+@app.get("/health/stats")
+async def _stats():
+    from core.clients import ratelimit, resilience
+    from core.services import market_data
+    return {"rate_limits": ratelimit.snapshot_all(), "breakers": resilience.snapshot_all(),
+            "single_flight": market_data.flights.snapshot(),
+            "cache": cache.stats(), "symbols": directory.snapshot(), "compute": compute.pool.snapshot(),
+            "jobs": await job_runner.snapshot(), "warmup": warmup.snapshot()}
 
 # ✅ alias: allow /financials/{corp_or_stock}
 @app.get("/financials/{code}")
@@ -24,6 +24,13 @@ class HealthOut(BaseModel):
     total_score: Optional[float] = None
     grade: str = "N/A"
 
+class FSBatchIn(BaseModel):
+    corp_code: str
+    rows: List[FSRow]
+
+class HealthBatchOut(HealthOut):
+    corp_code: str
+
 class RatiosOut(BaseModel):
     PER: Optional[float] = None
     PBR: Optional[float] = None
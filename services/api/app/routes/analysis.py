@@ -2,24 +2,36 @@ from fastapi import APIRouter, Depends, HTTPException
 import pandas as pd
 from core.clients.dart import DARTClient
 from core.services.analysis import (
-    calculate_financial_health, calculate_custom_ratios, extract_fs_summary,
+    calculate_financial_health, calculate_financial_health_batch, calculate_custom_ratios, extract_fs_summary,
     dcf_intrinsic_price, rim_intrinsic_price,
 )
-from .market import get_kis  # if you need prices via KIS
-from ..models.analysis import FSRow, PricePoint, HealthOut, RatiosOut, DCFIn, RIMIn
+from core.utils import compute
+from ..deps import get_dart, get_kis  # if you need prices via KIS
+from ..models.analysis import FSRow, PricePoint, HealthOut, RatiosOut, DCFIn, RIMIn, FSBatchIn, HealthBatchOut
 
 router = APIRouter()
 
-async def get_dart() -> DARTClient:
-    import os
-    return DARTClient(api_key=os.environ["API_KEY"])
-
 @router.post("/financial-health", response_model=HealthOut)
 async def financial_health(fs_rows: list[FSRow]):
     fs_df = pd.DataFrame([r.model_dump(by_alias=True) for r in fs_rows])
     result = calculate_financial_health(fs_df)
     return HealthOut(**result)
 
+@router.post("/financial-health/batch", response_model=list[HealthBatchOut])
+async def financial_health_batch(companies: list[FSBatchIn]):
+    fs_df = pd.DataFrame([
+        {**r.model_dump(by_alias=True), "corp_code": c.corp_code} for c in companies for r in c.rows
+    ])
+    result = await compute.run(calculate_financial_health_batch, fs_df)
+    out = []
+    for c in dict.fromkeys(c.corp_code for c in companies):
+        if c not in result.index:  # no rows → same answer as the single endpoint
+            out.append(HealthBatchOut(corp_code=c, **calculate_financial_health(pd.DataFrame())))
+            continue
+        r = result.loc[c].to_dict()
+        out.append(HealthBatchOut(corp_code=c, **{k: (None if k != "grade" and pd.isna(v) else v) for k, v in r.items()}))
+    return out
+
 @router.post("/ratios", response_model=RatiosOut)
 async def ratios(fs_rows: list[FSRow], prices: list[PricePoint]):
     fs_df = pd.DataFrame([r.model_dump(by_alias=True) for r in fs_rows])
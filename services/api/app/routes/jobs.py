@@ -0,0 +1,65 @@
+import asyncio
+from typing import Any, Dict, Optional
+from fastapi import APIRouter, HTTPException, Query
+from pydantic import BaseModel, ValidationError
+from core.services.jobs import runner, load_frame, TASKS, DONE
+
+router = APIRouter()
+
+class JobIn(BaseModel):
+    kind: str
+    params: Dict[str, Any] = {}
+
+def _public(job: dict) -> dict:
+    keys = ("id", "kind", "status", "progress", "message", "error", "attempts",
+            "created_at", "started_at", "finished_at", "params")
+    return {k: job[k] for k in keys}
+
+async def _job(job_id: str) -> dict:
+    job = await runner.call(runner.store.get, job_id)
+    if job is None:
+        raise HTTPException(404, detail=f"Unknown job: {job_id}")
+    return job
+
+@router.get("/kinds")
+async def kinds():
+    return {k: {"doc": (t.fn.__doc__ or "").strip(), "params": t.params.model_json_schema()} for k, t in TASKS.items()}
+
+@router.post("", status_code=202)
+async def submit(body: JobIn):
+    if body.kind not in TASKS:
+        raise HTTPException(400, detail=f"Unknown job kind: {body.kind} (one of {sorted(TASKS)})")
+    try:
+        job, reused = await runner.submit(body.kind, body.params)
+    except ValidationError as e:
+        raise HTTPException(422, detail=e.errors(include_url=False))
+    # 같은 입력의 유효한 결과/진행 중 작업이 있으면 그 작업을 돌려줌
+    return {**_public(job), "reused": reused}
+
+@router.get("")
+async def list_jobs(status: Optional[str] = None, limit: int = Query(50, ge=1, le=500)):
+    return [_public(j) for j in await runner.call(runner.store.list, status, limit)]
+
+@router.get("/{job_id}")
+async def status(job_id: str):
+    return _public(await _job(job_id))
+
+@router.get("/{job_id}/result")
+async def result(job_id: str):
+    job = await _job(job_id)
+    if job["status"] != DONE:
+        raise HTTPException(409, detail=f"Job is {job['status']}")
+    res = job["result"]
+    if isinstance(res, dict) and "frame" in res:
+        df = await asyncio.to_thread(load_frame, res)
+        if df is None:
+            raise HTTPException(410, detail="Result file expired; resubmit the job")
+        df.index = df.index.astype(str)
+        return {"index": df.index.tolist(), "columns": df.columns.tolist(),
+                "data": df.astype(object).where(df.notna(), None).values.tolist()}
+    return res
+
+@router.post("/{job_id}/cancel")
+async def cancel(job_id: str):
+    await _job(job_id)
+    return _public(await runner.cancel(job_id))
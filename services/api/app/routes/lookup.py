@@ -1,38 +1,38 @@
-from fastapi import APIRouter, Depends, HTTPException
-import os
-from core.services.lookup import company_info_by_stock
+from fastapi import APIRouter, Depends, HTTPException, Query
+from core.services.lookup import company_info_by_stock, directory, changes_since
 from core.services.logo import get_logo_cached
+from core.clients.dart import DARTClient
 from core.clients.naver import NaverImageSearch
+from ..deps import get_dart, get_naver
 
 router = APIRouter()
 
-def get_api_key() -> str:
-    key = os.environ.get("API_KEY")
-    if not key:
-        raise HTTPException(status_code=500, detail="API_KEY is not set in the API process environment")
-    return key
+@router.get("/search")
+async def search(q: str = Query(..., description='회사명·초성·종목코드 (e.g. "삼성", "ㅅㅅㅈㅈ", "0059")'),
+                 limit: int = Query(10, ge=1, le=50), dart: DARTClient = Depends(get_dart)):
+    # 키 입력마다 호출되는 자동완성: 메모리 인덱스만 조회
+    return await directory.search(q, dart, limit=limit)
 
-def get_naver() -> NaverImageSearch:
-    cid = os.environ.get("NAVER_SEARCH_CLIENT_ID")
-    sec = os.environ.get("NAVER_SEARCH_CLIENT_SECRET")
-    # 자격이 없어도 500 내지 말고, None credential로 동작(=null 리턴)
-    return NaverImageSearch(client_id=cid, client_secret=sec)
+@router.get("/changes")
+async def changes(since: int = Query(0, ge=0)):
+    # 상장·상폐·사명변경 이력 (버전 단위). complete=false 면 전체 재적재 필요
+    return changes_since(since)
 
 @router.get("/company/{stock_code}")
-async def company(stock_code: str, api_key: str = Depends(get_api_key)):
-    info = await company_info_by_stock(stock_code, api_key=api_key)
+async def company(stock_code: str, dart: DARTClient = Depends(get_dart)):
+    info = await company_info_by_stock(stock_code, dart)
     if not info:
         raise HTTPException(status_code=404, detail=f"Unknown stock_code: {stock_code}")
     return info
 
 @router.get("/logo/{stock_code}")
 async def logo(stock_code: str, company_name: str | None = None,
-               api_key: str = Depends(get_api_key),
+               dart: DARTClient = Depends(get_dart),
                naver: NaverImageSearch = Depends(get_naver)):
     # 회사명이 없으면 DART로 조회해 이름 확보
     name = company_name
     if not name:
-        info = await company_info_by_stock(stock_code, api_key=api_key)
+        info = await company_info_by_stock(stock_code, dart)
         if not info:
             raise HTTPException(status_code=404, detail=f"Unknown stock_code: {stock_code}")
         name = info["corp_name"]
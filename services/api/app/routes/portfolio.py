@@ -1,11 +1,13 @@
 from fastapi import APIRouter, Depends, HTTPException
 from pydantic import BaseModel
 from typing import List, Optional
-import os
+import numpy as np
 import pandas as pd
 from core.clients.kis import KISClient
 from core.services.market_data import kis_prices_panel
 from core.services.portfolio import optimize_portfolio, backtest_portfolio
+from core.utils import compute
+from ..deps import get_kis
 
 router = APIRouter()
 
@@ -39,19 +41,12 @@ class BacktestOut(BaseModel):
     sharpe_ratio: float
     max_drawdown: float
 
-async def get_kis() -> KISClient:
-    return KISClient(
-        base_url=os.getenv("KIS_BASE_URL", "https://openapi.koreainvestment.com:9443"),
-        app_key=os.environ["APP_KEY"],
-        app_secret=os.environ["APP_SECRET"],
-    )
-
 @router.post("/optimize", response_model=OptimizeOut)
 async def optimize(body: OptimizeIn, kis: KISClient = Depends(get_kis)):
     rets = await kis_prices_panel(kis, body.tickers, body.start_date, body.end_date)
     if rets is None or rets.empty:
         raise HTTPException(404, detail="no returns data")
-    result = optimize_portfolio(rets, risk_free_rate=body.risk_free)
+    result = await compute.run(optimize_portfolio, rets, risk_free_rate=body.risk_free)
     if not result.get("success"):
         raise HTTPException(500, detail="optimization failed")
     # weights as list for JSON
@@ -72,7 +67,7 @@ async def backtest(body: BacktestIn, kis: KISClient = Depends(get_kis)):
     series_list = await asyncio.gather(*[one(t) for t in body.tickers])
     price_df = pd.concat(series_list, axis=1)
 
-    result = backtest_portfolio(price_df, np.array(body.weights, dtype=float))
+    result = await compute.run(backtest_portfolio, price_df, np.array(body.weights, dtype=float))
     curve = [CurvePoint(date=str(d.date()), value=float(v)) for d, v in result["cumulative_returns"].items()]
 
     return BacktestOut(
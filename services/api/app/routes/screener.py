@@ -0,0 +1,26 @@
+import asyncio
+from datetime import date
+from fastapi import APIRouter, Depends, HTTPException, Query
+from core.clients.dart import DARTClient
+from core.services.lookup import directory
+from core.services.screener import screen, refresh_factors, stored_kis_ratios, ScreenError
+from ..deps import get_dart
+
+router = APIRouter()
+
+@router.get("")
+async def run_screen(q: str | None = Query(None, description='e.g. "debt_ratio < 100 and roe > 10 and F >= 7"'),
+                     sort: str | None = Query(None, description='e.g. "-roe,per"'),
+                     page: int = Query(1, ge=1), page_size: int = Query(50, ge=1, le=500)):
+    try:
+        return await asyncio.to_thread(screen, q, sort=sort, page=page, page_size=page_size)
+    except ScreenError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.post("/refresh")
+async def refresh(year: int | None = None, full: bool = False, dart: DARTClient = Depends(get_dart)):
+    # 전년도 사업보고서 기준이 기본값
+    universe = await directory.frame(dart)
+    kis_ratios = await asyncio.to_thread(stored_kis_ratios, universe["stock_code"].tolist())
+    return await asyncio.to_thread(refresh_factors, universe, year or date.today().year - 1,
+                                   kis_ratios=kis_ratios, full=full)